@@ -0,0 +1,652 @@
+# Local stand-in for Discord's gateway and REST API
+# The bot logs in, connects and sends exactly as it would against Discord, with
+# discord.py pointed at this server instead (see run_bot.py). The REST side
+# keeps a small world of guilds, channels, members and bans, answers with real
+# payload shapes and enforces per-route and global rate limits through the same
+# headers Discord sends. The gateway side speaks the v10 protocol (HELLO,
+# IDENTIFY, heartbeats, member chunk requests) for any number of shards and
+# lets the harness inject events into the shard that owns a guild.
+import asyncio
+import bisect
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from itertools import count
+
+from aiohttp import WSMsgType, web
+
+API_PREFIX = '/api/v10'
+DISCORD_EPOCH = 1420070400000
+BOT_ID = 900000000000000001
+OWNER_ID = 900000000000000002
+
+# Gateway opcodes and intents used below
+DISPATCH = 0
+HEARTBEAT = 1
+IDENTIFY = 2
+PRESENCE_UPDATE = 3
+RESUME = 6
+REQUEST_MEMBERS = 8
+INVALID_SESSION = 9
+HELLO = 10
+HEARTBEAT_ACK = 11
+INTENT_GUILD_MEMBERS = 1 << 1
+INTENT_GUILD_MODERATION = 1 << 2
+INTENT_GUILD_PRESENCES = 1 << 8
+INTENT_GUILD_MESSAGES = 1 << 9
+INTENT_MESSAGE_CONTENT = 1 << 15
+EVENT_INTENTS = {
+    'MESSAGE_CREATE': INTENT_GUILD_MESSAGES,
+    'GUILD_MEMBER_ADD': INTENT_GUILD_MEMBERS,
+    'GUILD_MEMBER_REMOVE': INTENT_GUILD_MEMBERS,
+    'GUILD_MEMBER_UPDATE': INTENT_GUILD_MEMBERS,
+    'GUILD_BAN_ADD': INTENT_GUILD_MODERATION,
+    'GUILD_BAN_REMOVE': INTENT_GUILD_MODERATION,
+    'PRESENCE_UPDATE': INTENT_GUILD_PRESENCES
+}
+LARGE_THRESHOLD = 250
+CHUNK_SIZE = 1000
+
+# REST rate limits as (requests, seconds) per bucket. Buckets are per route and
+# major parameter (channel or guild), like Discord's. The figures are typical
+# of what Discord reports for a bot; everything else shares DEFAULT_LIMIT.
+RATE_LIMITS = {
+    ('POST', '/channels/{channel_id}/messages'): (5, 5),
+    ('PATCH', '/channels/{channel_id}/messages/{message_id}'): (5, 5),
+    ('DELETE', '/channels/{channel_id}/messages/{message_id}'): (5, 1),
+    ('POST', '/channels/{channel_id}/messages/bulk-delete'): (1, 1),
+    ('PUT', '/guilds/{guild_id}/members/{user_id}/roles/{role_id}'): (10, 1),
+    ('PATCH', '/guilds/{guild_id}/members/{user_id}'): (10, 1),
+    ('DELETE', '/guilds/{guild_id}/members/{user_id}'): (5, 1),
+    ('PUT', '/guilds/{guild_id}/bans/{user_id}'): (5, 1),
+    ('DELETE', '/guilds/{guild_id}/bans/{user_id}'): (5, 1),
+    ('POST', '/guilds/{guild_id}/bulk-ban'): (1, 1),
+}
+DEFAULT_LIMIT = (50, 1)
+GLOBAL_LIMIT = (50, 1)
+
+def json_response(data, status=200, headers=None):
+    # discord.py only decodes bodies whose content type is exactly
+    # application/json, so no charset parameter
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers, content_type='application/json')
+
+def timestamp(milliseconds):
+    return datetime.fromtimestamp(milliseconds / 1000, timezone.utc).isoformat()
+
+class Snowflakes:
+    # Strictly increasing IDs carrying the current time, as Discord's do
+    def __init__(self):
+        self.last = 0
+
+    def __call__(self):
+        self.last = max((int(time.time() * 1000) - DISCORD_EPOCH) << 22, self.last + 1)
+        return self.last
+
+class Window:
+    __slots__ = ('limit', 'per', 'remaining', 'reset_at')
+
+    def __init__(self, limit, per):
+        self.limit = limit
+        self.per = per
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def hit(self, now):
+        # Returns None if allowed, otherwise seconds until the window resets
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+        if self.remaining == 0:
+            return self.reset_at - now
+        self.remaining -= 1
+        return None
+
+class Guild:
+    def __init__(self, guild_id, name, owner_id):
+        self.id = guild_id
+        self.name = name
+        self.owner_id = owner_id
+        self.everyone = {'id': str(guild_id), 'name': '@everyone', 'permissions': '104324673', 'position': 0}
+        self.roles = [self.everyone]
+        self.channels = []
+        self.members = {}  # user ID -> (joined at in ms, role IDs)
+        self.bans = {}  # user ID -> reason
+
+class FakeDiscord:
+    def __init__(self, shard_count=1, rate_limit_scale=1.0, rest_latency=0.0, echo_messages=True):
+        self.shard_count = shard_count
+        self.rate_limit_scale = rate_limit_scale
+        self.rest_latency = rest_latency
+        self.echo_messages = echo_messages
+        self.snowflake = Snowflakes()
+        self.guilds = {}
+        self.channels = {}  # channel ID -> guild
+        self.usernames = {BOT_ID: 'Universx', OWNER_ID: 'owner'}
+        self.sessions = {}  # shard ID -> Session
+        self.windows = {}
+        self.global_window = None
+        self.listeners = []
+        self.requests = 0
+        self.rate_limited = 0
+        self.unknown_routes = {}
+        self.attachments = {}  # attachment ID -> bytes, served like the CDN
+        self.identified = asyncio.Event()
+        self.guilds_created_at = int(time.time() * 1000) - 86400000
+        self.runner = None
+        self.url = None
+
+    # World
+    def add_guild(self, name='Universx MC', channels=1, members=0, owner_id=OWNER_ID):
+        # One millisecond apart, so consecutive guilds land on consecutive shards
+        guild_id = (self.guilds_created_at + len(self.guilds) - DISCORD_EPOCH) << 22
+        guild = self.guilds[guild_id] = Guild(guild_id, name, owner_id)
+        admin_role = self.add_role(guild, 'Admin', permissions='8', position=2)
+        bot_role = self.add_role(guild, 'Universx', permissions='8', position=3)
+        for index in range(channels):
+            self.add_channel(guild, f'channel-{index}')
+        now = time.time() * 1000
+        guild.members[owner_id] = (now - 86400000 * 365, (admin_role,))
+        guild.members[BOT_ID] = (now - 86400000 * 365, (bot_role,))
+        self.add_members(guild, members, joined_at=now - 86400000 * 30)
+        return guild
+
+    def add_role(self, guild, name, permissions='0', position=1):
+        role_id = self.snowflake()
+        guild.roles.append({'id': str(role_id), 'name': name, 'permissions': permissions, 'position': position})
+        return role_id
+
+    def add_channel(self, guild, name):
+        channel_id = self.snowflake()
+        guild.channels.append({'id': str(channel_id), 'type': 0, 'name': name, 'position': len(guild.channels)})
+        self.channels[channel_id] = guild
+        return channel_id
+
+    def add_members(self, guild, amount, joined_at=None, prefix='user'):
+        joined_at = joined_at or time.time() * 1000
+        user_ids = []
+        for _ in range(amount):
+            user_id = self.snowflake()
+            self.usernames[user_id] = f'{prefix}{len(self.usernames)}'
+            guild.members[user_id] = (joined_at, ())
+            user_ids.append(user_id)
+        return user_ids
+
+    def add_bans(self, guild, amount, prefix='banned'):
+        user_ids = []
+        for _ in range(amount):
+            user_id = self.snowflake()
+            self.usernames[user_id] = f'{prefix}{len(self.usernames)}'
+            guild.bans[user_id] = 'Raid'
+            user_ids.append(user_id)
+        return user_ids
+
+    def shard_for(self, guild_id):
+        return (guild_id >> 22) % self.shard_count
+
+    # Payloads
+    def user_payload(self, user_id):
+        return {
+            'id': str(user_id),
+            'username': self.usernames.get(user_id, f'user{user_id % 100000}'),
+            'discriminator': '0',
+            'global_name': None,
+            'avatar': None,
+            'bot': user_id == BOT_ID
+        }
+
+    def member_payload(self, guild, user_id, with_user=True):
+        joined_at, roles = guild.members.get(user_id, (time.time() * 1000, ()))
+        payload = {
+            'roles': [str(role_id) for role_id in roles],
+            'joined_at': timestamp(joined_at),
+            'deaf': False,
+            'mute': False,
+            'flags': 0
+        }
+        if with_user:
+            payload['user'] = self.user_payload(user_id)
+        return payload
+
+    def guild_payload(self, guild):
+        # Like Discord, large guilds only carry a few members and are chunked
+        large = len(guild.members) > LARGE_THRESHOLD
+        member_ids = [guild.owner_id, BOT_ID] if large else list(guild.members)
+        return {
+            'id': str(guild.id),
+            'name': guild.name,
+            'icon': None,
+            'owner_id': str(guild.owner_id),
+            'roles': guild.roles,
+            'channels': guild.channels,
+            'members': [self.member_payload(guild, user_id) for user_id in member_ids],
+            'member_count': len(guild.members),
+            'large': large,
+            'unavailable': False,
+            'features': [],
+            'emojis': [],
+            'stickers': [],
+            'threads': [],
+            'stage_instances': [],
+            'guild_scheduled_events': [],
+            'soundboard_sounds': [],
+            'voice_states': [],
+            'presences': [],
+            'premium_tier': 0,
+            'verification_level': 0,
+            'default_message_notifications': 0,
+            'explicit_content_filter': 0,
+            'mfa_level': 0,
+            'system_channel_id': guild.channels[0]['id'] if guild.channels else None,
+            'preferred_locale': 'en-US',
+            'joined_at': timestamp(time.time() * 1000)
+        }
+
+    def attachment_payload(self, filename, data):
+        attachment_id = self.snowflake()
+        self.attachments[attachment_id] = data
+        url = f'{self.url}/attachments/{attachment_id}/{filename}'
+        return {'id': str(attachment_id), 'filename': filename, 'size': len(data), 'url': url, 'proxy_url': url}
+
+    def message_payload(self, channel_id, author_id, content, embeds=(), mentions=(), attachments=(), message_id=None):
+        guild = self.channels.get(channel_id)
+        message_id = message_id or self.snowflake()
+        payload = {
+            'id': str(message_id),
+            'channel_id': str(channel_id),
+            'author': self.user_payload(author_id),
+            'content': content,
+            'timestamp': timestamp(((message_id >> 22) + DISCORD_EPOCH)),
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [self.user_payload(user_id) for user_id in mentions],
+            'mention_roles': [],
+            'attachments': [self.attachment_payload(filename, data) for filename, data in attachments],
+            'embeds': list(embeds),
+            'pinned': False,
+            'type': 0,
+            'flags': 0
+        }
+        if guild is not None:
+            payload['guild_id'] = str(guild.id)
+            payload['member'] = self.member_payload(guild, author_id, with_user=False)
+        return payload
+
+    # Events
+    async def dispatch(self, guild_id, event, data):
+        session = self.sessions.get(self.shard_for(guild_id))
+        if session is not None:
+            await session.dispatch(event, data)
+
+    async def send_message(self, channel_id, author_id, content, mentions=(), attachments=()):
+        guild = self.channels[channel_id]
+        data = self.message_payload(channel_id, author_id, content, mentions=mentions, attachments=attachments)
+        await self.dispatch(guild.id, 'MESSAGE_CREATE', data)
+
+    async def member_join(self, guild, user_id=None):
+        if user_id is None:
+            [user_id] = self.add_members(guild, 1)
+        data = self.member_payload(guild, user_id)
+        data['guild_id'] = str(guild.id)
+        await self.dispatch(guild.id, 'GUILD_MEMBER_ADD', data)
+        return user_id
+
+    async def member_update(self, guild, user_id):
+        data = self.member_payload(guild, user_id)
+        data['guild_id'] = str(guild.id)
+        await self.dispatch(guild.id, 'GUILD_MEMBER_UPDATE', data)
+
+    # Server
+    async def start(self, host='127.0.0.1', port=0):
+        app = web.Application(middlewares=[self.rate_limit_middleware], client_max_size=32 * 1024 * 1024)
+        routes = [
+            ('GET', '/users/@me', self.get_current_user),
+            ('GET', '/oauth2/applications/@me', self.get_application),
+            ('GET', '/gateway', self.get_gateway),
+            ('GET', '/gateway/bot', self.get_gateway),
+            ('POST', '/channels/{channel_id}/typing', self.no_content),
+            ('GET', '/channels/{channel_id}/messages', self.get_messages),
+            ('POST', '/channels/{channel_id}/messages', self.create_message),
+            ('PATCH', '/channels/{channel_id}/messages/{message_id}', self.edit_message),
+            ('DELETE', '/channels/{channel_id}/messages/{message_id}', self.no_content),
+            ('POST', '/channels/{channel_id}/messages/bulk-delete', self.no_content),
+            ('GET', '/guilds/{guild_id}/members/{user_id}', self.get_member),
+            ('PATCH', '/guilds/{guild_id}/members/{user_id}', self.edit_member),
+            ('DELETE', '/guilds/{guild_id}/members/{user_id}', self.kick_member),
+            ('PUT', '/guilds/{guild_id}/members/{user_id}/roles/{role_id}', self.add_member_role),
+            ('GET', '/guilds/{guild_id}/bans', self.get_bans),
+            ('PUT', '/guilds/{guild_id}/bans/{user_id}', self.ban_member),
+            ('DELETE', '/guilds/{guild_id}/bans/{user_id}', self.unban_member),
+            ('POST', '/guilds/{guild_id}/bulk-ban', self.bulk_ban),
+        ]
+        for method, path, handler in routes:
+            app.router.add_route(method, API_PREFIX + path, handler)
+        app.router.add_get('/gateway', self.gateway)
+        app.router.add_get('/attachments/{attachment_id}/{filename}', self.get_attachment)
+        app.router.add_route('*', '/{tail:.*}', self.unknown_route)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        host, port = site._server.sockets[0].getsockname()[:2]
+        self.url = f'http://{host}:{port}'
+        return self.url
+
+    async def close(self):
+        for session in list(self.sessions.values()):
+            await session.ws.close()
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def window(self, key, limit):
+        window = self.windows.get(key)
+        if window is None:
+            requests, per = limit
+            window = self.windows[key] = Window(max(1, int(requests * self.rate_limit_scale)), per)
+        return window
+
+    @web.middleware
+    async def rate_limit_middleware(self, request, handler):
+        resource = request.match_info.route.resource
+        if resource is None or not resource.canonical.startswith(API_PREFIX):
+            return await handler(request)
+        path = resource.canonical[len(API_PREFIX):]
+        self.requests += 1
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+        headers = {}
+        if self.rate_limit_scale:
+            now = time.monotonic()
+            if self.global_window is None:
+                self.global_window = Window(max(1, int(GLOBAL_LIMIT[0] * self.rate_limit_scale)), GLOBAL_LIMIT[1])
+            retry_after = self.global_window.hit(now)
+            if retry_after is not None:
+                return self.too_many_requests(retry_after, {'X-RateLimit-Global': 'true', 'X-RateLimit-Scope': 'global'}, True)
+            major = request.match_info.get('channel_id') or request.match_info.get('guild_id') or ''
+            route = (request.method, path)
+            window = self.window((route, major), RATE_LIMITS.get(route, DEFAULT_LIMIT))
+            retry_after = window.hit(now)
+            bucket = hashlib.sha1(f'{request.method} {path}'.encode()).hexdigest()[:16]
+            headers = {
+                'X-RateLimit-Limit': str(window.limit),
+                'X-RateLimit-Remaining': str(window.remaining),
+                'X-RateLimit-Reset': f'{time.time() + window.reset_at - now:.3f}',
+                'X-RateLimit-Reset-After': f'{window.reset_at - now:.3f}',
+                'X-RateLimit-Bucket': bucket
+            }
+            if retry_after is not None:
+                headers['X-RateLimit-Scope'] = 'user'
+                return self.too_many_requests(retry_after, headers, False)
+        response = await handler(request)
+        response.headers.update(headers)
+        for listener in self.listeners:
+            listener(request.method, path, request.match_info, response)
+        return response
+
+    def too_many_requests(self, retry_after, headers, is_global):
+        self.rate_limited += 1
+        headers['Via'] = '1.1 google'
+        headers['Retry-After'] = f'{retry_after:.3f}'
+        body = {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': is_global}
+        return json_response(body, status=429, headers=headers)
+
+    async def get_attachment(self, request):
+        data = self.attachments.get(int(request.match_info['attachment_id']))
+        if data is None:
+            return web.Response(status=404)
+        return web.Response(body=data, content_type='text/plain')
+
+    async def unknown_route(self, request):
+        key = f'{request.method} {request.path}'
+        self.unknown_routes[key] = self.unknown_routes.get(key, 0) + 1
+        return json_response({'message': 'Unknown route', 'code': 0}, status=404)
+
+    def not_found(self, message='Unknown', code=10000):
+        return json_response({'message': message, 'code': code}, status=404)
+
+    # REST handlers
+    async def get_current_user(self, request):
+        return json_response(self.user_payload(BOT_ID))
+
+    async def get_application(self, request):
+        return json_response({
+            'id': str(BOT_ID),
+            'name': self.usernames[BOT_ID],
+            'description': '',
+            'icon': None,
+            'bot_public': False,
+            'bot_require_code_grant': False,
+            'owner': self.user_payload(OWNER_ID),
+            'verify_key': '0' * 64,
+            'flags': 0,
+            'team': None
+        })
+
+    async def get_gateway(self, request):
+        return json_response({
+            'url': self.url.replace('http', 'ws', 1) + '/gateway',
+            'shards': self.shard_count,
+            'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0, 'max_concurrency': 1}
+        })
+
+    async def no_content(self, request):
+        return web.Response(status=204)
+
+    async def get_messages(self, request):
+        return json_response([])
+
+    async def create_message(self, request):
+        channel_id = int(request.match_info['channel_id'])
+        if channel_id not in self.channels:
+            return self.not_found('Unknown Channel', 10003)
+        body = await request.json()
+        data = self.message_payload(channel_id, BOT_ID, body.get('content') or '', embeds=body.get('embeds') or ())
+        if self.echo_messages:
+            asyncio.create_task(self.dispatch(self.channels[channel_id].id, 'MESSAGE_CREATE', data))
+        return json_response(data)
+
+    async def edit_message(self, request):
+        channel_id = int(request.match_info['channel_id'])
+        body = await request.json()
+        return json_response(self.message_payload(
+            channel_id, BOT_ID, body.get('content') or '',
+            embeds=body.get('embeds') or (), message_id=int(request.match_info['message_id'])
+        ))
+
+    def get_guild(self, request):
+        return self.guilds.get(int(request.match_info['guild_id']))
+
+    async def get_member(self, request):
+        guild = self.get_guild(request)
+        user_id = int(request.match_info['user_id'])
+        if guild is None or user_id not in guild.members:
+            return self.not_found('Unknown Member', 10007)
+        return json_response(self.member_payload(guild, user_id))
+
+    async def edit_member(self, request):
+        guild = self.get_guild(request)
+        user_id = int(request.match_info['user_id'])
+        if guild is None or user_id not in guild.members:
+            return self.not_found('Unknown Member', 10007)
+        body = await request.json()
+        if 'roles' in body:
+            joined_at, _ = guild.members[user_id]
+            guild.members[user_id] = (joined_at, tuple(int(role_id) for role_id in body['roles']))
+            asyncio.create_task(self.member_update(guild, user_id))
+        payload = self.member_payload(guild, user_id)
+        if body.get('communication_disabled_until'):
+            payload['communication_disabled_until'] = body['communication_disabled_until']
+        return json_response(payload)
+
+    async def add_member_role(self, request):
+        guild = self.get_guild(request)
+        user_id = int(request.match_info['user_id'])
+        if guild is None or user_id not in guild.members:
+            return self.not_found('Unknown Member', 10007)
+        joined_at, roles = guild.members[user_id]
+        guild.members[user_id] = (joined_at, roles + (int(request.match_info['role_id']),))
+        asyncio.create_task(self.member_update(guild, user_id))
+        return web.Response(status=204)
+
+    async def remove_member(self, guild, user_id):
+        if guild.members.pop(user_id, None) is not None:
+            await self.dispatch(guild.id, 'GUILD_MEMBER_REMOVE', {'guild_id': str(guild.id), 'user': self.user_payload(user_id)})
+
+    async def kick_member(self, request):
+        guild = self.get_guild(request)
+        user_id = int(request.match_info['user_id'])
+        if guild is None or user_id not in guild.members:
+            return self.not_found('Unknown Member', 10007)
+        asyncio.create_task(self.remove_member(guild, user_id))
+        return web.Response(status=204)
+
+    async def get_bans(self, request):
+        guild = self.get_guild(request)
+        if guild is None:
+            return self.not_found('Unknown Guild', 10004)
+        limit = min(int(request.query.get('limit', 1000)), 1000)
+        user_ids = sorted(guild.bans)
+        if 'after' in request.query:
+            start = bisect.bisect_right(user_ids, int(request.query['after']))
+            user_ids = user_ids[start:start + limit]
+        elif 'before' in request.query:
+            end = bisect.bisect_left(user_ids, int(request.query['before']))
+            user_ids = user_ids[max(0, end - limit):end]
+        else:
+            user_ids = user_ids[:limit]
+        return json_response([
+            {'user': self.user_payload(user_id), 'reason': guild.bans[user_id]} for user_id in user_ids
+        ])
+
+    async def ban(self, guild, user_id, reason):
+        guild.bans[user_id] = reason
+        await self.dispatch(guild.id, 'GUILD_BAN_ADD', {'guild_id': str(guild.id), 'user': self.user_payload(user_id)})
+        await self.remove_member(guild, user_id)
+
+    async def ban_member(self, request):
+        guild = self.get_guild(request)
+        if guild is None:
+            return self.not_found('Unknown Guild', 10004)
+        asyncio.create_task(self.ban(guild, int(request.match_info['user_id']), request.headers.get('X-Audit-Log-Reason')))
+        return web.Response(status=204)
+
+    async def unban_member(self, request):
+        guild = self.get_guild(request)
+        user_id = int(request.match_info['user_id'])
+        if guild is None or guild.bans.pop(user_id, False) is False:
+            return self.not_found('Unknown Ban', 10026)
+        asyncio.create_task(self.dispatch(
+            guild.id, 'GUILD_BAN_REMOVE', {'guild_id': str(guild.id), 'user': self.user_payload(user_id)}
+        ))
+        return web.Response(status=204)
+
+    async def bulk_ban(self, request):
+        guild = self.get_guild(request)
+        if guild is None:
+            return self.not_found('Unknown Guild', 10004)
+        body = await request.json()
+        user_ids = [int(user_id) for user_id in body['user_ids']]
+        reason = request.headers.get('X-Audit-Log-Reason')
+        for user_id in user_ids:
+            asyncio.create_task(self.ban(guild, user_id, reason))
+        return json_response({'banned_users': [str(user_id) for user_id in user_ids], 'failed_users': []})
+
+    # Gateway
+    async def gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        session = Session(self, ws)
+        await session.run()
+        return ws
+
+class Session:
+    # One shard's gateway connection
+    def __init__(self, server, ws):
+        self.server = server
+        self.ws = ws
+        self.sequence = count(1)
+        self.shard_id = 0
+        self.intents = 0
+        self.session_id = None
+
+    async def send(self, payload):
+        if not self.ws.closed:
+            await self.ws.send_str(json.dumps(payload))
+
+    async def dispatch(self, event, data):
+        required = EVENT_INTENTS.get(event)
+        if required is not None and not self.intents & required:
+            return
+        if event == 'MESSAGE_CREATE' and not self.intents & INTENT_MESSAGE_CONTENT:
+            # Without the intent, content only arrives when the bot is mentioned
+            if not any(int(user['id']) == BOT_ID for user in data['mentions']):
+                data = dict(data, content='', embeds=[], attachments=[])
+        await self.send({'op': DISPATCH, 't': event, 's': next(self.sequence), 'd': data})
+
+    async def run(self):
+        await self.send({'op': HELLO, 'd': {'heartbeat_interval': 41250}})
+        async for message in self.ws:
+            if message.type != WSMsgType.TEXT:
+                break
+            payload = json.loads(message.data)
+            op = payload['op']
+            if op == HEARTBEAT:
+                await self.send({'op': HEARTBEAT_ACK})
+            elif op == IDENTIFY:
+                await self.identify(payload['d'])
+            elif op == RESUME:
+                await self.send({'op': INVALID_SESSION, 'd': False})
+            elif op == REQUEST_MEMBERS:
+                asyncio.create_task(self.send_member_chunks(payload['d']))
+        if self.server.sessions.get(self.shard_id) is self:
+            del self.server.sessions[self.shard_id]
+
+    async def identify(self, data):
+        self.shard_id, shard_count = data.get('shard', (0, 1))
+        self.intents = data.get('intents', 0)
+        self.session_id = f'session-{self.shard_id}-{time.monotonic_ns()}'
+        self.server.sessions[self.shard_id] = self
+        guilds = [guild for guild in self.server.guilds.values() if self.server.shard_for(guild.id) == self.shard_id]
+        await self.dispatch('READY', {
+            'v': 10,
+            'user': self.server.user_payload(BOT_ID),
+            'guilds': [{'id': str(guild.id), 'unavailable': True} for guild in guilds],
+            'session_id': self.session_id,
+            'resume_gateway_url': self.server.url.replace('http', 'ws', 1),
+            'shard': [self.shard_id, shard_count],
+            'application': {'id': str(BOT_ID), 'flags': 0}
+        })
+        for guild in guilds:
+            await self.dispatch('GUILD_CREATE', self.server.guild_payload(guild))
+        if len(self.server.sessions) == self.server.shard_count:
+            self.server.identified.set()
+
+    async def send_member_chunks(self, data):
+        guild = self.server.guilds.get(int(data['guild_id']))
+        if guild is None:
+            return
+        if data.get('user_ids'):
+            requested = [int(user_id) for user_id in data['user_ids']]
+            user_ids = [user_id for user_id in requested if user_id in guild.members]
+            not_found = [str(user_id) for user_id in requested if user_id not in guild.members]
+        else:
+            query = (data.get('query') or '').lower()
+            limit = data.get('limit') or len(guild.members)
+            user_ids = [
+                user_id for user_id in guild.members
+                if self.server.usernames.get(user_id, '').startswith(query)
+            ][:limit]
+            not_found = []
+        chunks = [user_ids[start:start + CHUNK_SIZE] for start in range(0, len(user_ids), CHUNK_SIZE)] or [[]]
+        for index, chunk in enumerate(chunks):
+            payload = {
+                'guild_id': str(guild.id),
+                'members': [self.server.member_payload(guild, user_id) for user_id in chunk],
+                'chunk_index': index,
+                'chunk_count': len(chunks),
+                'not_found': not_found if index == 0 else []
+            }
+            if data.get('nonce'):
+                payload['nonce'] = data['nonce']
+            await self.dispatch('GUILD_MEMBERS_CHUNK', payload)
@@ -0,0 +1,453 @@
+# In-process microbenchmarks
+# Each benchmark imports bot.py and times one code path directly, without a
+# gateway, comparing it where useful against the approach it replaced.
+#
+#     python -m benchmarks.micro storage --count 20000
+#     python -m benchmarks.micro dispatch --count 100000
+#     python -m benchmarks.micro applications --count 2000
+#     python -m benchmarks.micro responses
+#     python -m benchmarks.micro antispam --count 200000
+#     python -m benchmarks.micro prefix --guilds 10000 --count 200000
+#     python -m benchmarks.micro errors --rate 1000 --seconds 5
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import traceback
+import tracemalloc
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+import bot
+from benchmarks.replay import percentile, print_report
+
+def storage_benchmark(args):
+    # Write rate for a burst of warn cases: queued and flushed in batches,
+    # as log_case does, against one committed transaction per warn
+    sql = 'INSERT INTO cases (guild_id, action, user_id, moderator_id, reason, created) VALUES (?, ?, ?, ?, ?, ?)'
+    rows = [(1, 'warn', user_id, 2, 'benchmark', int(time.time())) for user_id in range(args.count)]
+    report = {'benchmark': 'storage', 'writes': args.count}
+    with tempfile.TemporaryDirectory(prefix='universx-micro-') as workdir:
+        storage = bot.Storage(os.path.join(workdir, 'batched.db'))
+        storage.open()
+
+        async def burst():
+            started = time.perf_counter()
+            for index, params in enumerate(rows, 1):
+                storage.queue(sql, params)
+                if index % args.batch == 0:
+                    await storage.flush()
+            await storage.flush()
+            return time.perf_counter() - started
+
+        seconds = asyncio.run(burst())
+        storage.close()
+        report['batched_writes_per_second'] = round(args.count / seconds)
+
+        storage = bot.Storage(os.path.join(workdir, 'unbatched.db'))
+        storage.open()
+        started = time.perf_counter()
+        for params in rows:
+            with storage.conn:
+                storage.conn.execute(sql, params)
+        seconds = time.perf_counter() - started
+        storage.close()
+        report['unbatched_writes_per_second'] = round(args.count / seconds)
+    return report
+
+def chat_message(user_id, content, guild, channel):
+    author = SimpleNamespace(id=user_id, bot=False, mention=f'<@{user_id}>')
+    return SimpleNamespace(
+        id=0, content=content, author=author, guild=guild, channel=channel,
+        mentions=[], _state=bot.bot._connection
+    )
+
+def dispatch_benchmark(args):
+    # Messages/sec for a no-prefix user's chat stream with one command in
+    # --command-every messages: on_message with the fast reject, against
+    # handing every message to process_commands as before
+    user_id = 1
+    guild = SimpleNamespace(id=1)
+    channel = SimpleNamespace(id=1)
+    commands = ['ping', 'p', 'serverinfo', 'userinfo', 'help']
+    chatter = ['anyone online?', 'gg', 'what version is the server on', 'brb', 'lol', 'the creeper blew up my house again']
+    stream = [
+        chat_message(user_id, commands[index % len(commands)] if index % args.command_every == 0 else chatter[index % len(chatter)], guild, channel)
+        for index in range(args.count)
+    ]
+
+    invoke = bot.bot.invoke
+
+    async def invoke_unknown(ctx):
+        # Commands themselves cost the same on both paths and are not run;
+        # unknown ones still raise and dispatch CommandNotFound
+        if ctx.command is None:
+            await invoke(ctx)
+
+    async def run():
+        async with bot.bot:
+            await bot.setup_cogs()
+            bot.bot._connection.user = SimpleNamespace(id=0, mention='<@0>')
+            bot.no_prefix_users.add(user_id)
+            bot.bot.invoke = invoke_unknown
+            return await time_paths()
+
+    async def time_paths():
+        timings = {}
+        for name, handle in (('fast_reject', bot.on_message), ('process_commands', bot.bot.process_commands)):
+            started = time.perf_counter()
+            for message in stream:
+                await handle(message)
+            # CommandNotFound is reported through command_error tasks
+            await asyncio.sleep(0)
+            timings[name] = time.perf_counter() - started
+        return timings
+
+    timings = asyncio.run(run())
+    return {
+        'benchmark': 'dispatch',
+        'messages': args.count,
+        'commands': len(range(0, args.count, args.command_every)),
+        'fast_reject_messages_per_second': round(args.count / timings['fast_reject']),
+        'process_commands_messages_per_second': round(args.count / timings['process_commands'])
+    }
+
+class QuietChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+    async def send(self, *args, **kwargs):
+        pass
+
+def applications_benchmark(args):
+    # --count applicants, each in its own channel, answer four questions
+    # while as many other members chat. The session dispatcher routes each
+    # message with one dict lookup; the per-question wait_for it replaced
+    # ran every pending applicant's check on every message.
+    applicants = [(user_id, QuietChannel(1000000 + user_id)) for user_id in range(args.count)]
+    stream = []
+    for _ in range(4):
+        for user_id, channel in applicants:
+            stream.append(chat_message(1000000 + user_id, 'gg', None, channel))
+            stream.append(chat_message(user_id, 'answer', None, channel))
+
+    async def run():
+        async with bot.bot:
+            cog = bot.Application(bot.bot)
+            for user_id, channel in applicants:
+                bot.application_sessions[(user_id, channel.id)] = {'answers': [], 'deadline': 0}
+                cog.reset_deadline((user_id, channel.id))
+            started = time.perf_counter()
+            for message in stream:
+                await cog.on_message(message)
+            sessions = time.perf_counter() - started
+            assert not bot.application_sessions
+
+            async def applicant(user_id, channel):
+                for _ in range(4):
+                    await bot.bot.wait_for('message', check=lambda m: m.author.id == user_id and m.channel == channel)
+
+            waiting = [asyncio.create_task(applicant(user_id, channel)) for user_id, channel in applicants]
+            await asyncio.sleep(0)
+            started = time.perf_counter()
+            for message in stream:
+                bot.bot.dispatch('message', message)
+                # Let the answered applicant register its next wait_for
+                await asyncio.sleep(0)
+            await asyncio.gather(*waiting)
+            return sessions, time.perf_counter() - started
+
+    bot.storage.queue = lambda sql, params=(): None
+    sessions, wait_for = asyncio.run(run())
+    return {
+        'benchmark': 'applications',
+        'applicants': args.count,
+        'messages': len(stream),
+        'sessions_messages_per_second': round(len(stream) / sessions),
+        'wait_for_messages_per_second': round(len(stream) / wait_for)
+    }
+
+def antispam_benchmark(args):
+    # The detector on a chat flood: --count messages from --users members
+    # over 20 channels of one guild with anti-spam on, one in 50 members
+    # spamming the same link across channels. The detector's clock advances
+    # as if messages arrived at --rate per second. Punishment is counted but
+    # not carried out, so only the detector itself is timed.
+    guild = SimpleNamespace(id=1)
+    channels = [SimpleNamespace(id=channel_id) for channel_id in range(1, 21)]
+    chatter = ['anyone online?', 'what version is the server on', 'who wants to build a castle near spawn', 'gg', 'brb']
+    spam = 'FREE NITRO at https://example.com/nitro'
+    stream = []
+    for index in range(args.count):
+        user_id, turn = index % args.users, index // args.users
+        # Each member's next message is a different line in the next channel
+        content = spam if user_id % 50 == 0 else chatter[(user_id + turn) % len(chatter)]
+        channel = channels[(user_id + turn) % len(channels)]
+        message = chat_message(user_id, content, guild, channel)
+        message.author.guild_permissions = SimpleNamespace(manage_messages=False)
+        stream.append(message)
+    detections = []
+
+    async def punish(member, channel_ids, reason, log_channel):
+        detections.append(reason)
+
+    clock = [0.0]
+
+    async def run():
+        cog = bot.AntiSpam(bot.bot)
+        cog.punish = punish
+        bot.antispam_guilds.add(guild.id)
+        started = time.perf_counter()
+        for message in stream:
+            clock[0] += 1 / args.rate
+            await cog.on_message(message)
+        return time.perf_counter() - started, len(cog.trackers)
+
+    real_time, real_member = bot.time, bot.discord.Member
+    bot.time = SimpleNamespace(monotonic=lambda: clock[0])
+    # Authors are plain namespaces here, so they count as members. Both
+    # patches are undone afterwards so later benchmarks see the real ones.
+    bot.discord.Member = SimpleNamespace
+    try:
+        seconds, trackers = asyncio.run(run())
+    finally:
+        bot.time, bot.discord.Member = real_time, real_member
+        bot.antispam_guilds.discard(guild.id)
+    per_message = seconds / args.count
+    return {
+        'benchmark': 'antispam',
+        'messages': args.count,
+        'messages_per_second': round(args.count / seconds),
+        'per_message_us': round(per_message * 1e6, 2),
+        f'cpu_share_at_{args.rate}_per_second': f'{per_message * args.rate:.1%}',
+        'detections': len(detections),
+        'tracked_users': trackers
+    }
+
+def prefix_benchmark(args):
+    # get_prefix for messages spread over --guilds guilds that all have
+    # settings, every other one with a custom prefix, against the hard-coded
+    # prefix it replaced
+    bot.guild_settings.load(
+        (guild_id, '!' if guild_id % 2 else None, '[]', None) for guild_id in range(args.guilds)
+    )
+    bot.bot._connection.user = SimpleNamespace(id=0)
+    channel = SimpleNamespace(id=1)
+    messages = [
+        chat_message(user_id, 'gg', SimpleNamespace(id=user_id % args.guilds), channel)
+        for user_id in range(args.count)
+    ]
+
+    def per_guild():
+        for message in messages:
+            bot.get_prefix(bot.bot, message)
+
+    def hard_coded():
+        for message in messages:
+            commands.when_mentioned_or(bot.DEFAULT_PREFIX)(bot.bot, message)
+
+    report = {'benchmark': 'prefix', 'guilds': args.guilds, 'messages': args.count}
+    timings = {'per_guild': [], 'hard_coded': []}
+    # Alternating best-of-three, so neither side gets the warm-up
+    for _ in range(3):
+        for name, function in (('per_guild', per_guild), ('hard_coded', hard_coded)):
+            started = time.perf_counter()
+            function()
+            timings[name].append(time.perf_counter() - started)
+    for name, seconds in timings.items():
+        report[f'{name}_ns'] = round(min(seconds) / args.count * 1e9)
+    return report
+
+def fail(depth, message):
+    # A few frames deep, like an error raised from inside a command
+    if depth:
+        fail(depth - 1, message)
+    raise RuntimeError(message)
+
+def errors_benchmark(args):
+    # Event-loop lag while commands fail at --rate errors per second for
+    # --seconds. "before" prints each traceback on the loop, as the re-raise
+    # into discord.py's default handler did; the pipeline goes through
+    # on_command_error, the sampler and the writer thread. The pipeline runs
+    # twice: one failing command repeating the same error, and every error
+    # distinct, which the sampler cannot drop.
+    devnull = open(os.devnull, 'w')
+    ctx = SimpleNamespace(
+        guild=SimpleNamespace(id=1), channel=SimpleNamespace(id=2),
+        command=SimpleNamespace(qualified_name='serverinfo'), author=SimpleNamespace(id=3)
+    )
+
+    def error(index, distinct):
+        try:
+            fail(8, f'lookup failed for {index}' if distinct else 'lookup failed')
+        except RuntimeError as exc:
+            return commands.CommandInvokeError(exc)
+
+    async def handle_before(exc):
+        original = exc.original
+        traceback.print_exception(type(original), original, original.__traceback__, file=devnull)
+
+    async def handle_pipeline(exc):
+        await bot.on_command_error(ctx, exc)
+
+    async def storm(handle, distinct):
+        lags = []
+        stop = asyncio.Event()
+
+        async def sample():
+            while not stop.is_set():
+                expected = time.perf_counter() + 0.005
+                await asyncio.sleep(0.005)
+                lags.append(max(0.0, time.perf_counter() - expected))
+
+        sampler = asyncio.create_task(sample())
+        per_tick = max(1, args.rate // 100)
+        index = 0
+        tick = time.perf_counter()
+        deadline = tick + args.seconds
+        while tick < deadline:
+            for _ in range(per_tick):
+                await handle(error(index, distinct))
+                index += 1
+            # Ticks are scheduled on the clock, so the rate holds even when
+            # handling the errors is slow
+            tick += 0.01
+            await asyncio.sleep(max(0.0, tick - time.perf_counter()))
+        stop.set()
+        await sampler
+        return index, lags
+
+    report = {'benchmark': 'errors', 'rate': args.rate, 'seconds': args.seconds}
+    runs = [('before', handle_before, True)]
+    stdout = sys.stdout
+    sys.stdout = devnull
+    try:
+        for name, handle, distinct in runs:
+            report[f'{name}_errors'], lags = asyncio.run(storm(handle, distinct))
+            report[f'{name}_lag_p99_ms'] = round(percentile(lags, 0.99) * 1000, 2)
+            report[f'{name}_lag_max_ms'] = round(max(lags, default=0.0) * 1000, 2)
+        listener = bot.setup_logging()
+        for name, distinct in (('pipeline_repeated', False), ('pipeline_distinct', True)):
+            report[f'{name}_errors'], lags = asyncio.run(storm(handle_pipeline, distinct))
+            report[f'{name}_lag_p99_ms'] = round(percentile(lags, 0.99) * 1000, 2)
+            report[f'{name}_lag_max_ms'] = round(max(lags, default=0.0) * 1000, 2)
+        listener.stop()
+    finally:
+        sys.stdout = stdout
+    report['pipeline_suppressed'] = bot.error_sampler.suppressed_total
+    return report
+
+def measure(function, count):
+    # Mean latency over count calls, and the peak memory allocated by one
+    started = time.perf_counter()
+    for _ in range(count):
+        function()
+    seconds = (time.perf_counter() - started) / count
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(seconds * 1e6, 2), peak
+
+def responses_benchmark(args):
+    # Help, profile badges and error embeds, each built per request as they
+    # used to be against the precomputed templates. Sending serializes an
+    # embed, so both sides include to_dict().
+    async def load():
+        async with bot.bot:
+            await bot.setup_cogs()
+            bot.build_help_template()
+
+    asyncio.run(load())
+    template = bot.help_template
+    prefix = bot.DEFAULT_PREFIX
+    badges = {'owner', 'staff', 'admin'}
+
+    def help_before():
+        embed = discord.Embed(
+            title=template.title,
+            description=f'Welcome to the help menu! Use `{prefix}help <command>` for detailed information.',
+            color=discord.Color.blue()
+        )
+        for field in template.fields:
+            embed.add_field(name=field.name, value=field.value, inline=False)
+        embed.set_footer(text=f'Use {prefix}help <command> to view detailed help for a command.')
+        return embed.to_dict()
+
+    def help_after():
+        embed = template.copy()
+        embed.description = f'Welcome to the help menu! Use `{prefix}help <command>` for detailed information.'
+        embed.set_footer(text=f'Use {prefix}help <command> to view detailed help for a command.')
+        return embed.to_dict()
+
+    def badges_before():
+        text = '\n'.join([bot.BADGES[badge] for badge in badges])
+        for emoji, custom in bot.BADGE_EMOJI.items():
+            text = text.replace(emoji, custom)
+        return text
+
+    def badges_after():
+        return '\n'.join(bot.BADGE_DISPLAY[badge] for badge in bot.BADGES if badge in badges)
+
+    def error_before():
+        return discord.Embed(
+            title='❌ Missing Permissions',
+            description='You do not have the required permissions to use this command.',
+            color=discord.Color.red()
+        ).to_dict()
+
+    def error_after():
+        return bot.MISSING_PERMISSIONS_EMBED.to_dict()
+
+    report = {'benchmark': 'responses', 'calls': args.count}
+    for name, before, after in (
+        ('help', help_before, help_after),
+        ('profile_badges', badges_before, badges_after),
+        ('error', error_before, error_after)
+    ):
+        for label, function in (('before', before), ('after', after)):
+            microseconds, peak = measure(function, args.count)
+            report[f'{name}_{label}_us'] = microseconds
+            report[f'{name}_{label}_peak_bytes'] = peak
+    return report
+
+BENCHMARKS = {
+    'storage': storage_benchmark,
+    'dispatch': dispatch_benchmark,
+    'applications': applications_benchmark,
+    'responses': responses_benchmark,
+    'antispam': antispam_benchmark,
+    'prefix': prefix_benchmark,
+    'errors': errors_benchmark
+}
+
+def parser():
+    parser = argparse.ArgumentParser(description='Microbenchmarks for bot.py code paths')
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--count', type=int, default=20000, help='operations to time')
+    parser.add_argument('--batch', type=int, default=500, help='storage: writes queued between flushes')
+    parser.add_argument('--guilds', type=int, default=10000, help='prefix: guilds with settings')
+    parser.add_argument('--seconds', type=float, default=5, help='errors: length of each storm')
+    parser.add_argument('--users', type=int, default=50000, help='antispam: members chatting')
+    parser.add_argument('--rate', type=int, default=None, help='antispam: simulated messages per second (10000); errors: errors per second (1000)')
+    parser.add_argument('--command-every', type=int, default=20, help='dispatch: one command per this many messages')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    return parser
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    if args.rate is None:
+        args.rate = 1000 if args.benchmark == 'errors' else 10000
+    report = BENCHMARKS[args.benchmark](args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == '__main__':
+    main()
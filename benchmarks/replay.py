@@ -0,0 +1,660 @@
+# Replay benchmarks
+# Each scenario builds a synthetic world on a FakeDiscord server, starts the
+# real bot against it in a subprocess (run_bot.py) and replays a synthetic
+# event stream through the gateway. Latency is measured from the moment an
+# event is sent to the moment the bot's reply reaches the fake REST API, so it
+# covers gateway parsing, dispatch, the command itself, the outbox and the
+# client-side rate limiter. Memory and CPU are read from /proc for the bot
+# process, and loop lag and startup phases from its /metrics endpoint.
+#
+#     python -m benchmarks.replay messages --count 2000
+#     python -m benchmarks.replay events --count 50000 --interactions-only
+#     python -m benchmarks.replay warns --count 2000 --rest-scale 0
+#     python -m benchmarks.replay startup --users 100000 --count 100 --profile lean
+#     python -m benchmarks.replay unban --bans 50000 --count 100
+#     python -m benchmarks.replay mass --action kick --count 1000
+#     python -m benchmarks.replay joins --joins 5000 --set ROLE_ASSIGN_RATE=50
+#     python -m benchmarks.replay applications --applicants 1000
+#     python -m benchmarks.replay messages --guilds 8 --shards 4 --processes 1 2 4
+#
+# --processes runs the scenario once per value, splitting --shards between
+# that many bot processes in cluster mode, to show how throughput scales
+# with cores.
+# REST rate limits are on by default (--rest-scale 0 turns them off) and the
+# bot's inbound command limiter is off unless --inbound-limits is given.
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import closing
+
+from aiohttp import ClientError, ClientSession
+
+from benchmarks.fakediscord import BOT_ID, OWNER_ID, FakeDiscord
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MESSAGE_ROUTE = '/channels/{channel_id}/messages'
+COMMANDS = ['u!ping', 'u!serverinfo', 'u!userinfo', 'u!profile', 'u!help']
+CHATTER = [
+    'anyone online?', 'gg', 'what version is the server on', 'brb', 'lol',
+    'who wants to build a castle near spawn', 'the creeper blew up my house again', 'ok'
+]
+MAX_CHANNELS_PER_GUILD = 400
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class BotProcess:
+    def __init__(self, url, workdir, args, env=None, name='bot', database='bot.db'):
+        self.url = url
+        self.workdir = workdir
+        self.args = args
+        self.env = env or {}
+        self.name = name
+        self.metrics_port = free_port()
+        self.log_path = os.path.join(workdir, f'{name}.log')
+        self.database_path = os.path.join(workdir, database)
+        self.process = None
+        self.started = None
+
+    async def start(self):
+        env = dict(os.environ)
+        env.update({
+            'DATABASE_PATH': self.database_path,
+            'METRICS_HOST': '127.0.0.1',
+            'METRICS_PORT': str(self.metrics_port),
+            'LOG_LEVEL': 'WARNING',
+            'PYTHONPATH': ROOT
+        })
+        env.update(self.env)
+        command = [sys.executable, '-m', 'benchmarks.run_bot', '--url', self.url]
+        for assignment in self.args.set:
+            command += ['--set', assignment]
+        if not self.args.inbound_limits:
+            command.append('--no-inbound-limits')
+        self.started = time.perf_counter()
+        with open(self.log_path, 'wb') as log_file:
+            self.process = await asyncio.create_subprocess_exec(
+                *command, cwd=self.workdir, env=env, stdout=log_file, stderr=log_file
+            )
+
+    async def metrics(self):
+        values = {}
+        async with ClientSession() as session:
+            async with session.get(f'http://127.0.0.1:{self.metrics_port}/metrics') as response:
+                text = await response.text()
+        for line in text.splitlines():
+            if line and not line.startswith('#'):
+                name, _, value = line.rpartition(' ')
+                values[name] = float(value)
+        return values
+
+    async def wait_ready(self, timeout):
+        # The ready phase gauge appears once on_ready has run
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if self.process.returncode is not None:
+                raise RuntimeError(f'{self.name} exited with {self.process.returncode}; see {self.log_path}')
+            try:
+                values = await self.metrics()
+            except (ClientError, OSError):
+                values = {}
+            if 'universx_startup_ready_seconds' in values:
+                return time.perf_counter() - self.started, values
+            await asyncio.sleep(0.05)
+        raise RuntimeError(f'{self.name} was not ready after {timeout}s; see {self.log_path}')
+
+    async def wait_for_rows(self, sql, expected, timeout):
+        # Polls the bot's database from outside; WAL mode lets this read
+        # alongside the bot's writer. Returns when the count was reached.
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            try:
+                with closing(sqlite3.connect(self.database_path, timeout=1)) as conn:
+                    count = conn.execute(sql).fetchone()[0]
+            except sqlite3.Error:
+                count = 0
+            if count >= expected:
+                return time.perf_counter()
+            await asyncio.sleep(0.05)
+        return None
+
+    def memory(self):
+        # Current and peak resident set size in MB
+        values = {}
+        with open(f'/proc/{self.process.pid}/status') as status:
+            for line in status:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'VmHWM'):
+                    values[key] = int(value.split()[0]) / 1024
+        return values.get('VmRSS', 0.0), values.get('VmHWM', 0.0)
+
+    def cpu_seconds(self):
+        with open(f'/proc/{self.process.pid}/stat') as stat:
+            fields = stat.read().rpartition(')')[2].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+    async def stop(self):
+        if self.process.returncode is not None:
+            return
+        self.process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.wait_for(self.process.wait(), 15)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+
+class Replies:
+    # Resolves a future once the bot has posted the expected number of
+    # messages to a channel
+    def __init__(self, fake):
+        self.waiters = {}
+        self.posted = 0
+        fake.listeners.append(self.on_request)
+
+    def on_request(self, method, route, match_info, response):
+        if method != 'POST' or route != MESSAGE_ROUTE:
+            return
+        self.posted += 1
+        channel_id = int(match_info['channel_id'])
+        waiter = self.waiters.get(channel_id)
+        if waiter is None:
+            return
+        waiter[0] -= 1
+        if waiter[0] == 0:
+            del self.waiters[channel_id]
+            if not waiter[1].done():
+                waiter[1].set_result(time.perf_counter())
+
+    def expect(self, channel_id, count=1):
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[channel_id] = [count, future]
+        return future
+
+    async def wait(self, channel_id, future, timeout):
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.waiters.pop(channel_id, None)
+            return None
+
+class Result:
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.operations = 0
+        self.failed = 0
+        self.seconds = 0.0
+        self.latencies = []
+        self.extra = {}
+
+    def report(self, fake, bot_processes, metrics, startup):
+        # Memory and CPU are summed over the cluster's processes
+        memory = [bot_process.memory() for bot_process in bot_processes]
+        rss = sum(current for current, _ in memory)
+        peak_rss = sum(peak for _, peak in memory)
+        report = {
+            'scenario': self.scenario,
+            'processes': len(bot_processes),
+            'operations': self.operations,
+            'failed': self.failed,
+            'seconds': round(self.seconds, 3),
+            'throughput_per_second': round(self.operations / self.seconds, 1) if self.seconds else 0.0,
+            'p50_ms': round(percentile(self.latencies, 0.5) * 1000, 2),
+            'p99_ms': round(percentile(self.latencies, 0.99) * 1000, 2),
+            'max_ms': round(max(self.latencies, default=0.0) * 1000, 2),
+            'rss_mb': round(rss, 1),
+            'peak_rss_mb': round(peak_rss, 1),
+            'cpu_seconds': round(sum(bot_process.cpu_seconds() for bot_process in bot_processes), 2),
+            'ready_seconds': round(startup, 2),
+            'loop_lag_max_ms': round(max(
+                values.get('universx_event_loop_lag_max_seconds', 0.0) for values in metrics
+            ) * 1000, 2),
+            'rest_requests': fake.requests,
+            'rest_rate_limited': fake.rate_limited
+        }
+        if fake.unknown_routes:
+            report['unknown_routes'] = fake.unknown_routes
+        report.update(self.extra)
+        return report
+
+def add_guilds(fake, channels, members):
+    # Spreads channels over as many guilds as Discord's channel limit needs
+    guilds = []
+    while channels > 0:
+        guilds.append(fake.add_guild(name=f'Replay {len(guilds)}', channels=min(channels, MAX_CHANNELS_PER_GUILD), members=members))
+        channels -= MAX_CHANNELS_PER_GUILD
+    return guilds
+
+def channel_ids(guilds):
+    return [(guild, int(channel['id'])) for guild in guilds for channel in guild.channels]
+
+def prepare_members(guilds):
+    # Ordinary members, i.e. neither the owner nor the bot
+    for guild in guilds:
+        guild.member_list = [user_id for user_id in guild.members if user_id not in (guild.owner_id, BOT_ID)]
+
+def pick_member(guild):
+    return random.choice(guild.member_list)
+
+# Scenarios
+# Each takes the parsed arguments and returns (world builder, driver).
+
+def messages_scenario(args):
+    # A chat flood: every channel runs one command at a time, preceded by
+    # --chatter ordinary messages, until --count commands have been answered
+    def build(fake):
+        guilds = []
+        for _ in range(args.guilds):
+            guilds.append(fake.add_guild(name=f'Replay {len(guilds)}', channels=args.channels, members=args.users))
+        prepare_members(guilds)
+        return guilds
+
+    async def drive(fake, guilds, replies, result, bot_process):
+        channels = channel_ids(guilds)
+        remaining = [args.count]
+
+        async def worker(guild, channel_id):
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                for _ in range(args.chatter):
+                    await fake.send_message(channel_id, pick_member(guild), random.choice(CHATTER))
+                future = replies.expect(channel_id)
+                sent = time.perf_counter()
+                await fake.send_message(channel_id, pick_member(guild), random.choice(COMMANDS))
+                answered = await replies.wait(channel_id, future, args.timeout)
+                if answered is None:
+                    result.failed += 1
+                else:
+                    result.operations += 1
+                    result.latencies.append(answered - sent)
+
+        await asyncio.gather(*(worker(guild, channel_id) for guild, channel_id in channels))
+        result.extra['chatter_messages'] = args.count * args.chatter
+
+    return build, drive
+
+def startup_scenario(args):
+    # One large guild: ready time and resident memory are the result, then
+    # --count userinfo lookups of random members show what on-demand member
+    # fetching costs in lean mode
+    def build(fake):
+        guild = fake.add_guild(name='Replay startup', channels=args.channels, members=args.users)
+        prepare_members([guild])
+        return guild
+
+    async def drive(fake, guild, replies, result, bot_process):
+        channel_id = int(guild.channels[0]['id'])
+        for _ in range(args.count):
+            user_id = pick_member(guild)
+            future = replies.expect(channel_id)
+            sent = time.perf_counter()
+            await fake.send_message(channel_id, OWNER_ID, f'u!userinfo <@{user_id}>', mentions=(user_id,))
+            answered = await replies.wait(channel_id, future, args.timeout)
+            if answered is None:
+                result.failed += 1
+            else:
+                result.operations += 1
+                result.latencies.append(answered - sent)
+        result.extra['members'] = len(guild.members)
+
+    return build, drive
+
+def unban_scenario(args):
+    # --count unbans by username, one after another, in a guild with --bans
+    # bans. The first builds the ban index from the paginated ban list; the
+    # rest are served from it.
+    def build(fake):
+        guild = fake.add_guild(name='Replay unban', channels=1)
+        guild.banned = fake.add_bans(guild, args.bans)
+        return guild
+
+    async def drive(fake, guild, replies, result, bot_process):
+        channel_id = int(guild.channels[0]['id'])
+        for user_id in random.sample(guild.banned, min(args.count, len(guild.banned))):
+            future = replies.expect(channel_id)
+            sent = time.perf_counter()
+            await fake.send_message(channel_id, OWNER_ID, f'u!unban {fake.usernames[user_id]}')
+            answered = await replies.wait(channel_id, future, args.timeout)
+            if answered is None or user_id in guild.bans:
+                result.failed += 1
+            else:
+                result.operations += 1
+                result.latencies.append(answered - sent)
+        if result.latencies:
+            result.extra['first_unban_ms'] = round(result.latencies[0] * 1000, 2)
+            result.extra['later_p50_ms'] = round(percentile(result.latencies[1:], 0.5) * 1000, 2)
+        result.extra['bans'] = args.bans
+
+    return build, drive
+
+def mass_scenario(args):
+    # One u!mass<action> against --count members, listed in an attached ID
+    # file as a moderator would after a raid. Latency runs until the summary
+    # embed; operations are the targets actually banned, kicked or timed out.
+    def build(fake):
+        guild = fake.add_guild(name='Replay mass', channels=1, members=max(args.users, args.count))
+        prepare_members([guild])
+        return guild
+
+    async def drive(fake, guild, replies, result, bot_process):
+        channel_id = int(guild.channels[0]['id'])
+        targets = guild.member_list[:args.count]
+        timed_out = set()
+
+        def on_request(method, route, match_info, response):
+            if method == 'PATCH' and route == '/guilds/{guild_id}/members/{user_id}' and response.status < 300:
+                timed_out.add(int(match_info['user_id']))
+
+        fake.listeners.append(on_request)
+        command = {'ban': 'u!massban', 'kick': 'u!masskick', 'timeout': 'u!masstimeout 10'}[args.action]
+        attachment = ('targets.txt', '\n'.join(map(str, targets)).encode())
+        future = replies.expect(channel_id)
+        sent = time.perf_counter()
+        await fake.send_message(channel_id, OWNER_ID, f'{command} reason: replay', attachments=[attachment])
+        answered = await replies.wait(channel_id, future, args.timeout)
+        if answered is None:
+            result.failed = len(targets)
+            return
+        result.seconds = answered - sent
+        result.latencies.append(result.seconds)
+        # Gateway events for the last bans and kicks may still be in flight
+        await asyncio.sleep(0.5)
+        if args.action == 'ban':
+            result.operations = sum(user_id in guild.bans for user_id in targets)
+        elif args.action == 'kick':
+            result.operations = sum(user_id not in guild.members for user_id in targets)
+        else:
+            result.operations = len(timed_out)
+        result.failed = len(targets) - result.operations
+
+    return build, drive
+
+def joins_scenario(args):
+    # A join storm into one guild with an auto-role: every join is sent as
+    # fast as the gateway takes it, latency runs until that member's role
+    # assignment reaches the REST API
+    def build(fake):
+        guild = fake.add_guild(name='Replay joins', channels=1, members=args.users)
+        guild.auto_role = fake.add_role(guild, 'Member')
+        return guild
+
+    async def drive(fake, guild, replies, result, bot_process):
+        channel_id = int(guild.channels[0]['id'])
+        future = replies.expect(channel_id)
+        await fake.send_message(channel_id, OWNER_ID, f'u!setautorole <@&{guild.auto_role}>')
+        if await replies.wait(channel_id, future, args.timeout) is None:
+            raise RuntimeError('setautorole was not answered')
+
+        joined = {}
+        assigned = asyncio.Event()
+        welcomes = []
+
+        def on_request(method, route, match_info, response):
+            if route == '/guilds/{guild_id}/members/{user_id}/roles/{role_id}' or (
+                method == 'PATCH' and route == '/guilds/{guild_id}/members/{user_id}'
+            ):
+                sent = joined.pop(int(match_info['user_id']), None)
+                if sent is not None:
+                    result.operations += 1
+                    result.latencies.append(time.perf_counter() - sent)
+                    if not joined:
+                        assigned.set()
+            elif method == 'POST' and route == MESSAGE_ROUTE:
+                welcomes.append(time.perf_counter())
+
+        fake.listeners.append(on_request)
+        started = time.perf_counter()
+        for user_id in fake.add_members(guild, args.joins, prefix='joiner'):
+            joined[user_id] = time.perf_counter()
+            await fake.member_join(guild, user_id)
+        result.extra['join_dispatch_seconds'] = round(time.perf_counter() - started, 3)
+        try:
+            await asyncio.wait_for(assigned.wait(), args.timeout)
+        except asyncio.TimeoutError:
+            result.failed = len(joined)
+        result.seconds = time.perf_counter() - started
+        # Let the last coalesced welcome go out
+        await asyncio.sleep(args.welcome_wait)
+        result.extra['welcome_messages'] = len(welcomes)
+
+    return build, drive
+
+def applications_scenario(args):
+    # Concurrent applicants, one per channel, each answering the four
+    # questions as soon as the next one arrives
+    def build(fake):
+        guilds = add_guilds(fake, args.applicants, members=args.applicants)
+        prepare_members(guilds)
+        return guilds
+
+    async def drive(fake, guilds, replies, result, bot_process):
+        channels = channel_ids(guilds)[:args.applicants]
+        members = iter([user_id for guild in guilds for user_id in guild.member_list])
+        completed = [0]
+
+        async def applicant(guild, channel_id, user_id):
+            # apply is answered with the intro and the first question
+            steps = [('u!apply', 2)] + [(f'answer {step}', 1) for step in range(4)]
+            for content, replies_expected in steps:
+                future = replies.expect(channel_id, replies_expected)
+                sent = time.perf_counter()
+                await fake.send_message(channel_id, user_id, content)
+                answered = await replies.wait(channel_id, future, args.timeout)
+                if answered is None:
+                    result.failed += 1
+                    return
+                result.operations += 1
+                result.latencies.append(answered - sent)
+            completed[0] += 1
+
+        await asyncio.gather(*(applicant(guild, channel_id, next(members)) for guild, channel_id in channels))
+        result.extra['applications_completed'] = completed[0]
+
+    return build, drive
+
+def events_scenario(args):
+    # --count ordinary chat messages over every channel, then one command
+    # mentioning the bot; once that is answered everything before it has been
+    # processed. The result is the bot's CPU time per 10k events, to compare
+    # runs with and without --interactions-only.
+    def build(fake):
+        guilds = []
+        for _ in range(args.guilds):
+            guilds.append(fake.add_guild(name=f'Replay {len(guilds)}', channels=args.channels, members=args.users))
+        prepare_members(guilds)
+        return guilds
+
+    async def drive(fake, guilds, replies, result, bot_process):
+        channels = channel_ids(guilds)
+        cpu_before = bot_process.cpu_seconds()
+        started = time.perf_counter()
+        for index in range(args.count):
+            guild, channel_id = channels[index % len(channels)]
+            await fake.send_message(channel_id, pick_member(guild), random.choice(CHATTER))
+        guild, channel_id = channels[0]
+        future = replies.expect(channel_id)
+        await fake.send_message(channel_id, OWNER_ID, f'<@{BOT_ID}> ping', mentions=(BOT_ID,))
+        if await replies.wait(channel_id, future, args.timeout) is None:
+            result.failed = args.count
+            return
+        result.seconds = time.perf_counter() - started
+        result.operations = args.count
+        cpu = bot_process.cpu_seconds() - cpu_before
+        result.extra['cpu_ms_per_10k_events'] = round(cpu * 1000 * 10000 / args.count, 1)
+
+    return build, drive
+
+def warns_scenario(args):
+    # A burst of warn commands from the owner, one at a time per channel.
+    # Besides reply latency it reports how long it took until every case was
+    # committed to the bot's SQLite database, i.e. the storage write rate.
+    # Targets rotate so nobody reaches an escalation threshold.
+    from bot import WARN_ESCALATION
+    warns_per_member = min(WARN_ESCALATION) - 1
+
+    def build(fake):
+        guild = fake.add_guild(name='Replay warns', channels=args.channels, members=max(args.users, -(-args.count // warns_per_member)))
+        prepare_members([guild])
+        return guild
+
+    async def drive(fake, guild, replies, result, bot_process):
+        targets = iter(guild.member_list * warns_per_member)
+        remaining = [args.count]
+        started = time.perf_counter()
+
+        async def worker(channel_id):
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                user_id = next(targets)
+                future = replies.expect(channel_id)
+                sent = time.perf_counter()
+                await fake.send_message(channel_id, OWNER_ID, f'u!warn <@{user_id}> replay', mentions=(user_id,))
+                answered = await replies.wait(channel_id, future, args.timeout)
+                if answered is None:
+                    result.failed += 1
+                else:
+                    result.operations += 1
+                    result.latencies.append(answered - sent)
+
+        await asyncio.gather(*(worker(int(channel['id'])) for channel in guild.channels))
+        result.seconds = time.perf_counter() - started
+        persisted = await bot_process.wait_for_rows(
+            "SELECT COUNT(*) FROM cases WHERE action = 'warn'", result.operations, args.timeout
+        )
+        if persisted is not None:
+            persisted -= started
+            result.extra['persisted_seconds'] = round(persisted, 3)
+            result.extra['persisted_per_second'] = round(result.operations / persisted, 1)
+        else:
+            result.extra['persisted_seconds'] = None
+
+    return build, drive
+
+SCENARIOS = {
+    'messages': messages_scenario,
+    'events': events_scenario,
+    'warns': warns_scenario,
+    'startup': startup_scenario,
+    'unban': unban_scenario,
+    'mass': mass_scenario,
+    'joins': joins_scenario,
+    'applications': applications_scenario
+}
+
+def bot_env(args, shard_ids=None):
+    env = {'MEMORY_PROFILE': args.profile}
+    if args.interactions_only:
+        env['INTERACTIONS_ONLY'] = '1'
+    if args.shards > 1 or shard_ids is not None:
+        env['SHARD_COUNT'] = str(args.shards)
+    if shard_ids is not None:
+        env['SHARD_IDS'] = ','.join(map(str, shard_ids))
+    return env
+
+def cluster_processes(url, workdir, args, processes):
+    # One process runs every shard itself; several split the shards between
+    # them in cluster mode and share one database, as in production
+    if processes == 1:
+        return [BotProcess(url, workdir, args, env=bot_env(args))]
+    if processes > args.shards:
+        raise ValueError(f'{processes} processes need at least as many shards, not {args.shards}')
+    return [
+        BotProcess(url, workdir, args, env=bot_env(args, range(index, args.shards, processes)), name=f'bot{index}')
+        for index in range(processes)
+    ]
+
+async def run(args, scenario=None, processes=1):
+    build, drive = (scenario or SCENARIOS[args.scenario])(args)
+    fake = FakeDiscord(shard_count=args.shards, rate_limit_scale=args.rest_scale, rest_latency=args.rest_latency / 1000)
+    world = build(fake)
+    await fake.start()
+    replies = Replies(fake)
+    result = Result(args.scenario)
+    with tempfile.TemporaryDirectory(prefix='universx-replay-') as workdir:
+        bot_processes = cluster_processes(fake.url, workdir, args, processes)
+        try:
+            for bot_process in bot_processes:
+                await bot_process.start()
+            startup = max([(await bot_process.wait_ready(args.timeout))[0] for bot_process in bot_processes])
+            cpu_before = sum(bot_process.cpu_seconds() for bot_process in bot_processes)
+            started = time.perf_counter()
+            await drive(fake, world, replies, result, bot_processes[0])
+            # A driver that waits for more than the replies sets its own time
+            result.seconds = result.seconds or time.perf_counter() - started
+            metrics = [await bot_process.metrics() for bot_process in bot_processes]
+            report = result.report(fake, bot_processes, metrics, startup)
+            report['cpu_seconds'] = round(sum(bot_process.cpu_seconds() for bot_process in bot_processes) - cpu_before, 2)
+        except Exception:
+            if args.keep_logs:
+                for bot_process in bot_processes:
+                    print(open(bot_process.log_path).read(), file=sys.stderr)
+            raise
+        finally:
+            for bot_process in bot_processes:
+                if bot_process.process is not None:
+                    await bot_process.stop()
+            await fake.close()
+        if args.keep_logs:
+            report['log'] = ''.join(open(bot_process.log_path).read() for bot_process in bot_processes)
+    return report
+
+def print_report(report):
+    width = max(len(key) for key in report)
+    for key, value in report.items():
+        if key != 'log':
+            print(f'{key:<{width}}  {value}')
+
+def parser():
+    parser = argparse.ArgumentParser(description='Replay synthetic Discord traffic against the real bot')
+    parser.add_argument('scenario', choices=sorted(SCENARIOS))
+    parser.add_argument('--count', type=int, default=2000, help='messages, warns, startup, unban: commands to answer; events: messages; mass: targets')
+    parser.add_argument('--chatter', type=int, default=4, help='messages: ordinary messages per command')
+    parser.add_argument('--guilds', type=int, default=4, help='messages, events: guilds')
+    parser.add_argument('--channels', type=int, default=50, help='messages, events, warns: channels per guild')
+    parser.add_argument('--users', type=int, default=2000, help='members per guild')
+    parser.add_argument('--bans', type=int, default=50000, help='unban: banned users in the guild')
+    parser.add_argument('--action', choices=['ban', 'kick', 'timeout'], default='ban', help='mass: the bulk command to run')
+    parser.add_argument('--joins', type=int, default=500, help='joins: members joining')
+    parser.add_argument('--welcome-wait', type=float, default=11, help='joins: seconds to wait for the last welcome')
+    parser.add_argument('--applicants', type=int, default=1000, help='applications: concurrent applicants')
+    parser.add_argument('--shards', type=int, default=1, help='shards the fake gateway asks for')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1], help='bot processes sharing the shards; several values run the scenario once each')
+    parser.add_argument('--profile', choices=['full', 'lean'], default='full', help='MEMORY_PROFILE for the bot')
+    parser.add_argument('--interactions-only', action='store_true', help='run the bot with INTERACTIONS_ONLY=1')
+    parser.add_argument('--inbound-limits', action='store_true', help="keep the bot's inbound command rate limits")
+    parser.add_argument('--rest-scale', type=float, default=1.0, help='multiply REST rate limits; 0 disables them')
+    parser.add_argument('--rest-latency', type=float, default=0.0, help='milliseconds added to every REST call')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', help='override a bot.py setting')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds to wait for a reply or for ready')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--keep-logs', action='store_true', help="include the bot's log output")
+    return parser
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    reports = [asyncio.run(run(args, processes=processes)) for processes in args.processes]
+    if args.json:
+        print(json.dumps(reports[0] if len(reports) == 1 else reports, indent=2))
+        return
+    for index, report in enumerate(reports):
+        if index:
+            print()
+        print_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# Runs bot.py unmodified against a FakeDiscord server instead of Discord.
+# discord.py's REST base URL and default gateway are pointed at the server
+# before the bot module is imported; everything else, including login,
+# IDENTIFY, setup_hook, the cogs and their loops, runs as in production.
+#
+#     python -m benchmarks.run_bot --url http://127.0.0.1:8080 [--set NAME=VALUE ...]
+#
+# --set overrides a module-level setting of bot.py after import, e.g.
+# --set ROLE_ASSIGN_RATE=50. --no-inbound-limits lifts the command rate
+# limiter so a benchmark measures the bot rather than its throttling.
+import argparse
+import ast
+import os
+import sys
+
+import yarl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the bot against a fake Discord server')
+    parser.add_argument('--url', required=True, help='base URL of the FakeDiscord server')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE', help='override a bot.py setting')
+    parser.add_argument('--no-inbound-limits', action='store_true', help='disable the inbound command rate limiter')
+    args = parser.parse_args()
+
+    import discord
+    from discord.gateway import DiscordWebSocket
+
+    discord.http.Route.BASE = args.url + '/api/v10'
+    DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(args.url.replace('http', 'ws', 1) + '/gateway')
+    os.environ.setdefault('DISCORD_BOT_TOKEN', 'replay')
+
+    import bot
+
+    for assignment in args.set:
+        name, _, value = assignment.partition('=')
+        if not hasattr(bot, name):
+            parser.error(f'bot.py has no setting named {name}')
+        setattr(bot, name, ast.literal_eval(value))
+    if args.no_inbound_limits:
+        unlimited = (10 ** 9, 1)
+        bot.user_limiter = bot.RateLimiter(*unlimited)
+        bot.channel_limiter = bot.RateLimiter(*unlimited)
+        bot.guild_limiter = bot.RateLimiter(*unlimited)
+        bot.command_limiters = {}
+    bot.main()
+
+if __name__ == '__main__':
+    main()
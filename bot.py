@@ -1,30 +1,267 @@
+import time
+
+# Startup phase timings are measured from here
+STARTED_AT = time.perf_counter()
+
 import discord
-from discord.ext import commands
+from discord import app_commands
+from discord.ext import commands, tasks
+from aiohttp import web
+from array import array
 import asyncio
+import bisect
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import heapq
+from itertools import count, groupby
 import json
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import math
 from dotenv import load_dotenv
 import os
+import queue
+import re
+import sqlite3
+import sys
+import traceback
+from collections import OrderedDict, deque
+from typing import Optional
 
 # Load environment variables
 load_dotenv()
 
-intents = discord.Intents.all()
+# Logging
+# Records are handed to a queue on the calling thread and formatted and
+# written as JSON lines by a background thread, so tracebacks are never
+# rendered on the event loop. The calling thread only fills in the message
+# and snapshots the exception, so nothing read later can have changed since
+# the call. Repeats of the same exception are sampled:
+# the first LOG_SAMPLE_BURST per LOG_SAMPLE_WINDOW seconds are written and
+# the rest are only counted.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_WINDOW = 60  # seconds
+LOG_SAMPLE_BURST = 3
+LOG_CONTEXT_FIELDS = ('guild_id', 'channel_id', 'command', 'user_id', 'suppressed')
+
+log = logging.getLogger('universx')
+
+class DeferredQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The default also renders the traceback here. Only the frame
+        # summaries and the exception's text are captured; source lines are
+        # read and the traceback rendered on the writer thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_snapshot = traceback.TracebackException(*record.exc_info, lookup_lines=False)
+            record.exc_info = None
+        return record
+
+class ErrorSampler(logging.Filter):
+    def __init__(self):
+        super().__init__()
+        self.seen = {}
+        self.suppressed_total = 0
+
+    def filter(self, record):
+        if not record.exc_info or record.exc_info[1] is None:
+            return True
+        error = record.exc_info[1]
+        key = (record.name, getattr(record, 'command', None), type(error).__name__, str(error)[:200])
+        now = time.monotonic()
+        entry = self.seen.get(key)
+        if entry is None or now - entry[0] >= LOG_SAMPLE_WINDOW:
+            if len(self.seen) > 1000:
+                self.seen.clear()
+            # Report how many repeats the previous window dropped
+            record.suppressed = entry[2] if entry else 0
+            self.seen[key] = [now, 1, 0]
+            return True
+        entry[1] += 1
+        if entry[1] <= LOG_SAMPLE_BURST:
+            return True
+        entry[2] += 1
+        self.suppressed_total += 1
+        return False
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in LOG_CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        exc_snapshot = getattr(record, 'exc_snapshot', None)
+        if exc_snapshot is not None:
+            entry['error'] = ''.join(exc_snapshot.format()).rstrip('\n')
+        elif record.exc_info:
+            entry['error'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+error_sampler = ErrorSampler()
+
+def setup_logging():
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(error_sampler)
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(queue_handler)
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
+
+def log_context(ctx):
+    return {
+        'guild_id': ctx.guild.id if ctx.guild else None,
+        'channel_id': ctx.channel.id if ctx.channel else None,
+        'command': ctx.command.qualified_name if ctx.command else None,
+        'user_id': ctx.author.id
+    }
+
+# Memory profile: 'full' keeps every intent and chunks every member at startup.
+# 'lean' drops presences, keeps no member cache and fetches members on demand,
+# backed by a bounded LRU of recently active members.
+MEMORY_PROFILE = os.getenv('MEMORY_PROFILE', 'full').lower()
+LEAN_MODE = MEMORY_PROFILE == 'lean'
+MEMBER_LRU_SIZE = int(os.getenv('MEMBER_LRU_SIZE', '10000'))
+
+if LEAN_MODE:
+    intents = discord.Intents.default()
+    intents.members = True
+    intents.message_content = True
+    member_cache_flags = discord.MemberCacheFlags.none()
+else:
+    intents = discord.Intents.all()
+    member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+
+# Interactions-only mode: commands are used as slash commands, so the bot no
+# longer needs the message content intent or to run every message through
+# the prefix parser. Messages that mention the bot still carry content and
+# are still processed, so owner commands such as sync stay reachable.
+INTERACTIONS_ONLY = os.getenv('INTERACTIONS_ONLY', '').lower() in ('1', 'true', 'yes')
+if INTERACTIONS_ONLY:
+    intents.message_content = False
 
 # Store users with no-prefix permission
 no_prefix_users = set()
 
+DEFAULT_PREFIX = 'u!'
+
 # Custom prefix handler
 def get_prefix(bot, message):
+    if INTERACTIONS_ONLY:
+        return commands.when_mentioned(bot, message)
     if message.author.id in no_prefix_users:
-        return commands.when_mentioned_or('')(bot, message)
-    return commands.when_mentioned_or('u!')(bot, message)
+        # The guild prefix goes first so `u!ping` is stripped like for anyone else
+        return commands.when_mentioned_or(guild_settings.prefix(message.guild), '')(bot, message)
+    return commands.when_mentioned_or(guild_settings.prefix(message.guild))(bot, message)
 
-bot = commands.Bot(command_prefix=get_prefix, intents=intents, owner_id=1101467683083530331)
+# Cluster mode: run several processes, each owning a range of shards, e.g.
+# SHARD_COUNT=4 SHARD_IDS=0,1 and SHARD_COUNT=4 SHARD_IDS=2,3. Processes share
+# DATABASE_PATH and pick up each other's owner changes through it.
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv('SHARD_IDS').split(',')] if os.getenv('SHARD_IDS') else None
+CLUSTER_MODE = SHARD_IDS is not None
+
+bot = commands.AutoShardedBot(
+    command_prefix=get_prefix,
+    intents=intents,
+    owner_id=1101467683083530331,
+    activity=discord.Game(name=f'Universx MC | {DEFAULT_PREFIX}help'),
+    member_cache_flags=member_cache_flags,
+    chunk_guilds_at_startup=not LEAN_MODE,
+    shard_count=SHARD_COUNT,
+    shard_ids=SHARD_IDS
+)
+
+# Recently active members, used in place of the member cache in lean mode
+class RecentMembers:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.members = OrderedDict()
+
+    def remember(self, member):
+        key = (member.guild.id, member.id)
+        self.members[key] = member
+        self.members.move_to_end(key)
+        if len(self.members) > self.maxsize:
+            self.members.popitem(last=False)
+
+    def get(self, guild_id, user_id):
+        member = self.members.get((guild_id, user_id))
+        if member is not None:
+            self.members.move_to_end((guild_id, user_id))
+        return member
+
+    def forget(self, guild_id, user_id):
+        self.members.pop((guild_id, user_id), None)
+
+recent_members = RecentMembers(MEMBER_LRU_SIZE)
+
+# Also a user-option transformer, so hybrid commands keep the member picker
+# as slash commands; Discord resolves the member there.
+class CachedMember(commands.MemberConverter, app_commands.Transformer):
+    @property
+    def type(self):
+        return discord.AppCommandOptionType.user
+
+    async def transform(self, interaction, value):
+        return value
+
+    async def convert(self, ctx, argument):
+        if LEAN_MODE and ctx.guild is not None:
+            match = self._get_id_match(argument) or re.match(r'<@!?([0-9]{15,20})>$', argument)
+            if match:
+                member = recent_members.get(ctx.guild.id, int(match.group(1)))
+                if member is not None:
+                    return member
+        member = await super().convert(ctx, argument)
+        if LEAN_MODE:
+            recent_members.remember(member)
+        return member
+
+# The raw event fires even when the member was never cached, which in lean
+# mode is the usual case
+@bot.event
+async def on_raw_member_remove(payload):
+    recent_members.forget(payload.guild_id, payload.user.id)
+
+# Fast-reject for no-prefix users: their ordinary chat would otherwise be
+# parsed into a Context and raise CommandNotFound on every message.
+# bot.all_commands already maps every command name and alias to its command
+# and is kept current by add_cog/add_command, so it doubles as the index.
+def is_command_message(message):
+    content = message.content
+    if content.startswith(guild_settings.prefix(message.guild)):
+        return True
+    if bot.user is not None and content.startswith((f'<@{bot.user.id}>', f'<@!{bot.user.id}>')):
+        return True
+    first_token = (content.split(maxsplit=1) or [''])[0]
+    return first_token in bot.all_commands
+
+@bot.event
+async def on_message(message):
+    if message.author.bot:
+        return
+    if LEAN_MODE and isinstance(message.author, discord.Member):
+        recent_members.remember(message.author)
+    if INTERACTIONS_ONLY and bot.user not in message.mentions:
+        return
+    if message.author.id in no_prefix_users and not is_command_message(message):
+        return
+    await bot.process_commands(message)
 
 # Store user data
 user_data = {
-    'warnings': {},
     'badges': {},
     'no_prefix': set()
 }
@@ -37,23 +274,39 @@ BADGES = {
     'no_badge': '❌ No Badge'
 }
 
+# Badge text as shown on profiles, with the server's custom emoji swapped in
+BADGE_EMOJI = {
+    '👑': '<:owner1:1389180694814654474>',
+    '🛡️': '<a:staff112:1389180853195771906>',
+    '⚡': '<:admin1:1389181036755161221>',
+    '❌': '<a:nope1:1389178762020520109>'
+}
+BADGE_DISPLAY = {}
+for badge, text in BADGES.items():
+    emoji, _, label = text.partition(' ')
+    BADGE_DISPLAY[badge] = f'{BADGE_EMOJI.get(emoji, emoji)} {label}'
+NO_PREFIX_ENABLED = '<:tick1:1389181551358509077> Enabled'
+NO_PREFIX_DISABLED = '<a:nope1:1389178762020520109> Disabled'
+
 # No-prefix permission commands
-@bot.command(name='grant_no_prefix')
+@bot.hybrid_command(name='grant_no_prefix', help='Allow user to run commands without prefix')
 @commands.is_owner()
 async def grant_no_prefix(ctx, member: discord.Member):
     no_prefix_users.add(member.id)
+    storage.queue('INSERT OR IGNORE INTO no_prefix_users (user_id) VALUES (?)', (member.id,))
     await ctx.send(f'Granted no-prefix permission to {member.mention}')
 
-@bot.command(name='revoke_no_prefix')
+@bot.hybrid_command(name='revoke_no_prefix', help='Remove no-prefix permission')
 @commands.is_owner()
 async def revoke_no_prefix(ctx, member: discord.Member):
     if member.id in no_prefix_users:
         no_prefix_users.remove(member.id)
+        storage.queue('DELETE FROM no_prefix_users WHERE user_id = ?', (member.id,))
         await ctx.send(f'Revoked no-prefix permission from {member.mention}')
     else:
         await ctx.send(f'{member.mention} does not have no-prefix permission')
 
-@bot.command(name='list_no_prefix')
+@bot.hybrid_command(name='list_no_prefix', help='List users with no-prefix access')
 @commands.is_owner()
 async def list_no_prefix(ctx):
     if not no_prefix_users:
@@ -62,93 +315,475 @@ async def list_no_prefix(ctx):
     users = ['\n'.join([f'<@{user_id}>' for user_id in no_prefix_users])]
     await ctx.send(f'Users with no-prefix permission:\n{users}')
 
-# Store auto-role configuration
-auto_roles = {}
+@bot.command(name='sync', help='Register slash commands with Discord')
+@commands.is_owner()
+async def sync(ctx):
+    synced = await bot.tree.sync()
+    await ctx.send(f'Synced {len(synced)} slash commands')
+
+# Per-guild settings: custom prefix, auto-roles and welcome channel override.
+# The dict is the cache get_prefix reads on every message; changes update it
+# in place and are persisted through the write-behind storage.
+class GuildSettings:
+    def __init__(self):
+        self.guilds = {}
+
+    def get(self, guild_id):
+        return self.guilds.get(guild_id) or {'prefix': None, 'auto_roles': [], 'welcome_channel_id': None}
+
+    def prefix(self, guild):
+        settings = self.guilds.get(guild.id) if guild is not None else None
+        return (settings and settings['prefix']) or DEFAULT_PREFIX
+
+    def load(self, rows):
+        self.guilds = {
+            guild_id: {'prefix': prefix, 'auto_roles': json.loads(role_ids), 'welcome_channel_id': welcome_channel_id}
+            for guild_id, prefix, role_ids, welcome_channel_id in rows
+        }
+
+    def update(self, guild_id, **changes):
+        settings = self.guilds[guild_id] = {**self.get(guild_id), **changes}
+        storage.queue(
+            'INSERT OR REPLACE INTO guild_settings (guild_id, prefix, auto_roles, welcome_channel_id) VALUES (?, ?, ?, ?)',
+            (guild_id, settings['prefix'], json.dumps(settings['auto_roles']), settings['welcome_channel_id'])
+        )
+
+guild_settings = GuildSettings()
 
 # Store user application data
 applications = {}
 
+# In-progress applications, keyed by (user ID, channel ID)
+application_sessions = {}
 
-@bot.event
-async def on_ready():
-    print(f'{bot.user} has connected to Discord!')
-    await bot.change_presence(activity=discord.Game(name='Universx MC | u!help'))
+# Guilds with the anti-spam detector enabled
+antispam_guilds = set()
 
-# Custom Help Command
-class CustomHelpCommand(commands.HelpCommand):
-    def get_command_signature(self, command):
-        return f'{self.context.clean_prefix}{command.qualified_name} {command.signature}'
+# Saved activity series by guild ID, restored when the guild becomes available
+stored_guild_stats = {}
 
-    async def send_bot_help(self, mapping):
-        embed = discord.Embed(
-            title='📚 Universx MC Bot Help Menu',
-            description='Welcome to the help menu! Use `u!help <command>` for detailed information.',
-            color=discord.Color.blue()
-        )
+# Moderation case log
+# Every moderation action is appended to the cases table as a compact row
+# (integer IDs, epoch timestamp). Warn counts per (guild ID, user ID) are kept
+# in memory and updated as warnings are logged. Legacy warnings, migrated
+# under guild 0, are listed everywhere but never counted towards escalation.
+warn_counts = {}
 
-        embed.add_field(
-            name=':shield: Moderation',
-            value=(
-                '`kick` – Kick a member\n'
-                '`ban` – Ban a member\n'
-                '`unban` – Unban a user\n'
-                '`clear` – Purge messages\n'
-                '`warn` – Warn a user'
-            ),
-            inline=False
-        )
+def log_case(guild_id, action, user_id, moderator_id, reason=None):
+    storage.queue(
+        'INSERT INTO cases (guild_id, action, user_id, moderator_id, reason, created) VALUES (?, ?, ?, ?, ?, ?)',
+        (guild_id, action, user_id, moderator_id, reason, int(time.time()))
+    )
+    if action == 'warn':
+        warn_counts[(guild_id, user_id)] = warn_counts.get((guild_id, user_id), 0) + 1
 
-        embed.add_field(
-            name=':performing_arts: Auto-Role',
-            value=(
-                '`setautorole` – Set role for new members'
-            ),
-            inline=False
-        )
+def get_warn_count(guild_id, user_id):
+    return warn_counts.get((guild_id, user_id), 0)
 
-        embed.add_field(
-            name=':memo: Application',
-            value=(
-                '`apply` – Start an application\n'
-                '`reviewapp` – Review a user\'s application'
-            ),
-            inline=False
-        )
+# Persistent storage
+# The dicts and sets above stay the in-memory cache that commands read from.
+# Writes are queued and flushed to SQLite in batches on a single worker thread,
+# so commands never wait on disk I/O.
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'universx.db')
+STORAGE_MAX_RETRIES = 3  # failed flushes of the same batch before bad statements are dropped
 
-        embed.add_field(
-            name=':wrench: Utility',
-            value=(
-                '`ping` – Show latency\n'
-                '`serverinfo` – Server stats\n'
-                '`userinfo` – User info'
-            ),
-            inline=False
-        )
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    moderator_id INTEGER NOT NULL,
+    reason TEXT,
+    created INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cases_by_user ON cases (user_id, id);
+CREATE INDEX IF NOT EXISTS cases_by_moderator ON cases (moderator_id, id);
+CREATE TABLE IF NOT EXISTS badges (
+    user_id INTEGER NOT NULL,
+    badge TEXT NOT NULL,
+    PRIMARY KEY (user_id, badge)
+);
+CREATE TABLE IF NOT EXISTS guild_settings (
+    guild_id INTEGER PRIMARY KEY,
+    prefix TEXT,
+    auto_roles TEXT NOT NULL,
+    welcome_channel_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS applications (
+    user_id INTEGER PRIMARY KEY,
+    answers TEXT NOT NULL,
+    time TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS application_sessions (
+    user_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    answers TEXT NOT NULL,
+    deadline REAL NOT NULL,
+    PRIMARY KEY (user_id, channel_id)
+);
+CREATE TABLE IF NOT EXISTS no_prefix_users (
+    user_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS antispam_guilds (
+    guild_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS guild_stats (
+    guild_id INTEGER NOT NULL,
+    series TEXT NOT NULL,
+    current INTEGER NOT NULL,
+    counts BLOB NOT NULL,
+    PRIMARY KEY (guild_id, series)
+);
+'''
 
-        embed.add_field(
-            name=':bust_in_silhouette: Profile',
-            value=(
-                '`profile` / `p` – View profile\n'
-                '`grant_badge` – Grant badge (Owner)\n'
-                '`revoke_badge` – Revoke badge (Owner)'
-            ),
-            inline=False
+class Storage:
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.pending = []
+        self.data_version = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='storage')
+        self.flush_lock = asyncio.Lock()
+        self.failed_flushes = 0
+
+    def open(self):
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.migrate_warnings()
+        self.migrate_auto_roles()
+        self.data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def migrate_warnings(self):
+        # Warnings used to live in their own table without a guild; they move
+        # into the case log under guild 0, which is shown in every guild.
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'warnings'").fetchone():
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO cases (guild_id, action, user_id, moderator_id, reason, created) "
+                    "SELECT 0, 'warn', user_id, 0, reason, CAST(strftime('%s', time) AS INTEGER) FROM warnings ORDER BY id"
+                )
+                self.conn.execute('DROP TABLE warnings')
+
+    def migrate_auto_roles(self):
+        # Single auto-roles per guild move into guild settings
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'auto_roles'").fetchone():
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO guild_settings (guild_id, prefix, auto_roles, welcome_channel_id) "
+                    "SELECT guild_id, NULL, '[' || role_id || ']', NULL FROM auto_roles"
+                )
+                self.conn.execute('DROP TABLE auto_roles')
+
+    def load(self):
+        for guild_id, user_id, warn_count in self.conn.execute(
+            "SELECT guild_id, user_id, COUNT(*) FROM cases "
+            "WHERE action = 'warn' AND guild_id != 0 GROUP BY guild_id, user_id"
+        ):
+            warn_counts[(guild_id, user_id)] = warn_count
+        for user_id, badge in self.conn.execute('SELECT user_id, badge FROM badges'):
+            user_data['badges'].setdefault(user_id, set()).add(badge)
+        guild_settings.load(self.conn.execute(
+            'SELECT guild_id, prefix, auto_roles, welcome_channel_id FROM guild_settings'
+        ))
+        for user_id, answers, time, status in self.conn.execute('SELECT user_id, answers, time, status FROM applications'):
+            applications[user_id] = {'answers': json.loads(answers), 'time': time, 'status': status}
+        for user_id, channel_id, answers, deadline in self.conn.execute(
+            'SELECT user_id, channel_id, answers, deadline FROM application_sessions'
+        ):
+            application_sessions[(user_id, channel_id)] = {'answers': json.loads(answers), 'deadline': deadline}
+        for (user_id,) in self.conn.execute('SELECT user_id FROM no_prefix_users'):
+            no_prefix_users.add(user_id)
+        for (guild_id,) in self.conn.execute('SELECT guild_id FROM antispam_guilds'):
+            antispam_guilds.add(guild_id)
+        for guild_id, series, current, counts in self.conn.execute(
+            'SELECT guild_id, series, current, counts FROM guild_stats'
+        ):
+            stored_guild_stats.setdefault(guild_id, {})[series] = (current, counts)
+
+    def queue(self, sql, params=()):
+        self.pending.append((sql, params))
+
+    def _write(self, batch):
+        # One transaction per batch; consecutive statements of the same shape
+        # are coalesced into a single executemany call.
+        with self.conn:
+            for sql, group in groupby(batch, key=lambda item: item[0]):
+                self.conn.executemany(sql, [params for _, params in group])
+
+    def _write_each(self, batch):
+        # Last resort for a batch that keeps failing: every statement gets its
+        # own transaction, and the ones that still fail are returned.
+        failed = []
+        for sql, params in batch:
+            try:
+                with self.conn:
+                    self.conn.execute(sql, params)
+            except sqlite3.Error as e:
+                failed.append((sql, params, e))
+        return failed
+
+    async def flush(self):
+        # The lock keeps a retried batch ahead of anything a concurrent
+        # flush (or fetch) would otherwise write first.
+        async with self.flush_lock:
+            if not self.pending:
+                return
+            batch, self.pending = self.pending, []
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self.executor, self._write, batch)
+            except sqlite3.Error:
+                self.failed_flushes += 1
+                if self.failed_flushes < STORAGE_MAX_RETRIES:
+                    # The transaction rolled back; put the batch back in front
+                    # of anything queued since, so it is retried next flush.
+                    log.error('Storage flush failed; %d statements will be retried', len(batch), exc_info=True)
+                    self.pending[:0] = batch
+                    return
+                for sql, params, e in await loop.run_in_executor(self.executor, self._write_each, batch):
+                    log.error('Dropping statement after %d failed flushes: %s %r (%s)', self.failed_flushes, sql, params, e)
+            self.failed_flushes = 0
+
+    async def fetch(self, sql, params=()):
+        # Queued writes are flushed first; the single worker thread runs them
+        # in order, so reads always see them.
+        await self.flush()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, lambda: self.conn.execute(sql, params).fetchall()
         )
 
-        embed.add_field(
-            name=':crown: Owner Only',
-            value=(
-                '`grant_no_prefix` – Allow user to run commands without prefix\n'
-                '`revoke_no_prefix` – Remove no-prefix permission\n'
-                '`list_no_prefix` – List users with no-prefix access'
-            ),
-            inline=False
+    def _read_shared_state(self):
+        # data_version only changes when another connection (i.e. another
+        # cluster process) has committed since we last looked.
+        version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+        if version == self.data_version:
+            return None
+        self.data_version = version
+        return (
+            self.conn.execute('SELECT user_id, badge FROM badges').fetchall(),
+            self.conn.execute('SELECT guild_id, prefix, auto_roles, welcome_channel_id FROM guild_settings').fetchall(),
+            self.conn.execute('SELECT user_id FROM no_prefix_users').fetchall()
         )
 
-        embed.set_footer(text='Use u!help <command> to view detailed help for a command.')
+    async def sync_shared_state(self):
+        try:
+            state = await asyncio.get_running_loop().run_in_executor(self.executor, self._read_shared_state)
+        except sqlite3.Error:
+            log.error('Reading shared state failed', exc_info=True)
+            return
+        if state is None:
+            return
+        if self.pending:
+            # Local writes are still queued; reload again after they land
+            self.data_version = None
+            return
+        badges, settings, no_prefix = state
+        user_data['badges'].clear()
+        for user_id, badge in badges:
+            user_data['badges'].setdefault(user_id, set()).add(badge)
+        guild_settings.load(settings)
+        no_prefix_users.clear()
+        no_prefix_users.update(user_id for (user_id,) in no_prefix)
+
+    def close(self):
+        # Called once the event loop has stopped, so this may block
+        if self.conn is None:
+            return
+        self.executor.shutdown(wait=True)
+        if self.pending:
+            self._write(self.pending)
+            self.pending = []
+        self.conn.close()
+
+storage = Storage(DATABASE_PATH)
+
+@tasks.loop(seconds=2)
+async def flush_storage():
+    await storage.flush()
+    if CLUSTER_MODE:
+        await storage.sync_shared_state()
+
+# Outbound message scheduler
+# Sends are queued per channel and drained in priority order, so moderation
+# replies go out ahead of informational embeds waiting on the same channel.
+# Discord's per-route rate-limit headers are honoured by discord.py's HTTP
+# client underneath each send. Deferred deletions sit on a single timer wheel
+# instead of one sleeping task per message.
+PRIORITY_MODERATION = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_INFO = 2
+WHEEL_SLOTS = 60
+WHEEL_TICK = 1  # seconds
+
+class Outbox:
+    def __init__(self):
+        self.queues = {}
+        self.drains = {}
+        self.order = count()
+        self.sent = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.wheel = [[] for _ in range(WHEEL_SLOTS)]
+        self.wheel_position = 0
+        self.pending_deletions = 0
+
+    async def send(self, destination, priority=PRIORITY_DEFAULT, delete_after=None, **kwargs):
+        if getattr(destination, 'interaction', None) is not None:
+            # Interaction responses go through the interaction webhook, not the
+            # channel's message route, and must be sent promptly.
+            message = await destination.send(**kwargs)
+            if delete_after is not None:
+                self.delete_later(message, delete_after)
+            return message
+        channel = getattr(destination, 'channel', destination)
+        future = asyncio.get_running_loop().create_future()
+        queue = self.queues.get(channel.id)
+        if queue is None:
+            queue = self.queues[channel.id] = asyncio.PriorityQueue()
+            self.drains[channel.id] = asyncio.create_task(self.drain(channel.id, queue))
+        queue.put_nowait((priority, next(self.order), time.monotonic(), destination, kwargs, future))
+        message = await future
+        if delete_after is not None:
+            self.delete_later(message, delete_after)
+        return message
+
+    async def drain(self, channel_id, queue):
+        # One worker per channel with queued sends; it exits once idle
+        while not queue.empty():
+            _, _, queued_at, destination, kwargs, future = queue.get_nowait()
+            wait = time.monotonic() - queued_at
+            self.sent += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            try:
+                message = await destination.send(**kwargs)
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+            else:
+                if not future.done():
+                    future.set_result(message)
+        del self.queues[channel_id]
+        del self.drains[channel_id]
+
+    def delete_later(self, message, delay):
+        ticks = max(1, math.ceil(delay / WHEEL_TICK))
+        rounds = (ticks - 1) // WHEEL_SLOTS
+        self.wheel[(self.wheel_position + ticks) % WHEEL_SLOTS].append([rounds, message])
+        self.pending_deletions += 1
+
+    async def tick(self):
+        self.wheel_position = (self.wheel_position + 1) % WHEEL_SLOTS
+        slot = self.wheel[self.wheel_position]
+        due = [message for rounds, message in slot if rounds == 0]
+        if not due:
+            for entry in slot:
+                entry[0] -= 1
+            return
+        self.wheel[self.wheel_position] = [[rounds - 1, message] for rounds, message in slot if rounds > 0]
+        self.pending_deletions -= len(due)
+        await asyncio.gather(*(message.delete() for message in due), return_exceptions=True)
+
+    def stats(self):
+        return {
+            'queue_depth': sum(queue.qsize() for queue in self.queues.values()),
+            'active_channels': len(self.queues),
+            'sent': self.sent,
+            'average_wait': self.total_wait / self.sent if self.sent else 0.0,
+            'max_wait': self.max_wait,
+            'pending_deletions': self.pending_deletions
+        }
+
+outbox = Outbox()
+
+@tasks.loop(seconds=WHEEL_TICK)
+async def tick_outbox():
+    await outbox.tick()
+
+# Seconds from STARTED_AT to each startup phase
+startup_phases = {}
+
+def record_phase(name):
+    if name not in startup_phases:
+        startup_phases[name] = time.perf_counter() - STARTED_AT
+
+# Runs once per process after login, before the gateway connects, so cogs
+# are never re-added when READY fires again after a reconnect.
+@bot.event
+async def setup_hook():
+    record_phase('login')
+    storage.open()
+    storage.load()
+    flush_storage.start()
+    tick_outbox.start()
+    sweep_rate_limits.start()
+    await setup_cogs()
+    build_help_template()
+    record_phase('cogs_loaded')
+
+@bot.event
+async def on_ready():
+    # With member chunking enabled READY is only dispatched once chunking has
+    # finished, so this also marks chunk completion.
+    record_phase('ready')
+    log.info(f'{bot.user} has connected to Discord!')
+
+# Custom Help Command
+# The help menu is generated once from the registered commands after the cogs
+# load; each request only copies it and fills in the guild's prefix.
+HELP_CATEGORIES = {
+    'Moderation': ':shield: Moderation',
+    'AntiSpam': ':no_entry: Anti-Spam',
+    'AutoRole': ':performing_arts: Auto-Role',
+    'Application': ':memo: Application',
+    'Utility': ':wrench: Utility',
+    'Profile': ':bust_in_silhouette: Profile',
+    'Monitoring': ':bar_chart: Monitoring',
+    None: ':crown: Owner Only'
+}
+
+help_template = None
+
+def build_help_template():
+    global help_template
+    embed = discord.Embed(
+        title='📚 Universx MC Bot Help Menu',
+        color=discord.Color.blue()
+    )
+    commands_by_cog = {}
+    for command in sorted(bot.commands, key=lambda command: command.qualified_name):
+        if command.hidden or command.qualified_name == 'help':
+            continue
+        commands_by_cog.setdefault(command.cog_name, []).append(command)
+    for cog_name, title in HELP_CATEGORIES.items():
+        if cog_name not in commands_by_cog:
+            continue
+        lines = []
+        for command in commands_by_cog[cog_name]:
+            names = ' / '.join(f'`{name}`' for name in (command.name, *command.aliases))
+            # Drop the trailing emoji from the help text
+            description = re.sub(r'\s*(:[a-z_]+:|[^\w\s.)\'?]+)$', '', command.short_doc)
+            lines.append(f'{names} – {description}')
+        embed.add_field(name=title, value='\n'.join(lines), inline=False)
+    help_template = embed
+
+class CustomHelpCommand(commands.HelpCommand):
+    def get_command_signature(self, command):
+        return f'{self.context.clean_prefix}{command.qualified_name} {command.signature}'
+
+    async def send_bot_help(self, mapping):
+        if help_template is None:
+            build_help_template()
+        prefix = self.context.clean_prefix
+        embed = help_template.copy()
+        embed.description = f'Welcome to the help menu! Use `{prefix}help <command>` for detailed information.'
+        embed.set_footer(text=f'Use {prefix}help <command> to view detailed help for a command.')
         await self.get_destination().send(embed=embed)
 
-    
     async def send_command_help(self, command):
         embed = discord.Embed(
             title=f'Command: {command.name}',
@@ -184,136 +819,888 @@ class CustomHelpCommand(commands.HelpCommand):
 # Set up custom help command
 bot.help_command = CustomHelpCommand()
 
+# Inbound rate limiting
+# Token buckets keyed by user, channel, guild and (command, user), checked as
+# a global check so throttled invocations are rejected before arguments are
+# converted or any embed is built. Each bucket is a (tokens, last update)
+# tuple in an OrderedDict kept in update order, so idle keys collect at the
+# front: a bucket untouched for `per` seconds has refilled and can be dropped.
+# The sweep pops them off the front, at most RATE_LIMIT_SWEEP_BATCH per tick,
+# and stops at the first live bucket, so it never scans the whole table.
+USER_RATE_LIMIT = (5, 10)  # commands per seconds
+CHANNEL_RATE_LIMIT = (15, 10)
+GUILD_RATE_LIMIT = (40, 10)
+COMMAND_RATE_LIMITS = {
+    'serverinfo': (1, 10),
+    'userinfo': (2, 10),
+    'profile': (2, 10),
+    'ping': (2, 10),
+    'help': (2, 10)
+}
+RATE_LIMIT_SWEEP_INTERVAL = 1  # seconds
+RATE_LIMIT_SWEEP_BATCH = 10000  # buckets per limiter per tick
+
+class Throttled(commands.CheckFailure):
+    def __init__(self, scope, retry_after):
+        super().__init__(f'Rate limited ({scope}), try again in {retry_after:.1f}s')
+        self.scope = scope
+        self.retry_after = retry_after
+
+class RateLimiter:
+    def __init__(self, rate, per):
+        self.capacity = rate
+        self.per = per
+        self.refill_rate = rate / per
+        self.buckets = OrderedDict()
+
+    def peek(self, key, now):
+        # Tokens available to key at now, without taking one
+        tokens, updated = self.buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.refill_rate)
+
+    def take(self, key, tokens, now):
+        self.buckets[key] = (tokens - 1, now)
+        self.buckets.move_to_end(key)
+
+    def retry_after(self, tokens):
+        return (1 - tokens) / self.refill_rate
+
+    def hit(self, key, now):
+        # Returns None if allowed, otherwise seconds until a token is free
+        tokens = self.peek(key, now)
+        if tokens < 1:
+            return self.retry_after(tokens)
+        self.take(key, tokens, now)
+        return None
+
+    def sweep(self, now, limit=RATE_LIMIT_SWEEP_BATCH):
+        buckets = self.buckets
+        for _ in range(min(limit, len(buckets))):
+            key = next(iter(buckets))
+            if now - buckets[key][1] < self.per:
+                break
+            del buckets[key]
+
+user_limiter = RateLimiter(*USER_RATE_LIMIT)
+channel_limiter = RateLimiter(*CHANNEL_RATE_LIMIT)
+guild_limiter = RateLimiter(*GUILD_RATE_LIMIT)
+command_limiters = {name: RateLimiter(*limit) for name, limit in COMMAND_RATE_LIMITS.items()}
+
+@bot.check
+async def rate_limit(ctx):
+    if ctx.author.id == bot.owner_id:
+        return True
+    now = time.monotonic()
+    limits = [('user', user_limiter, ctx.author.id), ('channel', channel_limiter, ctx.channel.id)]
+    if ctx.guild is not None:
+        limits.append(('guild', guild_limiter, ctx.guild.id))
+    command_limiter = command_limiters.get(ctx.command.qualified_name)
+    if command_limiter is not None:
+        limits.insert(0, (ctx.command.qualified_name, command_limiter, ctx.author.id))
+    # Every bucket is checked before any token is taken, so an invocation
+    # rejected by one scope doesn't use up the others
+    available = []
+    for scope, limiter, key in limits:
+        tokens = limiter.peek(key, now)
+        if tokens < 1:
+            raise Throttled(scope, limiter.retry_after(tokens))
+        available.append((limiter, key, tokens))
+    for limiter, key, tokens in available:
+        limiter.take(key, tokens, now)
+    return True
+
+@tasks.loop(seconds=RATE_LIMIT_SWEEP_INTERVAL)
+async def sweep_rate_limits():
+    now = time.monotonic()
+    for limiter in (user_limiter, channel_limiter, guild_limiter, *command_limiters.values()):
+        limiter.sweep(now)
+
 # Error Handler
+# Error embeds never change, so they are built once and reused; sending an
+# embed only serializes it. Not-found embeds are cached per prefix.
+MISSING_PERMISSIONS_EMBED = discord.Embed(
+    title='❌ Missing Permissions',
+    description='You do not have the required permissions to use this command.',
+    color=discord.Color.red()
+)
+
+not_found_embeds = {}
+
+def command_not_found_embed(prefix):
+    if prefix not in not_found_embeds:
+        not_found_embeds[prefix] = discord.Embed(
+            title='❌ Command Not Found',
+            description=f'Use `{prefix}help` to see available commands.',
+            color=discord.Color.red()
+        )
+    return not_found_embeds[prefix]
+
 @bot.event
 async def on_command_error(ctx, error):
     if isinstance(error, commands.CommandNotFound):
-        # Check if the message started with the real prefix (u!)
-        if ctx.prefix == 'u!':
-            embed = discord.Embed(
-                title='❌ Command Not Found',
-                description='Use `u!help` to see available commands.',
-                color=discord.Color.red()
-            )
-            await ctx.send(embed=embed)
+        # Check if the message started with the guild's real prefix
+        prefix = guild_settings.prefix(ctx.guild)
+        if ctx.prefix == prefix:
+            await ctx.send(embed=command_not_found_embed(prefix))
         return  # Do not show errors for no-prefix messages
+    elif isinstance(error, Throttled):
+        # Prefix commands are dropped silently so a spammer can't make the bot
+        # spend its own rate limit on replies; interactions must be answered.
+        metrics.increment('throttled')
+        if ctx.interaction is not None:
+            await ctx.send(str(error), ephemeral=True)
     elif isinstance(error, commands.MissingPermissions):
-        embed = discord.Embed(
-            title='❌ Missing Permissions',
-            description='You do not have the required permissions to use this command.',
-            color=discord.Color.red()
-        )
-        await ctx.send(embed=embed)
+        await ctx.send(embed=MISSING_PERMISSIONS_EMBED)
+    elif isinstance(error, (commands.UserInputError, commands.CheckFailure)):
+        # Caused by the invocation, not the bot: no traceback needed
+        log.info(f'Command rejected: {error}', extra=log_context(ctx))
     else:
-        raise error  # For development/debugging purposes
+        original = getattr(error, 'original', error)
+        log.error('Command failed', exc_info=original, extra=log_context(ctx))
+
+# Per-guild ban list index, built once from the API and then kept current
+# from ban/unban events so unban never has to fetch and scan the ban list.
+class BanIndex:
+    def __init__(self):
+        self.by_id = {}
+        self.by_name = {}  # lowercase username -> set of user IDs
+        self.by_tag = {}
+        self.names = []  # sorted lowercase usernames, for prefix search
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def add(self, user):
+        if user.id in self.by_id:
+            self.remove(user.id)
+        self.by_id[user.id] = user
+        name = user.name.lower()
+        if name not in self.by_name:
+            bisect.insort(self.names, name)
+            self.by_name[name] = set()
+        self.by_name[name].add(user.id)
+        if user.discriminator != '0':
+            self.by_tag[f'{name}#{user.discriminator}'] = user
+
+    def remove(self, user_id):
+        user = self.by_id.pop(user_id, None)
+        if user is None:
+            return
+        name = user.name.lower()
+        user_ids = self.by_name[name]
+        user_ids.discard(user_id)
+        if not user_ids:
+            del self.by_name[name]
+            position = bisect.bisect_left(self.names, name)
+            if position < len(self.names) and self.names[position] == name:
+                del self.names[position]
+        self.by_tag.pop(f'{name}#{user.discriminator}', None)
+
+    def find(self, query):
+        query = query.strip()
+        match = re.match(r'<@!?([0-9]{15,20})>$', query) or re.match(r'([0-9]{15,20})$', query)
+        if match:
+            return self.by_id.get(int(match.group(1)))
+        query = query.lower()
+        if query in self.by_tag:
+            return self.by_tag[query]
+        # A name shared by several banned users is ambiguous
+        user_ids = self.by_name.get(query.lstrip('@'), ())
+        if len(user_ids) == 1:
+            return self.by_id[next(iter(user_ids))]
+        return None
+
+    def search(self, prefix, limit=5):
+        prefix = prefix.strip().lower().lstrip('@').split('#')[0]
+        position = bisect.bisect_left(self.names, prefix)
+        results = []
+        for name in self.names[position:position + limit]:
+            if not name.startswith(prefix):
+                break
+            results.extend(self.by_id[user_id] for user_id in self.by_name[name])
+        return results[:limit]
+
+# Case log settings
+CASES_PER_PAGE = 10
+# Automatic action taken when a member reaches a warning count
+WARN_ESCALATION = {
+    3: ('timeout', timedelta(hours=1)),
+    5: ('kick', None)
+}
+
+# Purge engine settings
+MAX_CLEAR = 50000
+BULK_DELETE_SIZE = 100  # Discord's bulk delete limit
+BULK_DELETE_MAX_AGE = timedelta(days=14)
+SLOW_DELETE_CONCURRENCY = 3
+PURGE_PROGRESS_INTERVAL = 5  # seconds between progress edits
+
+# Bulk moderation settings
+MAX_BULK_TARGETS = 1000
+BULK_BAN_SIZE = 200  # Discord's bulk ban limit
+BULK_CONCURRENCY = 5
+MEMBER_QUERY_SIZE = 100  # user IDs per gateway member query
+
+class PurgeFlags(commands.FlagConverter):
+    user: Optional[discord.User] = None
+    bots: bool = False
+    match: Optional[str] = None
+    attachments: bool = False
+    minutes: Optional[int] = None
 
 # Moderation Commands
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.ban_indexes = {}
+        self.pending_ban_events = {}  # guild ID -> (banned, user) seen while its index builds
     __cog_name__ = "Moderation" 
 
-    @commands.command(help='Kick a member from the server :boot:')
+    @commands.hybrid_command(help='Kick a member from the server :boot:')
     @commands.has_permissions(kick_members=True)
-    async def kick(self, ctx, member: discord.Member, *, reason=None):
+    async def kick(self, ctx, member: CachedMember, *, reason=None):
         await member.kick(reason=reason)
+        log_case(ctx.guild.id, 'kick', member.id, ctx.author.id, reason)
         embed = discord.Embed(
             title='👢 Member Kicked',
             description=f'{member.mention} has been kicked\nReason: {reason or "No reason provided"}',
             color=discord.Color.orange()
         )
-        await ctx.send(embed=embed)
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_MODERATION)
 
-    @commands.command(help='Ban a member from the server :hammer:')
+    @commands.hybrid_command(help='Ban a member from the server :hammer:')
     @commands.has_permissions(ban_members=True)
     async def ban(self, ctx, member: discord.Member, *, reason=None):
         await member.ban(reason=reason)
+        log_case(ctx.guild.id, 'ban', member.id, ctx.author.id, reason)
         embed = discord.Embed(
             title='🔨 Member Banned',
             description=f'{member.mention} has been banned\nReason: {reason or "No reason provided"}',
             color=discord.Color.red()
         )
-        await ctx.send(embed=embed)
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_MODERATION)
+
+    async def get_ban_index(self, guild):
+        # Concurrent callers share the same build task
+        if guild.id not in self.ban_indexes:
+            self.ban_indexes[guild.id] = asyncio.ensure_future(self.build_ban_index(guild))
+        try:
+            return await asyncio.shield(self.ban_indexes[guild.id])
+        except discord.HTTPException:
+            self.ban_indexes.pop(guild.id, None)
+            raise
+
+    async def build_ban_index(self, guild):
+        index = BanIndex()
+        events = self.pending_ban_events[guild.id] = []
+        try:
+            async for ban_entry in guild.bans(limit=None):
+                index.add(ban_entry.user)
+        finally:
+            del self.pending_ban_events[guild.id]
+        # Bans and unbans that arrived mid-build may be missing from the pages
+        # already fetched; replaying them in order leaves the index current.
+        for banned, user in events:
+            if banned:
+                index.add(user)
+            else:
+                index.remove(user.id)
+        return index
+
+    def built_ban_index(self, guild):
+        task = self.ban_indexes.get(guild.id)
+        if task is not None and task.done() and not task.exception():
+            return task.result()
+        return None
+
+    @commands.Cog.listener()
+    async def on_member_ban(self, guild, user):
+        index = self.built_ban_index(guild)
+        if index is not None:
+            index.add(user)
+        elif guild.id in self.pending_ban_events:
+            self.pending_ban_events[guild.id].append((True, user))
+
+    @commands.Cog.listener()
+    async def on_member_unban(self, guild, user):
+        index = self.built_ban_index(guild)
+        if index is not None:
+            index.remove(user.id)
+        elif guild.id in self.pending_ban_events:
+            self.pending_ban_events[guild.id].append((False, user))
 
-    @commands.command(help='Unban a member from the server :unlock:')
+    @commands.hybrid_command(help='Unban a member by ID, mention, username or name#tag :unlock:')
     @commands.has_permissions(ban_members=True)
     async def unban(self, ctx, *, member):
-        banned_users = await ctx.guild.bans()
-        member_name, member_discriminator = member.split('#')
-        for ban_entry in banned_users:
-            user = ban_entry.user
-            if (user.name, user.discriminator) == (member_name, member_discriminator):
-                await ctx.guild.unban(user)
-                embed = discord.Embed(
-                    title='🔓 Member Unbanned',
-                    description=f'{user.mention} has been unbanned',
-                    color=discord.Color.green()
+        await ctx.defer()
+        index = await self.get_ban_index(ctx.guild)
+        user = index.find(member)
+        if user is None:
+            suggestions = index.search(member)
+            if suggestions:
+                await outbox.send(
+                    ctx,
+                    content='Member not found in ban list. Did you mean: ' + ', '.join(f'`{user}` ({user.id})' for user in suggestions),
+                    priority=PRIORITY_MODERATION
                 )
-                await ctx.send(embed=embed)
-                return
-        await ctx.send('Member not found in ban list')
+            else:
+                await outbox.send(ctx, content='Member not found in ban list', priority=PRIORITY_MODERATION)
+            return
+        try:
+            await ctx.guild.unban(user)
+        except discord.NotFound:
+            # Unbanned since the index was built, and the event was missed
+            index.remove(user.id)
+            await outbox.send(ctx, content=f'`{user}` is not banned', priority=PRIORITY_MODERATION)
+            return
+        index.remove(user.id)
+        log_case(ctx.guild.id, 'unban', user.id, ctx.author.id)
+        embed = discord.Embed(
+            title='🔓 Member Unbanned',
+            description=f'{user.mention} has been unbanned',
+            color=discord.Color.green()
+        )
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_MODERATION)
+
+    async def purge(self, channel, amount, check, before=None, after=None, progress=None):
+        # Streams history newest-first and only ever holds one batch in memory.
+        # Recent messages are bulk deleted 100 at a time; messages past the
+        # bulk delete age limit go through a concurrency-limited slow path.
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE + timedelta(minutes=1)
+        semaphore = asyncio.Semaphore(SLOW_DELETE_CONCURRENCY)
+        state = {'scanned': 0, 'deleted': 0}
+        recent, old = [], []
+        last_report = time.monotonic()
+
+        async def delete_one(message):
+            async with semaphore:
+                try:
+                    await message.delete()
+                except discord.NotFound:
+                    return
+                state['deleted'] += 1
 
-    @commands.command(help='Clear a specified number of messages :broom:')
+        async def flush_recent():
+            if recent:
+                await channel.delete_messages(recent)
+                state['deleted'] += len(recent)
+                recent.clear()
+
+        async def flush_old():
+            if old:
+                await asyncio.gather(*(delete_one(message) for message in old))
+                old.clear()
+
+        matched = 0
+        async for message in channel.history(limit=None, before=before, after=after, oldest_first=False):
+            state['scanned'] += 1
+            if check(message):
+                matched += 1
+                if message.created_at > cutoff:
+                    recent.append(message)
+                    if len(recent) >= BULK_DELETE_SIZE:
+                        await flush_recent()
+                else:
+                    old.append(message)
+                    if len(old) >= BULK_DELETE_SIZE:
+                        await flush_old()
+            if progress is not None and time.monotonic() - last_report >= PURGE_PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                await progress(state['scanned'], state['deleted'])
+            if matched >= amount:
+                break
+        await flush_recent()
+        await flush_old()
+        return state['scanned'], state['deleted']
+
+    @commands.hybrid_command(
+        help='Clear messages, optionally filtered :broom:\n'
+             'Filters: user: @member  bots: yes  match: <regex>  attachments: yes  minutes: <n>'
+    )
     @commands.has_permissions(manage_messages=True)
-    async def clear(self, ctx, amount: int):
-        await ctx.channel.purge(limit=amount + 1)
+    async def clear(self, ctx, amount: int, *, flags: PurgeFlags):
+        await ctx.defer()
+        if not 1 <= amount <= MAX_CLEAR:
+            await outbox.send(ctx, content=f'Amount must be between 1 and {MAX_CLEAR}', priority=PRIORITY_MODERATION)
+            return
+        try:
+            pattern = re.compile(flags.match, re.IGNORECASE) if flags.match else None
+        except re.error:
+            await outbox.send(ctx, content='Invalid regex for `match`', priority=PRIORITY_MODERATION)
+            return
+
+        def check(message):
+            if flags.user is not None and message.author.id != flags.user.id:
+                return False
+            if flags.bots and not message.author.bot:
+                return False
+            if flags.attachments and not message.attachments:
+                return False
+            if pattern is not None and not pattern.search(message.content):
+                return False
+            return True
+
+        after = discord.utils.utcnow() - timedelta(minutes=flags.minutes) if flags.minutes else None
+        progress_message = None
+        if amount > BULK_DELETE_SIZE:
+            progress_message = await outbox.send(ctx, content='🧹 Clearing messages...', priority=PRIORITY_MODERATION)
+
+        async def report(scanned, deleted):
+            await progress_message.edit(content=f'🧹 Clearing messages... {deleted} deleted, {scanned} scanned')
+
+        if ctx.interaction is None:
+            # A slash invocation has no command message to remove
+            try:
+                await ctx.message.delete()
+            except discord.HTTPException:
+                pass
+        scanned, deleted = await self.purge(
+            ctx.channel, amount, check,
+            before=ctx.message, after=after,
+            progress=report if progress_message else None
+        )
         embed = discord.Embed(
             title='🧹 Messages Cleared',
-            description=f'Cleared {amount} messages',
+            description=f'Cleared {deleted} messages',
             color=discord.Color.blue()
         )
-        msg = await ctx.send(embed=embed)
-        await asyncio.sleep(3)
-        await msg.delete()
+        if progress_message is not None:
+            await progress_message.edit(content=None, embed=embed)
+            outbox.delete_later(progress_message, 3)
+        else:
+            await outbox.send(ctx, embed=embed, priority=PRIORITY_MODERATION, delete_after=3)
+
+    async def resolve_members(self, guild, user_ids):
+        # Cached members first; in lean mode the rest are looked up over the
+        # gateway. IDs that are not in the guild are simply left out.
+        members = {}
+        missing = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id) or recent_members.get(guild.id, user_id)
+            if member is not None:
+                members[user_id] = member
+            else:
+                missing.append(user_id)
+        if LEAN_MODE:
+            for start in range(0, len(missing), MEMBER_QUERY_SIZE):
+                chunk = missing[start:start + MEMBER_QUERY_SIZE]
+                for member in await guild.query_members(user_ids=chunk, cache=False):
+                    members[member.id] = member
+        return members
+
+    async def collect_targets(self, ctx, text):
+        # Targets come from IDs/mentions in the message, an attached ID list,
+        # and a "joined:<minutes>" selector. "reason: ..." ends the target list.
+        # Members whose top role is not below the invoker's are skipped unless
+        # the invoker owns the guild. Returns (user IDs, skipped count, reason),
+        # or None once the invoker has been told why nothing will be done.
+        text, _, reason = (text or '').partition('reason:')
+        user_ids = {int(user_id) for user_id in re.findall(r'(?<![0-9])([0-9]{15,20})(?![0-9])', text)}
+        for attachment in ctx.message.attachments:
+            data = await attachment.read()
+            user_ids.update(int(user_id) for user_id in re.findall(rb'(?<![0-9])([0-9]{15,20})(?![0-9])', data))
+        joined = re.search(r'joined:\s*([0-9]+)', text)
+        if joined:
+            if LEAN_MODE:
+                await outbox.send(
+                    ctx,
+                    content='`joined:` needs the member cache, which is off in the lean memory profile; list the IDs instead',
+                    priority=PRIORITY_MODERATION
+                )
+                return None
+            since = discord.utils.utcnow() - timedelta(minutes=int(joined.group(1)))
+            user_ids.update(member.id for member in ctx.guild.members if member.joined_at and member.joined_at >= since)
+        user_ids -= {ctx.author.id, ctx.guild.owner_id, self.bot.user.id}
+
+        skipped = 0
+        if ctx.author.id != ctx.guild.owner_id and user_ids:
+            members = await self.resolve_members(ctx.guild, user_ids)
+            outranked = {user_id for user_id, member in members.items() if member.top_role >= ctx.author.top_role}
+            user_ids -= outranked
+            skipped = len(outranked)
+
+        if not user_ids:
+            content = 'No targets found'
+            if skipped:
+                content += f' ({skipped} skipped: their top role is not below yours)'
+            await outbox.send(ctx, content=content, priority=PRIORITY_MODERATION)
+            return None
+        if len(user_ids) > MAX_BULK_TARGETS:
+            await outbox.send(ctx, content=f'Too many targets (max {MAX_BULK_TARGETS})', priority=PRIORITY_MODERATION)
+            return None
+        return sorted(user_ids), skipped, reason.strip() or None
+
+    async def run_bulk(self, user_ids, action):
+        semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+        succeeded, failed = [], []
+
+        async def run(user_id):
+            async with semaphore:
+                try:
+                    await action(user_id)
+                except discord.HTTPException:
+                    failed.append(user_id)
+                else:
+                    succeeded.append(user_id)
+
+        await asyncio.gather(*(run(user_id) for user_id in user_ids))
+        return succeeded, failed
+
+    async def send_bulk_summary(self, ctx, title, succeeded, failed, skipped, reason):
+        description = f'Succeeded: {len(succeeded)}\nFailed: {len(failed)}\n'
+        if skipped:
+            description += f'Skipped (role hierarchy): {skipped}\n'
+        embed = discord.Embed(
+            title=title,
+            description=description + f'Reason: {reason or "No reason provided"}',
+            color=discord.Color.red() if failed else discord.Color.green()
+        )
+        if failed:
+            shown = ', '.join(str(user_id) for user_id in failed[:20])
+            if len(failed) > 20:
+                shown += f' and {len(failed) - 20} more'
+            embed.add_field(name='Failed IDs', value=shown, inline=False)
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_MODERATION)
+
+    @commands.hybrid_command(help='Ban many users by ID/mention, attached ID list or joined:<minutes> :hammer:')
+    @commands.has_permissions(ban_members=True)
+    async def massban(self, ctx, *, targets=None):
+        await ctx.defer()
+        targets = await self.collect_targets(ctx, targets)
+        if targets is None:
+            return
+        user_ids, skipped, reason = targets
+        succeeded, failed = [], []
+        for start in range(0, len(user_ids), BULK_BAN_SIZE):
+            chunk = [discord.Object(id=user_id) for user_id in user_ids[start:start + BULK_BAN_SIZE]]
+            try:
+                result = await ctx.guild.bulk_ban(chunk, reason=reason)
+            except discord.HTTPException:
+                failed.extend(user.id for user in chunk)
+            else:
+                succeeded.extend(user.id for user in result.banned)
+                failed.extend(user.id for user in result.failed)
+        for user_id in succeeded:
+            log_case(ctx.guild.id, 'ban', user_id, ctx.author.id, reason)
+        await self.send_bulk_summary(ctx, '🔨 Mass Ban', succeeded, failed, skipped, reason)
+
+    @commands.hybrid_command(help='Kick many members by ID/mention, attached ID list or joined:<minutes> :boot:')
+    @commands.has_permissions(kick_members=True)
+    async def masskick(self, ctx, *, targets=None):
+        await ctx.defer()
+        targets = await self.collect_targets(ctx, targets)
+        if targets is None:
+            return
+        user_ids, skipped, reason = targets
+        succeeded, failed = await self.run_bulk(
+            user_ids, lambda user_id: ctx.guild.kick(discord.Object(id=user_id), reason=reason)
+        )
+        for user_id in succeeded:
+            log_case(ctx.guild.id, 'kick', user_id, ctx.author.id, reason)
+        await self.send_bulk_summary(ctx, '👢 Mass Kick', succeeded, failed, skipped, reason)
+
+    @commands.hybrid_command(help='Time out many members for <minutes> by ID/mention, attached ID list or joined:<minutes> :mute:')
+    @commands.has_permissions(moderate_members=True)
+    async def masstimeout(self, ctx, minutes: int, *, targets=None):
+        await ctx.defer()
+        targets = await self.collect_targets(ctx, targets)
+        if targets is None:
+            return
+        user_ids, skipped, reason = targets
+        duration = timedelta(minutes=minutes)
 
-    @commands.command(help='Warn a member :warning:')
+        async def timeout(user_id):
+            member = ctx.guild.get_member(user_id) or await ctx.guild.fetch_member(user_id)
+            await member.timeout(duration, reason=reason)
+
+        succeeded, failed = await self.run_bulk(user_ids, timeout)
+        for user_id in succeeded:
+            log_case(ctx.guild.id, 'timeout', user_id, ctx.author.id, reason)
+        await self.send_bulk_summary(ctx, '🔇 Mass Timeout', succeeded, failed, skipped, reason)
+
+    @commands.hybrid_command(help='Warn a member :warning:')
     @commands.has_permissions(manage_roles=True)
-    async def warn(self, ctx, member: discord.Member, *, reason=None):
-        if member.id not in user_data['warnings']:
-            user_data['warnings'][member.id] = []
-        user_data['warnings'][member.id].append({
-            'reason': reason,
-            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        })
+    async def warn(self, ctx, member: CachedMember, *, reason=None):
+        log_case(ctx.guild.id, 'warn', member.id, ctx.author.id, reason)
+        warn_count = get_warn_count(ctx.guild.id, member.id)
         embed = discord.Embed(
             title='⚠️ Member Warned',
-            description=f'{member.mention} has been warned\nReason: {reason or "No reason provided"}',
+            description=f'{member.mention} has been warned\nReason: {reason or "No reason provided"}\nTotal warnings: {warn_count}',
             color=discord.Color.yellow()
         )
-        await ctx.send(embed=embed)
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_MODERATION)
+        await self.escalate(ctx, member, warn_count)
+
+    async def escalate(self, ctx, member, warn_count):
+        if warn_count not in WARN_ESCALATION:
+            return
+        action, duration = WARN_ESCALATION[warn_count]
+        reason = f'Reached {warn_count} warnings'
+        try:
+            if action == 'timeout':
+                await member.timeout(duration, reason=reason)
+            elif action == 'kick':
+                await member.kick(reason=reason)
+            elif action == 'ban':
+                await member.ban(reason=reason)
+        except discord.HTTPException:
+            return
+        log_case(ctx.guild.id, action, member.id, self.bot.user.id, reason)
+        embed = discord.Embed(
+            title='📈 Warning Escalation',
+            description=f'{member.mention} received an automatic {action}\nReason: {reason}',
+            color=discord.Color.orange()
+        )
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_MODERATION)
+
+    async def send_cases(self, ctx, title, where, params, page):
+        # Both lookups are served by an index on (user_id, id) or
+        # (moderator_id, id), so paging never scans the whole log.
+        page = max(page, 1)
+        total = (await storage.fetch(f'SELECT COUNT(*) FROM cases WHERE {where}', params))[0][0]
+        rows = await storage.fetch(
+            f'SELECT id, guild_id, action, user_id, moderator_id, reason, created FROM cases '
+            f'WHERE {where} ORDER BY id DESC LIMIT ? OFFSET ?',
+            (*params, CASES_PER_PAGE, (page - 1) * CASES_PER_PAGE)
+        )
+        pages = max(1, math.ceil(total / CASES_PER_PAGE))
+        embed = discord.Embed(
+            title=title,
+            description='\n'.join(
+                f'`#{case_id}` **{action}** <@{user_id}> by <@{moderator_id}> <t:{created}:R>\n'
+                f'{reason or "No reason provided"}'
+                for case_id, guild_id, action, user_id, moderator_id, reason, created in rows
+            ) or 'No cases found',
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=f'Page {min(page, pages)}/{pages} • {total} cases')
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_MODERATION)
+
+    @commands.hybrid_command(help='Show moderation cases for a user, or by a moderator :scroll:')
+    @commands.has_permissions(manage_roles=True)
+    async def modlog(self, ctx, user: discord.User, page: int = 1, moderator: bool = False):
+        column = 'moderator_id' if moderator else 'user_id'
+        await self.send_cases(
+            ctx,
+            f'📜 Cases {"by" if moderator else "for"} {user}',
+            f'{column} = ? AND guild_id IN (?, 0)',
+            (user.id, ctx.guild.id),
+            page
+        )
+
+    @commands.hybrid_command(help='Show warnings for a user :warning:')
+    @commands.has_permissions(manage_roles=True)
+    async def warnings(self, ctx, user: discord.User, page: int = 1):
+        await self.send_cases(
+            ctx,
+            f'⚠️ Warnings for {user} ({get_warn_count(ctx.guild.id, user.id)})',
+            "user_id = ? AND guild_id IN (?, 0) AND action = 'warn'",
+            (user.id, ctx.guild.id),
+            page
+        )
 
 # Auto-role System
+# Joins go through a bounded per-guild queue. Role assignment is paced by a
+# token bucket and welcome messages are coalesced into one embed per interval,
+# so a raid can't exhaust the REST rate limit or flood the welcome channel.
+JOIN_QUEUE_SIZE = 10000
+ROLE_ASSIGN_RATE = 5  # role assignments per second, per guild
+ROLE_ASSIGN_BURST = 10
+WELCOME_INTERVAL = 10  # seconds
+WELCOME_MAX_MENTIONS = 30
+MAX_AUTO_ROLES = 5
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        self.refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self.refill()
+        self.tokens -= 1
+
 class AutoRole(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.join_queues = {}
+        self.join_workers = {}
+        self.dropped_joins = 0
+        self.pending_welcomes = {}
+        self.welcome_channels = {}
+
+    async def cog_load(self):
+        self.send_welcomes.start()
+
+    async def cog_unload(self):
+        self.send_welcomes.cancel()
+        for worker in self.join_workers.values():
+            worker.cancel()
+
+    def get_welcome_channel(self, guild):
+        if guild.id not in self.welcome_channels:
+            # Use the configured channel, then the system channel, then the first text channel
+            override = guild.get_channel(guild_settings.get(guild.id)['welcome_channel_id'] or 0)
+            text_channels = guild.text_channels
+            self.welcome_channels[guild.id] = override or guild.system_channel or (text_channels[0] if text_channels else None)
+        return self.welcome_channels[guild.id]
+
+    def get_auto_roles(self, guild):
+        roles = (guild.get_role(role_id) for role_id in guild_settings.get(guild.id)['auto_roles'])
+        return [role for role in roles if role is not None]
+
+    async def assign_roles(self, queue):
+        bucket = TokenBucket(ROLE_ASSIGN_RATE, ROLE_ASSIGN_BURST)
+        while True:
+            member = await queue.get()
+            try:
+                roles = self.get_auto_roles(member.guild)
+                if not roles:
+                    continue
+                await bucket.acquire()
+                try:
+                    await member.add_roles(*roles)
+                except discord.HTTPException:
+                    continue
+                self.pending_welcomes.setdefault(member.guild.id, []).append(member)
+            finally:
+                queue.task_done()
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        if member.guild.id in auto_roles:
-            role = member.guild.get_role(auto_roles[member.guild.id])
-            if role:
-                await member.add_roles(role)
-                embed = discord.Embed(
-                    title='🎭 Auto-Role Assigned',
-                    description=f'Welcome {member.mention}! You have been assigned the {role.name} role.',
-                    color=discord.Color.green()
-                )
-                # Send to system channel if it exists, otherwise first text channel
-                channel = member.guild.system_channel or member.guild.text_channels[0]
+        if not guild_settings.get(member.guild.id)['auto_roles']:
+            return
+        queue = self.join_queues.get(member.guild.id)
+        if queue is None:
+            queue = self.join_queues[member.guild.id] = asyncio.Queue(maxsize=JOIN_QUEUE_SIZE)
+            self.join_workers[member.guild.id] = asyncio.create_task(self.assign_roles(queue))
+        try:
+            queue.put_nowait(member)
+        except asyncio.QueueFull:
+            self.dropped_joins += 1
+
+    @tasks.loop(seconds=WELCOME_INTERVAL)
+    async def send_welcomes(self):
+        pending, self.pending_welcomes = self.pending_welcomes, {}
+        for guild_id, members in pending.items():
+            guild = members[0].guild
+            channel = self.get_welcome_channel(guild)
+            roles = self.get_auto_roles(guild)
+            if channel is None or not roles:
+                continue
+            mentions = ', '.join(member.mention for member in members[:WELCOME_MAX_MENTIONS])
+            if len(members) > WELCOME_MAX_MENTIONS:
+                mentions += f' and {len(members) - WELCOME_MAX_MENTIONS} more'
+            embed = discord.Embed(
+                title='🎭 Auto-Role Assigned',
+                description=f'Welcome {mentions}! You have been assigned the {", ".join(role.name for role in roles)} role{"s" if len(roles) > 1 else ""}.',
+                color=discord.Color.green()
+            )
+            try:
                 await channel.send(embed=embed)
+            except discord.HTTPException:
+                pass
 
-    @commands.command(help='Set the auto-role for new members :performing_arts:')
+    @send_welcomes.before_loop
+    async def before_send_welcomes(self):
+        await self.bot.wait_until_ready()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.welcome_channels.pop(channel.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.welcome_channels.pop(channel.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        self.welcome_channels.pop(after.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before, after):
+        self.welcome_channels.pop(after.id, None)
+
+    @commands.hybrid_command(help='Add an auto-role for new members :performing_arts:')
     @commands.has_permissions(manage_roles=True)
     async def setautorole(self, ctx, role: discord.Role):
-        auto_roles[ctx.guild.id] = role.id
+        role_ids = guild_settings.get(ctx.guild.id)['auto_roles']
+        if role.id not in role_ids:
+            if len(role_ids) >= MAX_AUTO_ROLES:
+                await outbox.send(
+                    ctx,
+                    content=f'A server can have at most {MAX_AUTO_ROLES} auto-roles',
+                    priority=PRIORITY_DEFAULT
+                )
+                return
+            guild_settings.update(ctx.guild.id, auto_roles=role_ids + [role.id])
         embed = discord.Embed(
             title='✅ Auto-Role Set',
-            description=f'Auto-role has been set to {role.mention}',
+            description=f'{role.mention} will be given to new members',
             color=discord.Color.green()
         )
-        await ctx.send(embed=embed)
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_DEFAULT)
+
+    @commands.hybrid_command(help='Remove an auto-role :performing_arts:')
+    @commands.has_permissions(manage_roles=True)
+    async def removeautorole(self, ctx, role: discord.Role):
+        role_ids = guild_settings.get(ctx.guild.id)['auto_roles']
+        if role.id not in role_ids:
+            await outbox.send(ctx, content=f'{role.mention} is not an auto-role', priority=PRIORITY_DEFAULT)
+            return
+        guild_settings.update(ctx.guild.id, auto_roles=[role_id for role_id in role_ids if role_id != role.id])
+        embed = discord.Embed(
+            title='✅ Auto-Role Removed',
+            description=f'{role.mention} will no longer be given to new members',
+            color=discord.Color.green()
+        )
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_DEFAULT)
+
+    @commands.hybrid_command(help='Set the welcome channel, or reset it to the default :wave:')
+    @commands.has_permissions(manage_guild=True)
+    async def setwelcome(self, ctx, channel: discord.TextChannel = None):
+        guild_settings.update(ctx.guild.id, welcome_channel_id=channel.id if channel else None)
+        self.welcome_channels.pop(ctx.guild.id, None)
+        embed = discord.Embed(
+            title='✅ Welcome Channel Set',
+            description=f'Welcome messages will be sent to {channel.mention}' if channel else 'Welcome channel reset to the default',
+            color=discord.Color.green()
+        )
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_DEFAULT)
 
 # Application System
+# Each applicant has a session keyed by (user ID, channel ID), so an incoming
+# message is routed to its session with one dict lookup. Question timeouts
+# are tracked in a single heap drained by one timer task.
+APPLICATION_TIMEOUT = 60
+
+class ApplicationModal(discord.ui.Modal, title='📝 Server Application'):
+    def __init__(self, cog):
+        super().__init__()
+        self.cog = cog
+        self.inputs = []
+        for question in cog.questions:
+            text_input = discord.ui.TextInput(
+                label=re.sub(r'\s*:[a-z_]+:', '', question)[:45],
+                style=discord.TextStyle.paragraph,
+                max_length=1000
+            )
+            self.add_item(text_input)
+            self.inputs.append(text_input)
+
+    async def on_submit(self, interaction):
+        answers = [text_input.value for text_input in self.inputs]
+        await interaction.response.send_message(embed=self.cog.submit(interaction.user.id, answers))
+
 class Application(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -323,58 +1710,164 @@ class Application(commands.Cog):
             'Why do you want to join our server? :thinking:',
             'Do you agree to follow our rules? :scroll:'
         ]
+        self.deadlines = []
 
-    @commands.command(help='Apply to join the Minecraft server :pencil:')
-    async def apply(self, ctx):
-        embed = discord.Embed(
-            title='📝 Server Application',
-            description='Please answer the following questions within 60 seconds each.',
-            color=discord.Color.blue()
-        )
-        await ctx.send(embed=embed)
+    async def cog_load(self):
+        self.expire_sessions.start()
 
-        answers = []
-        for question in self.questions:
-            question_embed = discord.Embed(
-                description=question,
-                color=discord.Color.blue()
-            )
-            await ctx.send(embed=question_embed)
+    async def cog_unload(self):
+        self.expire_sessions.cancel()
 
-            try:
-                answer = await self.bot.wait_for(
-                    'message',
-                    timeout=60.0,
-                    check=lambda m: m.author == ctx.author and m.channel == ctx.channel
-                )
-                answers.append(answer.content)
-            except asyncio.TimeoutError:
-                timeout_embed = discord.Embed(
-                    title='⏰ Timeout',
-                    description='Application timed out. Please try again.',
-                    color=discord.Color.red()
-                )
-                await ctx.send(embed=timeout_embed)
-                return
+    def save_application(self, user_id):
+        application = applications[user_id]
+        storage.queue(
+            'INSERT OR REPLACE INTO applications (user_id, answers, time, status) VALUES (?, ?, ?, ?)',
+            (user_id, json.dumps(application['answers']), application['time'], application['status'])
+        )
 
-        applications[ctx.author.id] = {
+    def submit(self, user_id, answers):
+        applications[user_id] = {
             'answers': answers,
             'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'status': 'pending'
         }
+        self.save_application(user_id)
 
         success_embed = discord.Embed(
             title='✅ Application Submitted',
             description='Your application has been submitted for review!',
             color=discord.Color.green()
         )
-        await ctx.send(embed=success_embed)
+        return success_embed
+
+    def save_session(self, key):
+        session = application_sessions[key]
+        storage.queue(
+            'INSERT OR REPLACE INTO application_sessions (user_id, channel_id, answers, deadline) VALUES (?, ?, ?, ?)',
+            (key[0], key[1], json.dumps(session['answers']), session['deadline'])
+        )
+
+    def end_session(self, key):
+        del application_sessions[key]
+        storage.queue('DELETE FROM application_sessions WHERE user_id = ? AND channel_id = ?', key)
+
+    def reset_deadline(self, key):
+        session = application_sessions[key]
+        session['deadline'] = time.time() + APPLICATION_TIMEOUT
+        heapq.heappush(self.deadlines, (session['deadline'], key))
+        self.save_session(key)
+
+    async def session_channel(self, channel_id):
+        # DM channels are not cached after a restart, so fall back to the API
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            channel = await self.bot.fetch_channel(channel_id)
+        return channel
 
-    @commands.command(help='Review a pending application :clipboard:')
+    def owns_channel(self, channel):
+        # DMs arrive on shard 0, guild channels on their guild's shard
+        guild = getattr(channel, 'guild', None)
+        shard_id = 0 if guild is None else (guild.id >> 22) % self.bot.shard_count
+        return shard_id in self.bot.shard_ids
+
+    async def ask(self, channel, step):
+        question_embed = discord.Embed(
+            description=self.questions[step],
+            color=discord.Color.blue()
+        )
+        await channel.send(embed=question_embed)
+
+    @tasks.loop(seconds=1)
+    async def expire_sessions(self):
+        now = time.time()
+        while self.deadlines and self.deadlines[0][0] <= now:
+            deadline, key = heapq.heappop(self.deadlines)
+            session = application_sessions.get(key)
+            # Skip entries superseded by a later answer or a finished session
+            if session is None or session['deadline'] != deadline:
+                continue
+            self.end_session(key)
+            timeout_embed = discord.Embed(
+                title='⏰ Timeout',
+                description='Application timed out. Please try again.',
+                color=discord.Color.red()
+            )
+            try:
+                channel = await self.session_channel(key[1])
+                await channel.send(embed=timeout_embed)
+            except discord.HTTPException:
+                pass
+
+    @expire_sessions.before_loop
+    async def before_expire_sessions(self):
+        await self.bot.wait_until_ready()
+        # Resume sessions restored from storage. Every cluster process loads
+        # the whole table, but only sessions in channels on its own shards
+        # are its own; the rest are dropped from memory and left to their
+        # owner. Sessions whose channel no longer exists are deleted.
+        for key, session in list(application_sessions.items()):
+            try:
+                channel = await self.session_channel(key[1])
+            except (discord.NotFound, discord.Forbidden):
+                self.end_session(key)
+                continue
+            except discord.HTTPException:
+                log.warning('Could not fetch channel %d to resume an application', key[1], exc_info=True)
+                channel = None
+            if CLUSTER_MODE and (channel is None or not self.owns_channel(channel)):
+                del application_sessions[key]
+                continue
+            heapq.heappush(self.deadlines, (session['deadline'], key))
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        key = (message.author.id, message.channel.id)
+        session = application_sessions.get(key)
+        if session is None:
+            return
+        session['answers'].append(message.content)
+        if len(session['answers']) < len(self.questions):
+            self.reset_deadline(key)
+            await self.ask(message.channel, len(session['answers']))
+            return
+
+        self.end_session(key)
+        await message.channel.send(embed=self.submit(message.author.id, session['answers']))
+
+    @commands.hybrid_command(help='Apply to join the Minecraft server :pencil:')
+    async def apply(self, ctx):
+        if ctx.interaction is not None:
+            # As a slash command the questions are asked in a modal, which
+            # works without the message content intent.
+            await ctx.interaction.response.send_modal(ApplicationModal(self))
+            return
+        if INTERACTIONS_ONLY:
+            # Answers would arrive without content, so point to the modal
+            await ctx.send('Use `/apply` to fill in the application form.')
+            return
+
+        key = (ctx.author.id, ctx.channel.id)
+        if key in application_sessions:
+            await ctx.send('You already have an application in progress here.')
+            return
+
+        embed = discord.Embed(
+            title='📝 Server Application',
+            description=f'Please answer the following questions within {APPLICATION_TIMEOUT} seconds each.',
+            color=discord.Color.blue()
+        )
+        await ctx.send(embed=embed)
+
+        application_sessions[key] = {'answers': [], 'deadline': 0}
+        self.reset_deadline(key)
+        await self.ask(ctx.channel, 0)
+
+    @commands.hybrid_command(help='Review a pending application :clipboard:')
     @commands.has_permissions(administrator=True)
     async def reviewapp(self, ctx, user: discord.Member, status: str):
         if user.id in applications:
             applications[user.id]['status'] = status.lower()
+            self.save_application(user.id)
             
             # Embed for the reviewer
             review_embed = discord.Embed(
@@ -403,38 +1896,300 @@ class Application(commands.Cog):
             )
             await ctx.send(embed=error_embed)
 
+# Server statistics
+# Kept per guild from gateway events only, so serverinfo never makes a REST
+# call. Each series is a ring of unsigned 32-bit counters: 168 hourly slots
+# (7 days) and 90 daily slots, for joins, leaves and messages, plus the member
+# count sampled every STATS_SAVE_INTERVAL (the last sample in each slot wins).
+# That is 4 * (168 + 90) * 4 = 4,128 bytes of counters per guild, about
+# 5.9 KB with object overhead, regardless of guild size or activity. The
+# rings are saved every STATS_SAVE_INTERVAL and on shutdown so trends survive
+# a restart; channel and role counts are recounted whenever the guild
+# becomes available.
+HOURLY_SLOTS = 168
+DAILY_SLOTS = 90
+STATS_SAVE_INTERVAL = 10  # minutes
+
+class RingSeries:
+    __slots__ = ('period', 'values', 'current')
+
+    def __init__(self, period, slots):
+        self.period = period
+        self.values = array('I', bytes(4 * slots))
+        self.current = int(time.time() // period)
+
+    def advance(self, now):
+        # Zero the slots skipped since the last event
+        index = int(now // self.period)
+        if index != self.current:
+            for step in range(1, min(index - self.current, len(self.values)) + 1):
+                self.values[(self.current + step) % len(self.values)] = 0
+            self.current = index
+
+    def add(self, now, amount=1):
+        self.advance(now)
+        self.values[self.current % len(self.values)] += amount
+
+    def set(self, now, value):
+        self.advance(now)
+        self.values[self.current % len(self.values)] = value
+
+    def get(self, now, offset=0):
+        # Slot `offset` slots before the current one; 0 if nothing was recorded
+        self.advance(now)
+        return self.values[(self.current - offset) % len(self.values)] if offset < len(self.values) else 0
+
+    def total(self, now, periods, offset=0):
+        # Sum of `periods` slots, ending `offset` slots before the current one
+        self.advance(now)
+        size = len(self.values)
+        return sum(self.values[(self.current - offset - step) % size] for step in range(min(periods, size - offset)))
+
+    def restore(self, current, counts):
+        values = array('I')
+        values.frombytes(counts)
+        # Rings saved with a different slot count are discarded
+        if len(values) == len(self.values):
+            self.values = values
+            self.current = current
+
+class GuildStats:
+    SERIES = (
+        'joins_hourly', 'leaves_hourly', 'messages_hourly', 'members_hourly',
+        'joins_daily', 'leaves_daily', 'messages_daily', 'members_daily'
+    )
+    __slots__ = ('text_channels', 'voice_channels', 'roles') + SERIES
+
+    def __init__(self, guild):
+        self.count(guild)
+        self.joins_hourly = RingSeries(3600, HOURLY_SLOTS)
+        self.leaves_hourly = RingSeries(3600, HOURLY_SLOTS)
+        self.messages_hourly = RingSeries(3600, HOURLY_SLOTS)
+        self.members_hourly = RingSeries(3600, HOURLY_SLOTS)
+        self.joins_daily = RingSeries(86400, DAILY_SLOTS)
+        self.leaves_daily = RingSeries(86400, DAILY_SLOTS)
+        self.messages_daily = RingSeries(86400, DAILY_SLOTS)
+        self.members_daily = RingSeries(86400, DAILY_SLOTS)
+        for name, (current, counts) in stored_guild_stats.pop(guild.id, {}).items():
+            if name in self.SERIES:
+                getattr(self, name).restore(current, counts)
+
+    def count(self, guild):
+        self.text_channels = len(guild.text_channels)
+        self.voice_channels = len(guild.voice_channels)
+        self.roles = len(guild.roles)
+
+    def sample_members(self, guild, now):
+        # member_count comes from GUILD_CREATE and is kept current by
+        # discord.py on joins and leaves, so no member list is needed
+        if guild.member_count is not None:
+            self.members_hourly.set(now, guild.member_count)
+            self.members_daily.set(now, guild.member_count)
+
+    def growth(self, now, hours=None, days=None):
+        if days is not None:
+            return self.joins_daily.total(now, days) - self.leaves_daily.total(now, days)
+        return self.joins_hourly.total(now, hours) - self.leaves_hourly.total(now, hours)
+
+guild_stats = {}
+
+class ServerStats(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        self.save_stats.start()
+
+    async def cog_unload(self):
+        self.save_stats.cancel()
+        self.save()
+
+    def track(self, guild):
+        if guild.id not in guild_stats:
+            guild_stats[guild.id] = GuildStats(guild)
+        return guild_stats[guild.id]
+
+    def save(self):
+        for guild_id, stats in guild_stats.items():
+            for name in GuildStats.SERIES:
+                series = getattr(stats, name)
+                storage.queue(
+                    'INSERT OR REPLACE INTO guild_stats (guild_id, series, current, counts) VALUES (?, ?, ?, ?)',
+                    (guild_id, name, series.current, series.values.tobytes())
+                )
+
+    def sample_members(self):
+        now = time.time()
+        for guild in self.bot.guilds:
+            stats = guild_stats.get(guild.id)
+            if stats is not None:
+                stats.sample_members(guild, now)
+
+    @tasks.loop(minutes=STATS_SAVE_INTERVAL)
+    async def save_stats(self):
+        self.sample_members()
+        self.save()
+
+    @save_stats.before_loop
+    async def before_save_stats(self):
+        await self.bot.wait_until_ready()
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        # Also fires after a reconnect, when creates and deletes may have
+        # been missed, so the counts are always taken afresh
+        stats = self.track(guild)
+        stats.count(guild)
+        stats.sample_members(guild, time.time())
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild):
+        self.track(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        guild_stats.pop(guild.id, None)
+        storage.queue('DELETE FROM guild_stats WHERE guild_id = ?', (guild.id,))
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        stats = self.track(member.guild)
+        now = time.time()
+        stats.joins_hourly.add(now)
+        stats.joins_daily.add(now)
+
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload):
+        # Raw, since the member is usually not cached in lean mode
+        stats = guild_stats.get(payload.guild_id)
+        if stats is None:
+            return
+        now = time.time()
+        stats.leaves_hourly.add(now)
+        stats.leaves_daily.add(now)
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.guild is None:
+            return
+        stats = guild_stats.get(message.guild.id)
+        if stats is not None:
+            now = time.time()
+            stats.messages_hourly.add(now)
+            stats.messages_daily.add(now)
+
+    def count_channel(self, channel, delta):
+        stats = guild_stats.get(channel.guild.id)
+        if stats is None:
+            return
+        if isinstance(channel, discord.TextChannel):
+            stats.text_channels += delta
+        elif isinstance(channel, discord.VoiceChannel):
+            stats.voice_channels += delta
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.count_channel(channel, 1)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.count_channel(channel, -1)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        if role.guild.id in guild_stats:
+            guild_stats[role.guild.id].roles += 1
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        if role.guild.id in guild_stats:
+            guild_stats[role.guild.id].roles -= 1
+
+def format_trend(current, previous):
+    if not previous:
+        return 'new' if current else 'flat'
+    change = (current - previous) / previous * 100
+    return f'{"↑" if change >= 0 else "↓"} {abs(change):.0f}%'
+
 # Utility Commands
+MAX_PREFIX_LENGTH = 5
+
 class Utility(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.command(help='Check bot latency :ping_pong:')
+    @commands.hybrid_command(help='Set the command prefix for this server :gear:')
+    @commands.has_permissions(manage_guild=True)
+    async def setprefix(self, ctx, prefix: str):
+        if len(prefix) > MAX_PREFIX_LENGTH or any(character.isspace() for character in prefix):
+            await outbox.send(
+                ctx,
+                content=f'Prefix must be at most {MAX_PREFIX_LENGTH} characters with no spaces',
+                priority=PRIORITY_DEFAULT
+            )
+            return
+        guild_settings.update(ctx.guild.id, prefix=None if prefix == DEFAULT_PREFIX else prefix)
+        embed = discord.Embed(
+            title='✅ Prefix Set',
+            description=f'Commands now use `{prefix}`',
+            color=discord.Color.green()
+        )
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_DEFAULT)
+
+    @commands.hybrid_command(help='Check bot latency :ping_pong:')
     async def ping(self, ctx):
         embed = discord.Embed(
             title='🏓 Pong!',
             description=f'Latency: {round(self.bot.latency * 1000)}ms',
             color=discord.Color.green()
         )
-        await ctx.send(embed=embed)
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_INFO)
 
-    @commands.command(help='Display server information :information_source:')
+    @commands.hybrid_command(help='Display server information :information_source:')
     async def serverinfo(self, ctx):
         guild = ctx.guild
         embed = discord.Embed(
             title=f'📊 {guild.name} Server Information',
             color=discord.Color.blue()
         )
-        embed.add_field(name='👑 Owner', value=guild.owner.mention)
+        embed.add_field(name='👑 Owner', value=f'<@{guild.owner_id}>')
         embed.add_field(name='👥 Members', value=guild.member_count)
         embed.add_field(name='📅 Created At', value=guild.created_at.strftime('%Y-%m-%d'))
-        embed.add_field(name='💬 Text Channels', value=len(guild.text_channels))
-        embed.add_field(name='🔊 Voice Channels', value=len(guild.voice_channels))
-        embed.add_field(name='🎭 Roles', value=len(guild.roles))
+        stats = guild_stats.get(guild.id)
+        if stats is None:
+            embed.add_field(name='💬 Text Channels', value=len(guild.text_channels))
+            embed.add_field(name='🔊 Voice Channels', value=len(guild.voice_channels))
+            embed.add_field(name='🎭 Roles', value=len(guild.roles))
+        else:
+            now = time.time()
+            embed.add_field(name='💬 Text Channels', value=stats.text_channels)
+            embed.add_field(name='🔊 Voice Channels', value=stats.voice_channels)
+            embed.add_field(name='🎭 Roles', value=stats.roles)
+            embed.add_field(
+                name='📈 Growth',
+                value=f'24h: {stats.growth(now, hours=24):+d}\n7d: {stats.growth(now, hours=HOURLY_SLOTS):+d}\n30d: {stats.growth(now, days=30):+d}'
+            )
+            week_ago = stats.members_daily.get(now, offset=7)
+            if week_ago:
+                embed.add_field(
+                    name='👥 Members 7d Ago',
+                    value=f'{week_ago}\n{format_trend(guild.member_count or 0, week_ago)}'
+                )
+            embed.add_field(
+                name='🚪 Joins / Leaves (24h)',
+                value=f'{stats.joins_hourly.total(now, 24)} / {stats.leaves_hourly.total(now, 24)}\n'
+                      f'Joins {format_trend(stats.joins_hourly.total(now, 24), stats.joins_hourly.total(now, 24, offset=24))}'
+            )
+            messages_today = stats.messages_hourly.total(now, 24)
+            embed.add_field(
+                name='✉️ Messages (24h)',
+                value=f'{messages_today}\n{format_trend(messages_today, stats.messages_hourly.total(now, 24, offset=24))}'
+            )
         embed.set_thumbnail(url=guild.icon.url if guild.icon else None)
-        await ctx.send(embed=embed)
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_INFO)
 
-    @commands.command(help='Display user information :bust_in_silhouette:')
-    async def userinfo(self, ctx, member: discord.Member = None):
+    @commands.hybrid_command(help='Display user information :bust_in_silhouette:')
+    async def userinfo(self, ctx, member: CachedMember = None):
         member = member or ctx.author
         roles = [role.mention for role in member.roles[1:]]
         embed = discord.Embed(
@@ -448,15 +2203,15 @@ class Utility(commands.Cog):
         embed.add_field(name='🎭 Roles', value=' '.join(roles) if roles else 'None')
         embed.add_field(name='🤖 Bot', value='Yes' if member.bot else 'No')
         embed.set_thumbnail(url=member.avatar.url if member.avatar else None)
-        await ctx.send(embed=embed)
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_INFO)
 
 # Profile System
 class Profile(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @commands.command(name='profile', aliases=['p'], help='View your or another user\'s profile 👤')
-    async def profile(self, ctx, member: discord.Member = None):
+    @commands.hybrid_command(name='profile', aliases=['p'], help='View your or another user\'s profile 👤')
+    async def profile(self, ctx, member: CachedMember = None):
         member = member or ctx.author
         
         embed = discord.Embed(
@@ -470,45 +2225,371 @@ class Profile(commands.Cog):
         embed.add_field(name='📅 Joined', value=member.joined_at.strftime('%Y-%m-%d'), inline=True)
         
         # Add badges (with custom emoji examples)
-        badges = user_data['badges'].get(member.id, set())
-        badge_display = '\n'.join([BADGES[badge] for badge in badges]) if badges else BADGES['no_badge']
+        badges = user_data['badges'].get(member.id)
+        badge_display = '\n'.join(BADGE_DISPLAY[badge] for badge in BADGES if badge in badges) if badges else BADGE_DISPLAY['no_badge']
         embed.add_field(
             name='<a:badge1:1389182687947919370> Badges',  # Replace with your server's badge emoji ID
-            value=badge_display.replace('👑', '<:owner1:1389180694814654474>')
-                              .replace('🛡️', '<a:staff112:1389180853195771906>')
-                              .replace('⚡', '<:admin1:1389181036755161221>')
-                              .replace('❌', '<a:nope1:1389178762020520109>'),
+            value=badge_display,
             inline=False
         )
         
         # Add no-prefix status (with custom emoji examples)
-        no_prefix_status = '<:tick1:1389181551358509077> Enabled' if member.id in no_prefix_users else '<a:nope1:1389178762020520109> Disabled'
+        no_prefix_status = NO_PREFIX_ENABLED if member.id in no_prefix_users else NO_PREFIX_DISABLED
         embed.add_field(name='<:prefix1:1389181942553116695> No-Prefix Status', value=no_prefix_status, inline=False)
         
-        await ctx.send(embed=embed)
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_INFO)
 
-    @commands.command(help='Grant a badge to a user 🏅')
+    @commands.hybrid_command(help='Grant a badge to a user 🏅')
     @commands.is_owner()
     async def grant_badge(self, ctx, member: discord.Member, badge: str):
         if badge.lower() not in BADGES:
-            await ctx.send(f'Invalid badge. Available badges: {", ".join(BADGES.keys())}')
+            await outbox.send(
+                ctx,
+                content=f'Invalid badge. Available badges: {", ".join(BADGES.keys())}',
+                priority=PRIORITY_DEFAULT
+            )
             return
         
         if member.id not in user_data['badges']:
             user_data['badges'][member.id] = set()
         
         user_data['badges'][member.id].add(badge.lower())
-        await ctx.send(f'Granted {BADGES[badge.lower()]} to {member.mention}')
+        storage.queue('INSERT OR IGNORE INTO badges (user_id, badge) VALUES (?, ?)', (member.id, badge.lower()))
+        await outbox.send(
+            ctx,
+            content=f'Granted {BADGES[badge.lower()]} to {member.mention}',
+            priority=PRIORITY_DEFAULT
+        )
 
-    @commands.command(help='Revoke a badge from a user ❌')
+    @commands.hybrid_command(help='Revoke a badge from a user ❌')
     @commands.is_owner()
     async def revoke_badge(self, ctx, member: discord.Member, badge: str):
         if member.id not in user_data['badges'] or badge.lower() not in user_data['badges'][member.id]:
-            await ctx.send(f'{member.mention} does not have this badge')
+            await outbox.send(
+                ctx,
+                content=f'{member.mention} does not have this badge',
+                priority=PRIORITY_DEFAULT
+            )
             return
         
         user_data['badges'][member.id].remove(badge.lower())
-        await ctx.send(f'Revoked {BADGES[badge.lower()]} from {member.mention}')
+        storage.queue('DELETE FROM badges WHERE user_id = ? AND badge = ?', (member.id, badge.lower()))
+        await outbox.send(
+            ctx,
+            content=f'Revoked {BADGES[badge.lower()]} from {member.mention}',
+            priority=PRIORITY_DEFAULT
+        )
+
+# Anti-spam
+# Runs on every message in enabled guilds, so all per-message work is O(1):
+# each tracked user keeps a fixed-size deque of recent timestamps and a
+# fixed-size ring of content hashes, and the set of tracked users is an LRU
+# capped at SPAM_TRACKED_USERS. Worst-case memory is therefore about
+# SPAM_TRACKED_USERS * (SPAM_MAX_MESSAGES + 3 * SPAM_HASH_RING) small objects.
+SPAM_WINDOW = 5  # seconds
+SPAM_MAX_MESSAGES = 8  # per SPAM_WINDOW
+DUPLICATE_WINDOW = 30  # seconds
+DUPLICATE_MAX = 4  # copies of the same content within DUPLICATE_WINDOW
+DUPLICATE_MIN_CHANNELS = 2  # copies must be spread over this many channels
+DUPLICATE_MIN_LENGTH = 10  # normalized characters; shorter messages never count
+SPAM_HASH_RING = 16
+SPAM_TRACKED_USERS = 50000
+SPAM_TIMEOUT = timedelta(minutes=10)
+
+def spam_fingerprint(content):
+    # Near-duplicates (case, punctuation, spacing, stretched letters or
+    # appended counters) normalize to the same text. Letters of any script
+    # are kept; short replies like "lol" or "ok" are never fingerprinted.
+    content = re.sub(r'[\W\d_]+', '', content.casefold())
+    content = re.sub(r'(.)\1+', r'\1', content)
+    if len(content) < DUPLICATE_MIN_LENGTH:
+        return None
+    return hash(content)
+
+class SpamTracker:
+    __slots__ = ('times', 'hashes', 'hash_times', 'hash_channels', 'position')
+
+    def __init__(self):
+        self.times = deque(maxlen=SPAM_MAX_MESSAGES)
+        self.hashes = [0] * SPAM_HASH_RING
+        self.hash_times = [0.0] * SPAM_HASH_RING
+        self.hash_channels = [0] * SPAM_HASH_RING
+        self.position = 0
+
+    def record(self, now, fingerprint, channel_id):
+        # Returns a reason string when the message tips the user over a limit
+        self.times.append(now)
+        if len(self.times) == SPAM_MAX_MESSAGES and now - self.times[0] <= SPAM_WINDOW:
+            return f'{SPAM_MAX_MESSAGES} messages in {SPAM_WINDOW}s'
+        if fingerprint is None:
+            return None
+        self.hashes[self.position] = fingerprint
+        self.hash_times[self.position] = now
+        self.hash_channels[self.position] = channel_id
+        self.position = (self.position + 1) % SPAM_HASH_RING
+        # Only copies posted across channels count; repeating yourself in one
+        # channel is left to the message rate limit above
+        copy_channels = [
+            self.hash_channels[index] for index in range(SPAM_HASH_RING)
+            if self.hashes[index] == fingerprint and now - self.hash_times[index] <= DUPLICATE_WINDOW
+        ]
+        if len(copy_channels) >= DUPLICATE_MAX and len(set(copy_channels)) >= DUPLICATE_MIN_CHANNELS:
+            return f'{len(copy_channels)} duplicate messages in {len(set(copy_channels))} channels within {DUPLICATE_WINDOW}s'
+        return None
+
+    def channels(self, now):
+        return {
+            self.hash_channels[index] for index in range(SPAM_HASH_RING)
+            if self.hash_channels[index] and now - self.hash_times[index] <= DUPLICATE_WINDOW
+        }
+
+class AntiSpam(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.trackers = OrderedDict()
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.guild is None or message.guild.id not in antispam_guilds or message.author.bot:
+            return
+        key = (message.guild.id, message.author.id)
+        tracker = self.trackers.get(key)
+        if tracker is None:
+            tracker = self.trackers[key] = SpamTracker()
+            if len(self.trackers) > SPAM_TRACKED_USERS:
+                self.trackers.popitem(last=False)
+        else:
+            self.trackers.move_to_end(key)
+        now = time.monotonic()
+        reason = tracker.record(now, spam_fingerprint(message.content), message.channel.id)
+        if reason is None:
+            return
+        member = message.author
+        if not isinstance(member, discord.Member) or member.guild_permissions.manage_messages:
+            return
+        channel_ids = tracker.channels(now) | {message.channel.id}
+        del self.trackers[key]
+        await self.punish(member, channel_ids, reason, message.channel)
+
+    async def punish(self, member, channel_ids, reason, log_channel):
+        metrics.increment('spam_detections')
+        try:
+            await member.timeout(SPAM_TIMEOUT, reason=f'Anti-spam: {reason}')
+        except discord.HTTPException:
+            pass
+        else:
+            log_case(member.guild.id, 'timeout', member.id, self.bot.user.id, f'Anti-spam: {reason}')
+
+        moderation = self.bot.get_cog('Moderation')
+        after = discord.utils.utcnow() - timedelta(seconds=DUPLICATE_WINDOW)
+        deleted = 0
+        for channel_id in channel_ids:
+            channel = member.guild.get_channel(channel_id)
+            if channel is None or moderation is None:
+                continue
+            try:
+                _, channel_deleted = await moderation.purge(
+                    channel, SPAM_HASH_RING * 2, lambda message: message.author.id == member.id, after=after
+                )
+            except discord.HTTPException:
+                continue
+            deleted += channel_deleted
+
+        embed = discord.Embed(
+            title='🚫 Spam Detected',
+            description=(
+                f'{member.mention} has been timed out for {int(SPAM_TIMEOUT.total_seconds() // 60)} minutes\n'
+                f'Reason: {reason}\nMessages removed: {deleted}'
+            ),
+            color=discord.Color.red()
+        )
+        await outbox.send(log_channel, embed=embed, priority=PRIORITY_MODERATION)
+
+    @commands.hybrid_command(help='Turn the automatic anti-spam detector on or off :no_entry:')
+    @commands.has_permissions(manage_guild=True)
+    async def antispam(self, ctx, enabled: bool):
+        if enabled:
+            antispam_guilds.add(ctx.guild.id)
+            storage.queue('INSERT OR IGNORE INTO antispam_guilds (guild_id) VALUES (?)', (ctx.guild.id,))
+        else:
+            antispam_guilds.discard(ctx.guild.id)
+            storage.queue('DELETE FROM antispam_guilds WHERE guild_id = ?', (ctx.guild.id,))
+        embed = discord.Embed(
+            title='🚫 Anti-Spam',
+            description=f'Anti-spam is now {"enabled" if enabled else "disabled"}',
+            color=discord.Color.green() if enabled else discord.Color.orange()
+        )
+        await outbox.send(ctx, embed=embed, priority=PRIORITY_MODERATION)
+
+# Monitoring
+# Command counts and latency histograms, event-loop lag, gateway latency and
+# internal queue depths, served in Prometheus text format on METRICS_PORT
+# (disabled when unset) and summarized by the owner-only stats command.
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+LOOP_LAG_INTERVAL = 0.5  # seconds
+
+class Metrics:
+    def __init__(self):
+        self.invocations = {}
+        self.latency_buckets = {}
+        self.latency_sums = {}
+        self.errors = {}
+        self.error_types = {}
+        self.counters = {}
+        self.loop_lag = 0.0
+        self.max_loop_lag = 0.0
+
+    def observe_command(self, name, seconds):
+        if name not in self.latency_buckets:
+            self.latency_buckets[name] = [0] * len(LATENCY_BUCKETS)
+            self.latency_sums[name] = 0.0
+            self.invocations[name] = 0
+        self.invocations[name] += 1
+        self.latency_sums[name] += seconds
+        self.latency_buckets[name][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def observe_error(self, name, error_type):
+        self.errors[name] = self.errors.get(name, 0) + 1
+        self.error_types[(name, error_type)] = self.error_types.get((name, error_type), 0) + 1
+
+    def increment(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def percentile(self, name, fraction):
+        # Upper bound of the bucket holding the given fraction of samples
+        buckets = self.latency_buckets[name]
+        target = fraction * sum(buckets)
+        seen = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+            seen += bucket_count
+            if seen >= target:
+                return bound
+        return LATENCY_BUCKETS[-1]
+
+    def wait_for_listeners(self):
+        return sum(len(listeners) for listeners in bot._listeners.values())
+
+    def render(self):
+        lines = ['# TYPE universx_command_invocations_total counter']
+        for name, value in self.invocations.items():
+            lines.append(f'universx_command_invocations_total{{command="{name}"}} {value}')
+        lines.append('# TYPE universx_command_latency_seconds histogram')
+        for name, buckets in self.latency_buckets.items():
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else bound
+                lines.append(f'universx_command_latency_seconds_bucket{{command="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'universx_command_latency_seconds_sum{{command="{name}"}} {self.latency_sums[name]}')
+            lines.append(f'universx_command_latency_seconds_count{{command="{name}"}} {cumulative}')
+        lines.append('# TYPE universx_command_errors_total counter')
+        for (name, error_type), value in self.error_types.items():
+            lines.append(f'universx_command_errors_total{{command="{name}",error="{error_type}"}} {value}')
+        for name, value in self.counters.items():
+            lines.append(f'# TYPE universx_{name}_total counter')
+            lines.append(f'universx_{name}_total {value}')
+        lines.append('# TYPE universx_gateway_latency_seconds gauge')
+        for shard_id, latency in bot.latencies:
+            lines.append(f'universx_gateway_latency_seconds{{shard="{shard_id}"}} {latency}')
+        gauges = {
+            'event_loop_lag_seconds': self.loop_lag,
+            'event_loop_lag_max_seconds': self.max_loop_lag,
+            'wait_for_listeners': self.wait_for_listeners(),
+            'storage_pending_writes': len(storage.pending),
+            'log_suppressed_errors': error_sampler.suppressed_total,
+            'guilds': len(bot.guilds)
+        }
+        gauges.update((f'outbox_{key}', value) for key, value in outbox.stats().items())
+        gauges.update((f'startup_{phase}_seconds', value) for phase, value in startup_phases.items())
+        for name, value in gauges.items():
+            lines.append(f'# TYPE universx_{name} gauge')
+            lines.append(f'universx_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+class Monitoring(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.lag_sampler = None
+        self.runner = None
+
+    async def cog_load(self):
+        self.lag_sampler = asyncio.create_task(self.sample_loop_lag())
+        if METRICS_PORT is not None:
+            app = web.Application()
+            app.router.add_get('/metrics', self.serve_metrics)
+            self.runner = web.AppRunner(app)
+            await self.runner.setup()
+            await web.TCPSite(self.runner, METRICS_HOST, METRICS_PORT).start()
+
+    async def cog_unload(self):
+        self.lag_sampler.cancel()
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    async def sample_loop_lag(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            metrics.loop_lag = max(0.0, time.perf_counter() - started - LOOP_LAG_INTERVAL)
+            metrics.max_loop_lag = max(metrics.max_loop_lag, metrics.loop_lag)
+
+    async def serve_metrics(self, request):
+        return web.Response(text=metrics.render(), content_type='text/plain')
+
+    @commands.Cog.listener()
+    async def on_command(self, ctx):
+        ctx.metrics_started = time.perf_counter()
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx):
+        metrics.observe_command(ctx.command.qualified_name, time.perf_counter() - ctx.metrics_started)
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx, error):
+        if ctx.command is None or not hasattr(ctx, 'metrics_started'):
+            return
+        metrics.observe_command(ctx.command.qualified_name, time.perf_counter() - ctx.metrics_started)
+        metrics.observe_error(ctx.command.qualified_name, type(getattr(error, 'original', error)).__name__)
+
+    @commands.hybrid_command(help='Show bot performance statistics (Owner) :bar_chart:')
+    @commands.is_owner()
+    async def stats(self, ctx):
+        embed = discord.Embed(
+            title='📈 Bot Statistics',
+            color=discord.Color.blue()
+        )
+        embed.add_field(name='🏓 Gateway Latency', value=f'{round(self.bot.latency * 1000)}ms')
+        embed.add_field(name='⏱️ Loop Lag', value=f'{metrics.loop_lag * 1000:.1f}ms (max {metrics.max_loop_lag * 1000:.1f}ms)')
+        embed.add_field(name='👂 wait_for Listeners', value=metrics.wait_for_listeners())
+        outbox_stats = outbox.stats()
+        embed.add_field(
+            name='📤 Outbox',
+            value=f'{outbox_stats["queue_depth"]} queued, avg wait {outbox_stats["average_wait"] * 1000:.1f}ms'
+        )
+        embed.add_field(name='💾 Pending Writes', value=len(storage.pending))
+        if startup_phases:
+            embed.add_field(
+                name='🚀 Startup',
+                value=', '.join(f'{phase} {seconds:.2f}s' for phase, seconds in startup_phases.items()),
+                inline=False
+            )
+        busiest = sorted(metrics.invocations, key=metrics.invocations.get, reverse=True)[:10]
+        if busiest:
+            embed.add_field(
+                name='⌨️ Commands (count / avg / p99 / errors)',
+                value='\n'.join(
+                    f'`{name}` {metrics.invocations[name]} / '
+                    f'{metrics.latency_sums[name] / metrics.invocations[name] * 1000:.0f}ms / '
+                    f'≤{metrics.percentile(name, 0.99)}s / {metrics.errors.get(name, 0)}'
+                    for name in busiest
+                ),
+                inline=False
+            )
+        await ctx.send(embed=embed)
 
 # Add all cogs
 async def setup_cogs():
@@ -517,12 +2598,20 @@ async def setup_cogs():
     await bot.add_cog(Application(bot))
     await bot.add_cog(Utility(bot))
     await bot.add_cog(Profile(bot))
+    await bot.add_cog(AntiSpam(bot))
+    await bot.add_cog(ServerStats(bot))
+    await bot.add_cog(Monitoring(bot))
 
-@bot.event
-async def on_ready():
-    await setup_cogs()
-    print(f'{bot.user} has connected to Discord!')
-    await bot.change_presence(activity=discord.Game(name='Universx MC | u!help'))
+# Run the bot. Guarded so the cogs and helpers can be imported and driven
+# from synthetic events without connecting to Discord.
+def main():
+    record_phase('import')
+    listener = setup_logging()
+    try:
+        bot.run(os.getenv('DISCORD_BOT_TOKEN'), log_handler=None)
+    finally:
+        storage.close()
+        listener.stop()
 
-# Setup cogs and run the bot
-bot.run(os.getenv('DISCORD_BOT_TOKEN'))
+if __name__ == '__main__':
+    main()
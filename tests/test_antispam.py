@@ -0,0 +1,48 @@
+import bot
+
+
+def record(tracker, messages):
+    reason = None
+    for now, content, channel_id in messages:
+        reason = tracker.record(now, bot.spam_fingerprint(content), channel_id) or reason
+    return reason
+
+
+def test_fingerprint_ignores_short_messages():
+    assert bot.spam_fingerprint('lol') is None
+    assert bot.spam_fingerprint('looooool!!!') is None
+    assert bot.spam_fingerprint('') is None
+
+
+def test_fingerprint_matches_near_duplicates():
+    assert bot.spam_fingerprint('FREE NITRO at example') == bot.spam_fingerprint('free nitroooo at example!! 2')
+    assert bot.spam_fingerprint('free nitro at example') != bot.spam_fingerprint('free robux at example')
+
+
+def test_fingerprint_keeps_non_latin_text():
+    assert bot.spam_fingerprint('бесплатный нитро здесь') is not None
+    assert bot.spam_fingerprint('бесплатный нитро здесь') != bot.spam_fingerprint('бесплатные робуксы тут')
+
+
+def test_repeats_in_one_channel_are_not_duplicate_spam():
+    tracker = bot.SpamTracker()
+    messages = [(second * 2.0, 'see you all tomorrow', 1) for second in range(6)]
+    assert record(tracker, messages) is None
+
+
+def test_short_repeats_across_channels_are_not_duplicate_spam():
+    tracker = bot.SpamTracker()
+    messages = [(second * 2.0, 'lol', 1 + second % 2) for second in range(6)]
+    assert record(tracker, messages) is None
+
+
+def test_repeats_across_channels_are_duplicate_spam():
+    tracker = bot.SpamTracker()
+    messages = [(second * 2.0, 'join my server discord gg', 1 + second % 3) for second in range(4)]
+    assert record(tracker, messages) == '4 duplicate messages in 3 channels within 30s'
+
+
+def test_message_flood_in_one_channel_is_spam():
+    tracker = bot.SpamTracker()
+    messages = [(second * 0.1, f'message {second}', 1) for second in range(bot.SPAM_MAX_MESSAGES)]
+    assert record(tracker, messages) == f'{bot.SPAM_MAX_MESSAGES} messages in {bot.SPAM_WINDOW}s'
@@ -0,0 +1,145 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+import bot
+
+
+class FakeBot:
+    def __init__(self, channels, remote_channels=None, shard_ids=(0,), shard_count=1):
+        self.channels = channels
+        self.remote_channels = remote_channels or {}
+        self.shard_ids = list(shard_ids)
+        self.shard_count = shard_count
+
+    async def wait_until_ready(self):
+        pass
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    async def fetch_channel(self, channel_id):
+        if channel_id not in self.remote_channels:
+            raise discord.NotFound(SimpleNamespace(status=404, reason='Not Found'), 'Unknown Channel')
+        return self.remote_channels[channel_id]
+
+
+def guild_channel(guild_id):
+    return SimpleNamespace(guild=SimpleNamespace(id=guild_id))
+
+
+def test_cluster_process_only_resumes_its_own_sessions(monkeypatch):
+    monkeypatch.setattr(bot, 'CLUSTER_MODE', True)
+    monkeypatch.setattr(bot, 'application_sessions', {
+        (1, 100): {'answers': [], 'deadline': 10.0},
+        (2, 200): {'answers': ['Steve'], 'deadline': 20.0},
+        (3, 300): {'answers': [], 'deadline': 30.0},
+    })
+    queued = []
+    monkeypatch.setattr(bot.storage, 'queue', lambda sql, params=(): queued.append(params))
+    # Guild 1 is on shard 1, owned by another process; DMs belong to shard 0
+    cog = bot.Application(FakeBot(
+        {100: guild_channel(2 << 22)},
+        remote_channels={200: guild_channel(1 << 22), 300: SimpleNamespace()},
+        shard_ids=(2, 3),
+        shard_count=4
+    ))
+
+    asyncio.run(cog.before_expire_sessions())
+
+    assert list(bot.application_sessions) == [(1, 100)]
+    assert cog.deadlines == [(10.0, (1, 100))]
+    # The other processes' rows are left alone
+    assert queued == []
+
+
+def test_dm_sessions_are_resumed_after_a_restart(monkeypatch):
+    monkeypatch.setattr(bot, 'CLUSTER_MODE', True)
+    monkeypatch.setattr(bot, 'application_sessions', {
+        (1, 100): {'answers': [], 'deadline': 10.0},
+        (2, 200): {'answers': [], 'deadline': 20.0},
+    })
+    queued = []
+    monkeypatch.setattr(bot.storage, 'queue', lambda sql, params=(): queued.append(params))
+    # The DM channel is not cached yet; channel 200 has been deleted
+    cog = bot.Application(FakeBot({}, remote_channels={100: SimpleNamespace()}, shard_ids=(0, 1), shard_count=4))
+
+    asyncio.run(cog.before_expire_sessions())
+
+    assert list(bot.application_sessions) == [(1, 100)]
+    assert cog.deadlines == [(10.0, (1, 100))]
+    assert queued == [(2, 200)]
+
+
+def test_single_process_resumes_every_session(monkeypatch):
+    monkeypatch.setattr(bot, 'CLUSTER_MODE', False)
+    monkeypatch.setattr(bot, 'application_sessions', {
+        (1, 100): {'answers': [], 'deadline': 10.0},
+        (2, 200): {'answers': [], 'deadline': 20.0},
+    })
+    cog = bot.Application(FakeBot({100: guild_channel(0), 200: guild_channel(0)}))
+
+    asyncio.run(cog.before_expire_sessions())
+
+    assert sorted(cog.deadlines) == [(10.0, (1, 100)), (20.0, (2, 200))]
+
+
+def test_prefix_apply_points_to_the_modal_in_interactions_only_mode(monkeypatch):
+    monkeypatch.setattr(bot, 'INTERACTIONS_ONLY', True)
+    monkeypatch.setattr(bot, 'application_sessions', {})
+    sent = []
+
+    async def send(content=None, **kwargs):
+        sent.append(content)
+
+    ctx = SimpleNamespace(
+        interaction=None,
+        author=SimpleNamespace(id=1),
+        channel=SimpleNamespace(id=100),
+        send=send
+    )
+    cog = bot.Application(FakeBot({}))
+
+    asyncio.run(cog.apply.callback(cog, ctx))
+
+    assert sent == ['Use `/apply` to fill in the application form.']
+    assert bot.application_sessions == {}
+
+
+class RecordingChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+
+def test_thousands_of_interleaved_applicants_complete(monkeypatch):
+    monkeypatch.setattr(bot, 'application_sessions', {})
+    monkeypatch.setattr(bot, 'applications', {})
+    monkeypatch.setattr(bot.storage, 'queue', lambda sql, params=(): None)
+    cog = bot.Application(FakeBot({}))
+    channels = [RecordingChannel(10000 + user_id) for user_id in range(3000)]
+    for user_id, channel in enumerate(channels):
+        bot.application_sessions[(user_id, channel.id)] = {'answers': [], 'deadline': 0}
+        cog.reset_deadline((user_id, channel.id))
+
+    def message(user_id, channel, content):
+        return SimpleNamespace(author=SimpleNamespace(id=user_id), channel=channel, content=content)
+
+    async def run():
+        # Every applicant answers one question per round, with chatter from
+        # someone else in the same channel in between
+        for step in range(4):
+            for user_id, channel in enumerate(channels):
+                await cog.on_message(message(user_id + 5000, channel, 'gg'))
+                await cog.on_message(message(user_id, channel, f'answer {step}'))
+
+    asyncio.run(run())
+    assert bot.application_sessions == {}
+    assert len(bot.applications) == 3000
+    assert bot.applications[42]['answers'] == ['answer 0', 'answer 1', 'answer 2', 'answer 3']
+    # Three follow-up questions and the confirmation
+    assert all(channel.sent == 4 for channel in channels)
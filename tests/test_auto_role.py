@@ -0,0 +1,116 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+class RecordingChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.embeds = []
+
+    async def send(self, embed=None, **kwargs):
+        self.embeds.append(embed)
+
+
+def make_guild(channel):
+    role = SimpleNamespace(id=5, name='Member')
+    return SimpleNamespace(
+        id=1,
+        system_channel=channel,
+        text_channels=[channel],
+        get_channel=lambda channel_id: None,
+        get_role=lambda role_id: role if role_id == role.id else None
+    )
+
+
+def make_member(guild, user_id, assigned):
+    async def add_roles(*roles):
+        assigned.append(user_id)
+
+    return SimpleNamespace(id=user_id, guild=guild, mention=f'<@{user_id}>', add_roles=add_roles)
+
+
+def with_auto_role(monkeypatch):
+    settings = bot.GuildSettings()
+    settings.guilds[1] = {'prefix': None, 'auto_roles': [5], 'welcome_channel_id': None}
+    monkeypatch.setattr(bot, 'guild_settings', settings)
+
+
+def test_token_bucket_paces_after_the_burst(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(bot.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(bot.asyncio, 'sleep', clock.sleep)
+    bucket = bot.TokenBucket(4, 8)
+
+    async def run():
+        for _ in range(16):
+            await bucket.acquire()
+
+    asyncio.run(run())
+    # The first 8 use the burst, the next 8 wait 1/4 s each
+    assert abs(clock.now - 2.0) < 1e-9
+
+
+def test_joins_are_welcomed_in_one_message(monkeypatch):
+    with_auto_role(monkeypatch)
+    monkeypatch.setattr(bot, 'ROLE_ASSIGN_BURST', 100)
+    channel = RecordingChannel(10)
+    guild = make_guild(channel)
+    assigned = []
+    cog = bot.AutoRole(SimpleNamespace())
+
+    async def run():
+        for user_id in range(40):
+            await cog.on_member_join(make_member(guild, user_id, assigned))
+        await cog.join_queues[1].join()
+        await cog.send_welcomes.coro(cog)
+        cog.join_workers[1].cancel()
+
+    asyncio.run(run())
+    assert assigned == list(range(40))
+    assert len(channel.embeds) == 1
+    description = channel.embeds[0].description
+    assert description.startswith('Welcome <@0>, <@1>')
+    assert description.count('<@') == bot.WELCOME_MAX_MENTIONS
+    assert 'and 10 more' in description
+    assert cog.pending_welcomes == {}
+
+
+def test_joins_beyond_the_queue_are_dropped(monkeypatch):
+    with_auto_role(monkeypatch)
+    monkeypatch.setattr(bot, 'JOIN_QUEUE_SIZE', 5)
+    guild = make_guild(RecordingChannel(10))
+    cog = bot.AutoRole(SimpleNamespace())
+
+    async def run():
+        # The worker does not get to run between these joins
+        for user_id in range(8):
+            await cog.on_member_join(make_member(guild, user_id, []))
+        cog.join_workers[1].cancel()
+
+    asyncio.run(run())
+    assert cog.dropped_joins == 3
+
+
+def test_welcome_channel_is_cached_until_channels_change():
+    first, second = RecordingChannel(10), RecordingChannel(11)
+    guild = make_guild(first)
+    cog = bot.AutoRole(SimpleNamespace())
+    assert cog.get_welcome_channel(guild) is first
+
+    guild.system_channel = second
+    assert cog.get_welcome_channel(guild) is first
+    asyncio.run(cog.on_guild_channel_update(None, SimpleNamespace(guild=guild)))
+    assert cog.get_welcome_channel(guild) is second
@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+import bot
+
+
+def user(user_id, name, discriminator='0'):
+    return SimpleNamespace(id=user_id, name=name, discriminator=discriminator)
+
+
+def test_find_by_id_mention_name_and_tag():
+    index = bot.BanIndex()
+    steve = user(100000000000000001, 'Steve')
+    alex = user(100000000000000002, 'alex', '1234')
+    index.add(steve)
+    index.add(alex)
+
+    assert index.find('100000000000000001') is steve
+    assert index.find('<@100000000000000001>') is steve
+    assert index.find('@steve') is steve
+    assert index.find('Alex#1234') is alex
+    assert index.find('herobrine') is None
+
+
+def test_shared_names_keep_every_user():
+    index = bot.BanIndex()
+    first = user(1, 'steve', '0001')
+    second = user(2, 'steve', '0002')
+    index.add(first)
+    index.add(second)
+
+    # Ambiguous by name, exact by tag
+    assert index.find('steve') is None
+    assert index.find('steve#0002') is second
+    assert {found.id for found in index.search('ste')} == {1, 2}
+
+    index.remove(1)
+    assert index.names == ['steve']
+    assert index.find('steve') is second
+
+    index.remove(2)
+    assert index.names == []
+    assert index.search('ste') == []
+
+
+def test_search_is_prefix_ordered_and_limited():
+    index = bot.BanIndex()
+    for user_id, name in enumerate(['bob', 'steve', 'stella', 'stan', 'sten', 'stu', 'sty', 'zed']):
+        index.add(user(user_id, name))
+
+    assert [found.name for found in index.search('st', limit=3)] == ['stan', 'stella', 'sten']
+    assert index.search('q') == []
+
+
+def test_re_adding_a_renamed_user_moves_it():
+    index = bot.BanIndex()
+    index.add(user(1, 'steve'))
+    index.add(user(1, 'alex'))
+
+    assert index.names == ['alex']
+    assert index.find('steve') is None
+    assert index.find('alex').id == 1
+
+
+class FakeGuild:
+    def __init__(self, banned, on_page=None):
+        self.id = 1
+        self.banned = banned
+        self.on_page = on_page
+
+    async def bans(self, limit=None):
+        for position, banned_user in enumerate(self.banned):
+            if self.on_page is not None and position == 1:
+                # The gateway delivers events while the listing is paged
+                await self.on_page()
+            yield SimpleNamespace(user=banned_user)
+
+
+def test_events_during_build_are_applied():
+    cog = bot.Moderation(None)
+    steve = user(1, 'steve')
+    alex = user(2, 'alex')
+    herobrine = user(3, 'herobrine')
+
+    async def events():
+        # Steve's page was already fetched, and herobrine is banned too late
+        await cog.on_member_unban(guild, steve)
+        await cog.on_member_ban(guild, herobrine)
+
+    guild = FakeGuild([steve, alex], on_page=events)
+    index = asyncio.run(cog.get_ban_index(guild))
+
+    assert index.find('steve') is None
+    assert index.find('alex') is alex
+    assert index.find('herobrine') is herobrine
+    assert cog.pending_ban_events == {}
+
+
+def test_unban_of_user_no_longer_banned(monkeypatch):
+    cog = bot.Moderation(None)
+    steve = user(1, 'steve')
+    guild = FakeGuild([steve])
+    sent = []
+
+    async def unban(target):
+        raise discord.NotFound(SimpleNamespace(status=404, reason='Not Found'), 'Unknown Ban')
+
+    async def send(ctx, content=None, **kwargs):
+        sent.append(content)
+
+    async def defer():
+        pass
+
+    guild.unban = unban
+    monkeypatch.setattr(bot.outbox, 'send', send)
+    ctx = SimpleNamespace(guild=guild, author=user(9, 'mod'), defer=defer)
+
+    async def run():
+        await bot.Moderation.unban.callback(cog, ctx, member='steve')
+        return await cog.get_ban_index(guild)
+
+    index = asyncio.run(run())
+    assert sent[0].endswith('is not banned')
+    assert len(index) == 0
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+
+OWNER = 100000000000000000
+MODERATOR = 100000000000000001
+HELPER = 100000000000000002
+ADMIN = 100000000000000003
+NON_MEMBER = 100000000000000004
+BOT = 100000000000000009
+
+
+class FakeGuild:
+    def __init__(self, members):
+        self.id = 1
+        self.owner_id = OWNER
+        self.members = list(members.values())
+        self.by_id = members
+
+    def get_member(self, user_id):
+        return self.by_id.get(user_id)
+
+
+def setup(monkeypatch, author_id):
+    ranks = {OWNER: 10, MODERATOR: 5, HELPER: 2, ADMIN: 8}
+    members = {user_id: SimpleNamespace(id=user_id, top_role=rank, joined_at=None) for user_id, rank in ranks.items()}
+    guild = FakeGuild(members)
+    ctx = SimpleNamespace(
+        guild=guild,
+        author=members[author_id],
+        message=SimpleNamespace(attachments=[])
+    )
+    sent = []
+
+    async def send(ctx, content=None, **kwargs):
+        sent.append(content)
+
+    monkeypatch.setattr(bot.outbox, 'send', send)
+    cog = bot.Moderation(SimpleNamespace(user=SimpleNamespace(id=BOT)))
+    return cog, ctx, sent
+
+
+def test_targets_at_or_above_the_invoker_are_skipped(monkeypatch):
+    cog, ctx, sent = setup(monkeypatch, MODERATOR)
+    text = f'{HELPER} {ADMIN} <@{NON_MEMBER}> {BOT} reason: raid'
+
+    user_ids, skipped, reason = asyncio.run(cog.collect_targets(ctx, text))
+
+    assert user_ids == [HELPER, NON_MEMBER]
+    assert skipped == 1
+    assert reason == 'raid'
+
+
+def test_guild_owner_is_not_limited_by_hierarchy(monkeypatch):
+    cog, ctx, sent = setup(monkeypatch, OWNER)
+
+    user_ids, skipped, reason = asyncio.run(cog.collect_targets(ctx, f'{MODERATOR} {ADMIN}'))
+
+    assert user_ids == [MODERATOR, ADMIN]
+    assert skipped == 0
+
+
+def test_all_targets_outranking_is_reported(monkeypatch):
+    cog, ctx, sent = setup(monkeypatch, HELPER)
+
+    assert asyncio.run(cog.collect_targets(ctx, f'{MODERATOR} {ADMIN}')) is None
+    assert sent == ['No targets found (2 skipped: their top role is not below yours)']
+
+
+def test_joined_selector_needs_member_cache(monkeypatch):
+    monkeypatch.setattr(bot, 'LEAN_MODE', True)
+    cog, ctx, sent = setup(monkeypatch, MODERATOR)
+
+    assert asyncio.run(cog.collect_targets(ctx, 'joined:10')) is None
+    assert 'member cache' in sent[0]
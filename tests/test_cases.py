@@ -0,0 +1,126 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import bot
+
+GUILD = 1
+MODERATOR = 100000000000000001
+BOT = 100000000000000009
+
+
+def open_storage(monkeypatch, tmp_path):
+    storage = bot.Storage(str(tmp_path / 'universx.db'))
+    storage.open()
+    monkeypatch.setattr(bot, 'storage', storage)
+    monkeypatch.setattr(bot, 'warn_counts', {})
+    return storage
+
+
+class FakeMember:
+    def __init__(self, member_id):
+        self.id = member_id
+        self.mention = f'<@{member_id}>'
+        self.actions = []
+
+    async def timeout(self, duration, reason=None):
+        self.actions.append(('timeout', duration))
+
+    async def kick(self, reason=None):
+        self.actions.append(('kick', None))
+
+
+def setup(monkeypatch):
+    sent = []
+
+    async def send(ctx, content=None, embed=None, **kwargs):
+        sent.append(embed)
+
+    monkeypatch.setattr(bot.outbox, 'send', send)
+    ctx = SimpleNamespace(guild=SimpleNamespace(id=GUILD), author=SimpleNamespace(id=MODERATOR))
+    cog = bot.Moderation(SimpleNamespace(user=SimpleNamespace(id=BOT)))
+    return cog, ctx, sent
+
+
+def test_log_case_counts_warnings_per_guild(monkeypatch, tmp_path):
+    storage = open_storage(monkeypatch, tmp_path)
+    bot.log_case(GUILD, 'warn', 5, MODERATOR, 'spam')
+    bot.log_case(GUILD, 'warn', 5, MODERATOR)
+    bot.log_case(GUILD, 'kick', 5, MODERATOR)
+    bot.log_case(2, 'warn', 5, MODERATOR)
+
+    assert bot.get_warn_count(GUILD, 5) == 2
+    assert bot.get_warn_count(2, 5) == 1
+    asyncio.run(storage.flush())
+    assert storage.conn.execute('SELECT guild_id, action, reason FROM cases ORDER BY id').fetchall() == [
+        (GUILD, 'warn', 'spam'), (GUILD, 'warn', None), (GUILD, 'kick', None), (2, 'warn', None)
+    ]
+    storage.close()
+
+
+def test_warnings_escalate_at_thresholds(monkeypatch, tmp_path):
+    storage = open_storage(monkeypatch, tmp_path)
+    cog, ctx, sent = setup(monkeypatch)
+    member = FakeMember(5)
+
+    async def run():
+        for _ in range(5):
+            await bot.Moderation.warn.callback(cog, ctx, member)
+        await storage.flush()
+
+    asyncio.run(run())
+    assert member.actions == [('timeout', bot.WARN_ESCALATION[3][1]), ('kick', None)]
+    assert storage.conn.execute("SELECT action, moderator_id FROM cases WHERE action != 'warn' ORDER BY id").fetchall() == [
+        ('timeout', BOT), ('kick', BOT)
+    ]
+    assert sum(embed.title == '📈 Warning Escalation' for embed in sent) == 2
+    storage.close()
+
+
+def test_legacy_warnings_do_not_escalate(monkeypatch, tmp_path):
+    path = tmp_path / 'universx.db'
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE warnings (id INTEGER PRIMARY KEY, user_id INTEGER, reason TEXT, time TEXT)')
+    conn.executemany(
+        'INSERT INTO warnings (user_id, reason, time) VALUES (?, ?, ?)',
+        [(5, 'old', '2024-01-01 00:00:00')] * 4
+    )
+    conn.commit()
+    conn.close()
+    storage = open_storage(monkeypatch, tmp_path)
+    storage.load()
+    cog, ctx, sent = setup(monkeypatch)
+    member = FakeMember(5)
+
+    asyncio.run(bot.Moderation.warn.callback(cog, ctx, member))
+
+    # The four legacy warnings are still on record, but only this guild's count
+    assert storage.conn.execute("SELECT COUNT(*) FROM cases WHERE guild_id = 0").fetchone() == (4,)
+    assert bot.get_warn_count(GUILD, 5) == 1
+    assert member.actions == []
+    storage.close()
+
+
+def test_modlog_pages_newest_first(monkeypatch, tmp_path):
+    storage = open_storage(monkeypatch, tmp_path)
+    cog, ctx, sent = setup(monkeypatch)
+    for case in range(25):
+        bot.log_case(GUILD, 'warn', 5, MODERATOR, f'case {case}')
+    bot.log_case(2, 'warn', 5, MODERATOR, 'other guild')
+    bot.log_case(GUILD, 'warn', 6, MODERATOR, 'other user')
+    user = SimpleNamespace(id=5)
+
+    async def run():
+        await bot.Moderation.modlog.callback(cog, ctx, user)
+        await bot.Moderation.modlog.callback(cog, ctx, user, page=3)
+        await bot.Moderation.modlog.callback(cog, ctx, SimpleNamespace(id=MODERATOR), moderator=True)
+
+    asyncio.run(run())
+    first, last, by_moderator = sent
+    assert first.description.count('**warn**') == bot.CASES_PER_PAGE
+    assert first.description.split('\n')[1] == 'case 24'
+    assert first.footer.text == 'Page 1/3 • 25 cases'
+    assert last.description.count('**warn**') == 5
+    assert last.description.split('\n')[-1] == 'case 0'
+    assert by_moderator.footer.text == 'Page 1/3 • 26 cases'
+    storage.close()
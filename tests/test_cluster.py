@@ -0,0 +1,63 @@
+import asyncio
+
+import bot
+
+
+def open_storage(path):
+    storage = bot.Storage(str(path))
+    storage.open()
+    return storage
+
+
+def test_owner_changes_reach_other_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, 'no_prefix_users', set())
+    monkeypatch.setattr(bot, 'user_data', {'badges': {}, 'no_prefix': set()})
+    monkeypatch.setattr(bot, 'guild_settings', bot.GuildSettings())
+    first = open_storage(tmp_path / 'universx.db')
+    second = open_storage(tmp_path / 'universx.db')
+
+    async def run():
+        first.queue('INSERT INTO no_prefix_users (user_id) VALUES (?)', (7,))
+        first.queue('INSERT INTO badges (user_id, badge) VALUES (?, ?)', (7, 'staff'))
+        first.queue(
+            'INSERT INTO guild_settings (guild_id, prefix, auto_roles, welcome_channel_id) VALUES (?, ?, ?, ?)',
+            (1, '!', '[5]', None)
+        )
+        await first.flush()
+        await second.sync_shared_state()
+
+    asyncio.run(run())
+    assert bot.no_prefix_users == {7}
+    assert bot.user_data['badges'] == {7: {'staff'}}
+    assert bot.guild_settings.get(1)['auto_roles'] == [5]
+    first.close()
+    second.close()
+
+
+def test_reload_waits_for_local_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, 'no_prefix_users', {8})
+    first = open_storage(tmp_path / 'universx.db')
+    second = open_storage(tmp_path / 'universx.db')
+
+    async def run():
+        first.queue('INSERT INTO no_prefix_users (user_id) VALUES (?)', (7,))
+        await first.flush()
+        # 8 was granted locally but not flushed yet; reloading now would drop it
+        second.queue('INSERT INTO no_prefix_users (user_id) VALUES (?)', (8,))
+        await second.sync_shared_state()
+        assert bot.no_prefix_users == {8}
+        await second.flush()
+        await second.sync_shared_state()
+
+    asyncio.run(run())
+    assert bot.no_prefix_users == {7, 8}
+    first.close()
+    second.close()
+
+
+def test_unchanged_database_is_not_reloaded(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, 'no_prefix_users', {9})
+    storage = open_storage(tmp_path / 'universx.db')
+    asyncio.run(storage.sync_shared_state())
+    assert bot.no_prefix_users == {9}
+    storage.close()
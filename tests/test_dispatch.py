@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+
+
+def message(content, user_id=1):
+    return SimpleNamespace(
+        content=content,
+        author=SimpleNamespace(id=user_id, bot=False),
+        guild=SimpleNamespace(id=1),
+        mentions=[]
+    )
+
+
+def test_command_names_and_prefixes_are_commands(monkeypatch):
+    monkeypatch.setattr(bot.bot._connection, 'user', SimpleNamespace(id=0))
+    assert bot.is_command_message(message('grant_no_prefix <@2>'))
+    assert bot.is_command_message(message('u!anything'))
+    assert bot.is_command_message(message('<@0> help'))
+    assert bot.is_command_message(message('<@!0> help'))
+
+
+def test_chatter_is_not_a_command(monkeypatch):
+    monkeypatch.setattr(bot.bot._connection, 'user', SimpleNamespace(id=0))
+    assert not bot.is_command_message(message('anyone online?'))
+    assert not bot.is_command_message(message('grant_no_prefixes'))
+    assert not bot.is_command_message(message(''))
+    assert not bot.is_command_message(message('   '))
+    # Mentioning someone else is chatter, not a command
+    assert not bot.is_command_message(message('<@2> gg'))
+
+
+def test_no_prefix_users_keep_the_guild_prefix(monkeypatch):
+    monkeypatch.setattr(bot.bot._connection, 'user', SimpleNamespace(id=0))
+    monkeypatch.setattr(bot, 'no_prefix_users', {1})
+    prefixes = bot.get_prefix(bot.bot, message('u!ping'))
+    assert prefixes.index('u!') < prefixes.index('')
+
+
+def test_no_prefix_chatter_never_reaches_process_commands(monkeypatch):
+    processed = []
+
+    async def process_commands(msg):
+        processed.append(msg.content)
+
+    monkeypatch.setattr(bot.bot, 'process_commands', process_commands)
+    monkeypatch.setattr(bot, 'no_prefix_users', {1})
+
+    async def run():
+        for content in ('gg', 'lol brb', 'grant_no_prefix <@2>', 'u!ping'):
+            await bot.on_message(message(content))
+        await bot.on_message(message('gg', user_id=2))
+
+    asyncio.run(run())
+    assert processed == ['grant_no_prefix <@2>', 'u!ping', 'gg']
+
+
+def test_interactions_only_processes_only_mentions(monkeypatch):
+    processed = []
+
+    async def process_commands(msg):
+        processed.append(msg.content)
+
+    me = SimpleNamespace(id=0)
+    monkeypatch.setattr(bot.bot, 'process_commands', process_commands)
+    monkeypatch.setattr(bot.bot._connection, 'user', me)
+    monkeypatch.setattr(bot, 'INTERACTIONS_ONLY', True)
+
+    async def run():
+        await bot.on_message(message('u!ping'))
+        mention = message('<@0> sync')
+        mention.mentions = [me]
+        await bot.on_message(mention)
+
+    asyncio.run(run())
+    assert processed == ['<@0> sync']
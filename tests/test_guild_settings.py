@@ -0,0 +1,119 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+
+GUILD = 1
+
+
+def setup(monkeypatch, tmp_path):
+    storage = bot.Storage(str(tmp_path / 'universx.db'))
+    storage.open()
+    monkeypatch.setattr(bot, 'storage', storage)
+    monkeypatch.setattr(bot, 'guild_settings', bot.GuildSettings())
+    monkeypatch.setattr(bot, 'no_prefix_users', set())
+    sent = []
+
+    async def send(ctx, content=None, embed=None, **kwargs):
+        sent.append(content if embed is None else embed.description)
+
+    monkeypatch.setattr(bot.outbox, 'send', send)
+    ctx = SimpleNamespace(guild=SimpleNamespace(id=GUILD))
+    return storage, ctx, sent
+
+
+def message(content, guild_id=GUILD, user_id=7):
+    return SimpleNamespace(
+        content=content,
+        author=SimpleNamespace(id=user_id, bot=False),
+        guild=SimpleNamespace(id=guild_id),
+        mentions=[]
+    )
+
+
+def test_defaults_until_updated(monkeypatch, tmp_path):
+    storage, ctx, sent = setup(monkeypatch, tmp_path)
+    settings = bot.guild_settings
+
+    assert settings.get(GUILD) == {'prefix': None, 'auto_roles': [], 'welcome_channel_id': None}
+    assert settings.prefix(SimpleNamespace(id=GUILD)) == bot.DEFAULT_PREFIX
+    # Direct messages have no guild
+    assert settings.prefix(None) == bot.DEFAULT_PREFIX
+
+    settings.update(GUILD, welcome_channel_id=50)
+    settings.update(GUILD, auto_roles=[5])
+    assert settings.get(GUILD) == {'prefix': None, 'auto_roles': [5], 'welcome_channel_id': 50}
+    assert settings.get(2)['auto_roles'] == []
+    storage.close()
+
+
+def test_setprefix_validates_and_resets_to_default(monkeypatch, tmp_path):
+    storage, ctx, sent = setup(monkeypatch, tmp_path)
+    cog = bot.Utility(None)
+
+    async def run():
+        await bot.Utility.setprefix.callback(cog, ctx, 'toolong')
+        await bot.Utility.setprefix.callback(cog, ctx, 'a b')
+        await bot.Utility.setprefix.callback(cog, ctx, '?')
+        assert bot.guild_settings.get(GUILD)['prefix'] == '?'
+        await bot.Utility.setprefix.callback(cog, ctx, bot.DEFAULT_PREFIX)
+
+    asyncio.run(run())
+    assert sent[0] == sent[1] == f'Prefix must be at most {bot.MAX_PREFIX_LENGTH} characters with no spaces'
+    # The default is stored as no override
+    assert bot.guild_settings.get(GUILD)['prefix'] is None
+    storage.close()
+
+
+def test_custom_prefix_dispatches_and_survives_reload(monkeypatch, tmp_path):
+    storage, ctx, sent = setup(monkeypatch, tmp_path)
+    monkeypatch.setattr(bot.bot._connection, 'user', SimpleNamespace(id=0))
+    cog = bot.Utility(None)
+
+    async def run():
+        await bot.Utility.setprefix.callback(cog, ctx, '!')
+        await storage.flush()
+
+    asyncio.run(run())
+    assert sent == ['Commands now use `!`']
+
+    # A fresh process only has what was written to the database
+    monkeypatch.setattr(bot, 'guild_settings', bot.GuildSettings())
+    storage.load()
+
+    prefixes = bot.get_prefix(bot.bot, message('!ping'))
+    assert '!' in prefixes and bot.DEFAULT_PREFIX not in prefixes
+    assert bot.DEFAULT_PREFIX in bot.get_prefix(bot.bot, message('u!ping', guild_id=2))
+    # No-prefix users get the custom prefix too
+    bot.no_prefix_users.add(7)
+    assert bot.is_command_message(message('!ping'))
+    assert not bot.is_command_message(message('u!ping'))
+    storage.close()
+
+
+def test_several_auto_roles_and_welcome_channel(monkeypatch, tmp_path):
+    storage, ctx, sent = setup(monkeypatch, tmp_path)
+    monkeypatch.setattr(bot, 'MAX_AUTO_ROLES', 2)
+    cog = bot.AutoRole(None)
+    cog.welcome_channels[GUILD] = object()
+    roles = [SimpleNamespace(id=role_id, mention=f'<@&{role_id}>') for role_id in (5, 6, 7)]
+    channel = SimpleNamespace(id=50, mention='<#50>')
+
+    async def run():
+        for role in (roles[0], roles[1], roles[0], roles[2]):
+            await bot.AutoRole.setautorole.callback(cog, ctx, role)
+        await bot.AutoRole.removeautorole.callback(cog, ctx, roles[0])
+        await bot.AutoRole.setwelcome.callback(cog, ctx, channel)
+        await storage.flush()
+
+    asyncio.run(run())
+    assert sent[3] == 'A server can have at most 2 auto-roles'
+    # The cached welcome channel is dropped so the new one is picked up
+    assert GUILD not in cog.welcome_channels
+    assert bot.guild_settings.get(GUILD) == {'prefix': None, 'auto_roles': [6], 'welcome_channel_id': 50}
+    assert storage.conn.execute('SELECT auto_roles, welcome_channel_id FROM guild_settings').fetchall() == [('[6]', 50)]
+
+    asyncio.run(bot.AutoRole.setwelcome.callback(cog, ctx, None))
+    assert sent[-1] == 'Welcome channel reset to the default'
+    assert bot.guild_settings.get(GUILD)['welcome_channel_id'] is None
+    storage.close()
@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+
+
+def test_help_menu_is_generated_from_registered_commands(monkeypatch):
+    monkeypatch.setattr(bot, 'help_template', None)
+    bot.build_help_template()
+    fields = {field.name: field.value for field in bot.help_template.fields}
+
+    owner_only = fields[':crown: Owner Only']
+    assert '`grant_no_prefix` – Allow user to run commands without prefix' in owner_only
+    assert '`sync`' in owner_only
+    assert '`help`' not in owner_only
+
+
+def test_help_requests_copy_the_template(monkeypatch):
+    monkeypatch.setattr(bot, 'help_template', None)
+    sent = []
+
+    async def send(embed):
+        sent.append(embed)
+
+    def help_for(prefix):
+        command = bot.CustomHelpCommand()
+        command.context = SimpleNamespace(clean_prefix=prefix)
+        command.get_destination = lambda: SimpleNamespace(send=send)
+        return command
+
+    asyncio.run(help_for('u!').send_bot_help({}))
+    asyncio.run(help_for('!').send_bot_help({}))
+
+    assert '`u!help <command>`' in sent[0].description
+    assert '`!help <command>`' in sent[1].description
+    assert sent[0].fields == bot.help_template.fields
+    assert bot.help_template.description is None
+    assert bot.help_template.footer.text is None
+
+
+def test_badges_are_shown_with_custom_emoji_in_badge_order():
+    assert bot.BADGE_DISPLAY['owner'] == '<:owner1:1389180694814654474> Owner'
+    assert bot.BADGE_DISPLAY['staff'] == '<a:staff112:1389180853195771906> Staff'
+    assert bot.BADGE_DISPLAY['no_badge'] == '<a:nope1:1389178762020520109> No Badge'
+
+
+def test_cog_commands_are_listed_with_aliases_and_without_emoji(monkeypatch):
+    monkeypatch.setattr(bot, 'help_template', None)
+    asyncio.run(bot.bot.add_cog(bot.Profile(bot.bot)))
+    try:
+        bot.build_help_template()
+    finally:
+        asyncio.run(bot.bot.remove_cog('Profile'))
+    fields = {field.name: field.value for field in bot.help_template.fields}
+
+    assert "`profile` / `p` – View your or another user's profile\n" in fields[':bust_in_silhouette: Profile']
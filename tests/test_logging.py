@@ -0,0 +1,74 @@
+import json
+import logging
+import queue
+import sys
+from types import SimpleNamespace
+
+import bot
+
+
+def record(message='Command failed', args=None, error=None, **extra):
+    exc_info = None
+    if error is not None:
+        try:
+            raise error
+        except Exception:
+            exc_info = sys.exc_info()
+    entry = logging.LogRecord('universx', logging.ERROR, __file__, 1, message, args, exc_info)
+    entry.__dict__.update(extra)
+    return entry
+
+
+def test_sampler_suppresses_repeats_within_the_window(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(bot, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    sampler = bot.ErrorSampler()
+
+    passed = [sampler.filter(record(error=KeyError('guild'), command='warn')) for _ in range(5)]
+    assert passed == [True] * bot.LOG_SAMPLE_BURST + [False] * (5 - bot.LOG_SAMPLE_BURST)
+    assert sampler.suppressed_total == 2
+    # A different command or error is counted separately, and plain messages always pass
+    assert sampler.filter(record(error=KeyError('guild'), command='kick'))
+    assert sampler.filter(record(error=ValueError('guild'), command='warn'))
+    assert all(sampler.filter(record('Connected')) for _ in range(10))
+
+    clock.now = bot.LOG_SAMPLE_WINDOW
+    next_window = record(error=KeyError('guild'), command='warn')
+    assert sampler.filter(next_window)
+    assert next_window.suppressed == 2
+
+
+def test_json_formatter_writes_one_line_with_context():
+    line = bot.JsonFormatter().format(record(
+        'Flush of %d statements failed', (3,), error=RuntimeError('disk full'),
+        guild_id=1, command='warn', user_id=None
+    ))
+
+    assert '\n' not in line
+    entry = json.loads(line)
+    assert entry['level'] == 'ERROR'
+    assert entry['logger'] == 'universx'
+    assert entry['message'] == 'Flush of 3 statements failed'
+    assert (entry['guild_id'], entry['command']) == (1, 'warn')
+    # Empty context fields are left out
+    assert 'user_id' not in entry and 'channel_id' not in entry
+    assert entry['error'].startswith('Traceback')
+    assert entry['error'].endswith('RuntimeError: disk full')
+
+
+def test_records_are_snapshotted_on_the_calling_thread():
+    handler = bot.DeferredQueueHandler(queue.SimpleQueue())
+    targets = [1, 2]
+    error = RuntimeError('first')
+    entry = record('Targets %s', (targets,), error=error)
+
+    prepared = handler.prepare(entry)
+    # Changes after the call don't leak into the written line
+    targets.append(3)
+    error.args = ('changed',)
+
+    assert prepared.args is None and prepared.exc_info is None
+    line = json.loads(bot.JsonFormatter().format(prepared))
+    assert line['message'] == 'Targets [1, 2]'
+    assert line['error'].endswith('RuntimeError: first')
+    assert 'raise error' in line['error']
@@ -0,0 +1,29 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+
+
+def member(guild_id, user_id):
+    return SimpleNamespace(guild=SimpleNamespace(id=guild_id), id=user_id)
+
+
+def test_recent_members_is_bounded_lru():
+    members = bot.RecentMembers(2)
+    members.remember(member(1, 10))
+    members.remember(member(1, 11))
+    assert members.get(1, 10) is not None
+    members.remember(member(1, 12))
+    assert members.get(1, 11) is None
+    assert members.get(1, 10) is not None
+
+
+def test_raw_member_remove_forgets_uncached_member(monkeypatch):
+    members = bot.RecentMembers(10)
+    members.remember(member(1, 10))
+    monkeypatch.setattr(bot, 'recent_members', members)
+
+    payload = SimpleNamespace(guild_id=1, user=SimpleNamespace(id=10))
+    asyncio.run(bot.on_raw_member_remove(payload))
+
+    assert members.get(1, 10) is None
@@ -0,0 +1,85 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+
+
+class FakeChannel:
+    def __init__(self, channel_id, log):
+        self.id = channel_id
+        self.log = log
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(0)
+        self.log.append((self.id, content))
+        return SimpleNamespace(channel=self, content=content)
+
+
+class FakeMessage:
+    def __init__(self):
+        self.deleted = False
+
+    async def delete(self):
+        self.deleted = True
+
+
+def test_higher_priority_sends_go_first():
+    outbox = bot.Outbox()
+    log = []
+    channel = FakeChannel(1, log)
+
+    async def run():
+        # All four are queued before the channel's worker first runs
+        await asyncio.gather(
+            outbox.send(channel, content='info 1', priority=bot.PRIORITY_INFO),
+            outbox.send(channel, content='info 2', priority=bot.PRIORITY_INFO),
+            outbox.send(channel, content='default', priority=bot.PRIORITY_DEFAULT),
+            outbox.send(channel, content='moderation', priority=bot.PRIORITY_MODERATION)
+        )
+
+    asyncio.run(run())
+    assert [content for _, content in log] == ['moderation', 'default', 'info 1', 'info 2']
+
+
+def test_each_channel_drains_independently():
+    outbox = bot.Outbox()
+    log = []
+    channels = [FakeChannel(channel_id, log) for channel_id in (1, 2)]
+
+    async def run():
+        messages = await asyncio.gather(*(
+            outbox.send(channel, content=f'{channel.id}-{position}')
+            for position in range(3) for channel in channels
+        ))
+        assert [message.content for message in messages] == ['1-0', '2-0', '1-1', '2-1', '1-2', '2-2']
+        # Idle channels drop their queue and worker
+        assert outbox.queues == {}
+        assert outbox.drains == {}
+
+    asyncio.run(run())
+    # The two channels interleave instead of one waiting for the other
+    assert [channel_id for channel_id, _ in log[:2]] == [1, 2]
+    assert [content for channel_id, content in log if channel_id == 1] == ['1-0', '1-1', '1-2']
+    assert outbox.stats()['sent'] == 6
+
+
+def test_wheel_deletes_messages_when_due():
+    outbox = bot.Outbox()
+    soon, later, next_round = FakeMessage(), FakeMessage(), FakeMessage()
+    outbox.delete_later(soon, 2)
+    outbox.delete_later(later, 3.5)
+    outbox.delete_later(next_round, bot.WHEEL_SLOTS + 2)
+    assert outbox.pending_deletions == 3
+
+    async def run(ticks):
+        for _ in range(ticks):
+            await outbox.tick()
+
+    asyncio.run(run(2))
+    assert (soon.deleted, later.deleted, next_round.deleted) == (True, False, False)
+    asyncio.run(run(2))
+    assert later.deleted and not next_round.deleted
+    # Same slot as `soon`, one full turn of the wheel later
+    asyncio.run(run(bot.WHEEL_SLOTS - 2))
+    assert next_round.deleted
+    assert outbox.pending_deletions == 0
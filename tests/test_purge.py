@@ -0,0 +1,131 @@
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import discord
+
+import bot
+
+
+class FakeMessage:
+    def __init__(self, channel, message_id, created_at, bot_author=False):
+        self.channel = channel
+        self.id = message_id
+        self.created_at = created_at
+        self.bot_author = bot_author
+
+    async def delete(self):
+        self.channel.single_deletes += 1
+        self.channel.live -= 1
+
+
+class FakeChannel:
+    """Generates history lazily, the way discord.py pages it from the API."""
+
+    def __init__(self, count, age=timedelta(seconds=1)):
+        self.count = count
+        self.age = age
+        self.yielded = 0
+        self.live = 0
+        self.peak_live = 0
+        self.bulk_sizes = []
+        self.deleted_ids = []
+        self.single_deletes = 0
+        self.history_kwargs = None
+
+    async def history(self, *, limit=None, before=None, after=None, oldest_first=None):
+        self.history_kwargs = {'before': before, 'after': after, 'oldest_first': oldest_first}
+        # Same default as discord.py: passing after flips the order
+        if oldest_first is None:
+            oldest_first = after is not None
+        now = discord.utils.utcnow()
+        ids = range(self.count) if oldest_first else range(self.count - 1, -1, -1)
+        for message_id in ids:
+            created_at = now - self.age * (self.count - message_id)
+            if after is not None and created_at <= after:
+                continue
+            self.yielded += 1
+            self.live += 1
+            self.peak_live = max(self.peak_live, self.live)
+            yield FakeMessage(self, message_id, created_at, bot_author=message_id % 2 == 0)
+
+    async def delete_messages(self, messages):
+        assert len(messages) <= 100
+        self.bulk_sizes.append(len(messages))
+        self.deleted_ids.extend(message.id for message in messages)
+        self.live -= len(messages)
+
+
+def purge(channel, amount, check=lambda message: True, **kwargs):
+    cog = bot.Moderation(None)
+    return asyncio.run(cog.purge(channel, amount, check, **kwargs))
+
+
+def test_purge_streams_fifty_thousand_messages():
+    channel = FakeChannel(50_000)
+
+    scanned, deleted = purge(channel, 50_000)
+
+    assert (scanned, deleted) == (50_000, 50_000)
+    assert channel.bulk_sizes == [100] * 500
+    # Only one bulk delete batch is ever held at a time
+    assert channel.peak_live <= bot.BULK_DELETE_SIZE
+
+
+def test_purge_stops_once_enough_messages_match():
+    channel = FakeChannel(50_000)
+
+    scanned, deleted = purge(channel, 250, check=lambda message: message.bot_author)
+
+    assert deleted == 250
+    assert scanned == 500
+    assert channel.yielded == 500
+
+
+def test_purge_with_after_deletes_newest_first():
+    channel = FakeChannel(1_000)
+    after = discord.utils.utcnow() - timedelta(seconds=500)
+
+    scanned, deleted = purge(channel, 10, after=after)
+
+    assert channel.history_kwargs['oldest_first'] is False
+    assert deleted == 10
+    assert channel.deleted_ids == list(range(999, 989, -1))
+
+
+def test_purge_deletes_old_messages_one_by_one():
+    channel = FakeChannel(250, age=timedelta(days=15))
+
+    scanned, deleted = purge(channel, 250)
+
+    assert deleted == 250
+    assert channel.bulk_sizes == []
+    assert channel.single_deletes == 250
+    assert channel.peak_live <= bot.BULK_DELETE_SIZE
+
+
+def test_slash_clear_does_not_delete_the_invocation(monkeypatch):
+    channel = FakeChannel(10)
+    sent = []
+
+    class InvocationMessage:
+        id = 10
+
+        async def delete(self):
+            raise AssertionError('a slash invocation has no message to delete')
+
+    async def defer():
+        pass
+
+    async def send(ctx, **kwargs):
+        sent.append(kwargs)
+
+    monkeypatch.setattr(bot.outbox, 'send', send)
+    ctx = SimpleNamespace(interaction=object(), defer=defer, channel=channel, message=InvocationMessage())
+    flags = SimpleNamespace(user=None, bots=False, match=None, attachments=False, minutes=None)
+    cog = bot.Moderation(None)
+
+    asyncio.run(bot.Moderation.clear.callback(cog, ctx, 5, flags=flags))
+
+    assert channel.deleted_ids == [9, 8, 7, 6, 5]
+    assert sent[0]['embed'].description == 'Cleared 5 messages'
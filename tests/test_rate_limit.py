@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import bot
+
+
+def test_bucket_allows_burst_then_throttles():
+    limiter = bot.RateLimiter(2, 10)
+    assert limiter.hit('user', 0.0) is None
+    assert limiter.hit('user', 0.0) is None
+    assert limiter.hit('user', 0.0) == 5.0
+    assert limiter.hit('user', 5.0) is None
+
+
+def test_sweep_drops_only_refilled_buckets():
+    limiter = bot.RateLimiter(5, 10)
+    limiter.hit('idle', 0.0)
+    limiter.hit('busy', 0.0)
+    limiter.hit('busy', 8.0)
+
+    limiter.sweep(12.0)
+
+    assert list(limiter.buckets) == ['busy']
+
+
+def test_sweep_is_bounded_per_tick():
+    limiter = bot.RateLimiter(5, 10)
+    for key in range(100):
+        limiter.hit(key, 0.0)
+    limiter.hit('live', 15.0)
+
+    limiter.sweep(20.0, limit=30)
+    assert len(limiter.buckets) == 71
+
+    limiter.sweep(20.0, limit=1000)
+    assert list(limiter.buckets) == ['live']
+
+
+def test_rejected_command_takes_no_tokens(monkeypatch):
+    monkeypatch.setattr(bot, 'user_limiter', bot.RateLimiter(5, 10))
+    monkeypatch.setattr(bot, 'channel_limiter', bot.RateLimiter(1, 10))
+    monkeypatch.setattr(bot, 'guild_limiter', bot.RateLimiter(5, 10))
+    monkeypatch.setattr(bot, 'time', SimpleNamespace(monotonic=lambda: 0.0))
+
+    def ctx(channel_id):
+        return SimpleNamespace(
+            author=SimpleNamespace(id=1),
+            channel=SimpleNamespace(id=channel_id),
+            guild=SimpleNamespace(id=1),
+            command=SimpleNamespace(qualified_name='warn')
+        )
+
+    assert asyncio.run(bot.rate_limit(ctx(1)))
+    for _ in range(3):
+        with pytest.raises(bot.Throttled) as error:
+            asyncio.run(bot.rate_limit(ctx(1)))
+        assert error.value.scope == 'channel'
+    # Only the accepted command counted against the user and the guild
+    assert bot.user_limiter.peek(1, 0.0) == 4
+    assert bot.guild_limiter.peek(1, 0.0) == 4
@@ -0,0 +1,63 @@
+import asyncio
+
+from benchmarks import replay
+
+
+def test_messages_replay_answers_every_command():
+    args = replay.parser().parse_args([
+        'messages', '--count', '20', '--chatter', '1', '--guilds', '1',
+        '--channels', '5', '--users', '20', '--rest-scale', '0', '--timeout', '30'
+    ])
+    report = asyncio.run(replay.run(args))
+    assert report['operations'] == 20
+    assert report['failed'] == 0
+    assert 'unknown_routes' not in report
+    assert report['ready_seconds'] > 0
+
+
+def test_warn_burst_is_persisted():
+    args = replay.parser().parse_args([
+        'warns', '--count', '20', '--channels', '4', '--users', '20',
+        '--rest-scale', '0', '--timeout', '30'
+    ])
+    report = asyncio.run(replay.run(args))
+    assert report['operations'] == 20
+    assert report['persisted_seconds'] is not None
+
+
+def test_cluster_processes_split_the_shards():
+    args = replay.parser().parse_args([
+        'messages', '--count', '20', '--chatter', '0', '--guilds', '2', '--channels', '2',
+        '--users', '10', '--shards', '2', '--rest-scale', '0', '--timeout', '30'
+    ])
+    report = asyncio.run(replay.run(args, processes=2))
+    assert report['processes'] == 2
+    assert report['operations'] == 20
+
+
+def test_lean_profile_fetches_members_on_demand():
+    args = replay.parser().parse_args([
+        'startup', '--users', '300', '--count', '3', '--channels', '1',
+        '--profile', 'lean', '--rest-scale', '0', '--timeout', '30'
+    ])
+    report = asyncio.run(replay.run(args))
+    assert report['operations'] == 3
+    assert report['failed'] == 0
+
+
+def test_unban_by_username_through_paginated_ban_list():
+    args = replay.parser().parse_args([
+        'unban', '--bans', '1500', '--count', '3', '--rest-scale', '0', '--timeout', '30'
+    ])
+    report = asyncio.run(replay.run(args))
+    assert report['operations'] == 3
+    assert report['failed'] == 0
+
+
+def test_massban_reads_an_attached_id_list():
+    args = replay.parser().parse_args([
+        'mass', '--action', 'ban', '--count', '30', '--users', '40', '--rest-scale', '0', '--timeout', '30'
+    ])
+    report = asyncio.run(replay.run(args))
+    assert report['operations'] == 30
+    assert report['failed'] == 0
@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import bot
+
+
+def guild(guild_id=1, text=3, voice=1, roles=5, members=100):
+    return SimpleNamespace(
+        id=guild_id,
+        member_count=members,
+        text_channels=[object()] * text,
+        voice_channels=[object()] * voice,
+        roles=[object()] * roles
+    )
+
+
+def test_ring_series_zeroes_skipped_slots():
+    series = bot.RingSeries(3600, 4)
+    start = series.current * 3600
+    series.add(start, 5)
+    series.add(start + 3600, 2)
+    assert series.total(start + 3600, 2) == 7
+    # Three idle hours later only the last add is still in the window
+    assert series.total(start + 4 * 3600, 4) == 2
+
+
+def test_stats_are_restored_from_storage(monkeypatch):
+    monkeypatch.setattr(bot, 'guild_stats', {})
+    monkeypatch.setattr(bot, 'stored_guild_stats', {})
+    cog = bot.ServerStats(None)
+    queued = []
+    monkeypatch.setattr(bot.storage, 'queue', lambda sql, params=(): queued.append(params))
+
+    stats = cog.track(guild())
+    now = bot.time.time()
+    stats.joins_daily.add(now, 40)
+    stats.leaves_daily.add(now, 10)
+    cog.save()
+
+    assert len(queued) == len(bot.GuildStats.SERIES)
+    for guild_id, name, current, counts in queued:
+        bot.stored_guild_stats.setdefault(guild_id, {})[name] = (current, counts)
+    bot.guild_stats.clear()
+
+    restored = cog.track(guild())
+    assert restored.growth(now, days=30) == 30
+    assert bot.stored_guild_stats == {}
+
+
+def test_counts_are_retaken_when_guild_becomes_available(monkeypatch):
+    monkeypatch.setattr(bot, 'guild_stats', {})
+    cog = bot.ServerStats(None)
+    stats = cog.track(guild(text=3))
+    stats.text_channels += 7  # drifted after missed deletes
+
+    asyncio.run(cog.on_guild_available(guild(text=4)))
+
+    assert bot.guild_stats[1] is stats
+    assert stats.text_channels == 4
+
+
+def test_raw_member_remove_counts_a_leave(monkeypatch):
+    monkeypatch.setattr(bot, 'guild_stats', {})
+    cog = bot.ServerStats(None)
+    stats = cog.track(guild())
+
+    asyncio.run(cog.on_raw_member_remove(SimpleNamespace(guild_id=1, user=SimpleNamespace(id=10))))
+
+    assert stats.leaves_hourly.total(bot.time.time(), 1) == 1
+
+
+def test_member_count_is_sampled_on_the_save_tick(monkeypatch):
+    monkeypatch.setattr(bot, 'guild_stats', {})
+    monkeypatch.setattr(bot.storage, 'queue', lambda sql, params=(): None)
+    tracked = guild(members=100)
+    cog = bot.ServerStats(SimpleNamespace(guilds=[tracked, guild(guild_id=2)]))
+    asyncio.run(cog.on_guild_available(tracked))
+    stats = bot.guild_stats[1]
+    now = bot.time.time()
+    assert stats.members_daily.get(now) == 100
+
+    # A week later the old sample is still in the daily ring
+    tracked.member_count = 130
+    later = now + 7 * 86400
+    monkeypatch.setattr(bot.time, 'time', lambda: later)
+    asyncio.run(cog.save_stats.coro(cog))
+
+    assert stats.members_daily.get(later) == 130
+    assert stats.members_daily.get(later, offset=7) == 100
+    assert stats.members_hourly.get(later) == 130
+    # Untracked guilds are not sampled
+    assert list(bot.guild_stats) == [1]
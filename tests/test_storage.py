@@ -0,0 +1,93 @@
+import asyncio
+import sqlite3
+
+import bot
+
+
+def test_failed_flush_is_retried(tmp_path):
+    storage = bot.Storage(str(tmp_path / 'universx.db'))
+    storage.open()
+    write = storage._write
+    calls = []
+
+    def flaky_write(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        write(batch)
+
+    storage._write = flaky_write
+    storage.queue('INSERT INTO badges (user_id, badge) VALUES (?, ?)', (1, 'staff'))
+
+    async def run():
+        await storage.flush()
+        assert len(storage.pending) == 1
+        # Statements queued after the failure land behind the retried batch
+        storage.queue('DELETE FROM badges WHERE user_id = ? AND badge = ?', (1, 'staff'))
+        storage.queue('INSERT INTO badges (user_id, badge) VALUES (?, ?)', (1, 'owner'))
+        await storage.flush()
+
+    asyncio.run(run())
+    assert storage.conn.execute('SELECT user_id, badge FROM badges').fetchall() == [(1, 'owner')]
+    assert calls == [1, 3]
+    storage.close()
+
+
+def test_writes_are_batched_into_one_transaction(tmp_path):
+    storage = bot.Storage(str(tmp_path / 'universx.db'))
+    storage.open()
+    for user_id in range(100):
+        storage.queue('INSERT INTO no_prefix_users (user_id) VALUES (?)', (user_id,))
+
+    asyncio.run(storage.flush())
+    assert storage.conn.execute('SELECT COUNT(*) FROM no_prefix_users').fetchall() == [(100,)]
+    assert storage.pending == []
+    storage.close()
+
+
+def test_statement_that_keeps_failing_is_dropped(tmp_path):
+    storage = bot.Storage(str(tmp_path / 'universx.db'))
+    storage.open()
+    storage.queue('INSERT INTO badges (user_id, badge) VALUES (?, ?)', (1, 'staff'))
+    storage.queue('INSERT INTO missing_table (user_id) VALUES (?)', (1,))
+    storage.queue('INSERT INTO badges (user_id, badge) VALUES (?, ?)', (2, 'staff'))
+
+    async def run():
+        for _ in range(bot.STORAGE_MAX_RETRIES - 1):
+            await storage.flush()
+            assert len(storage.pending) == 3
+        await storage.flush()
+
+    asyncio.run(run())
+    assert storage.pending == []
+    assert storage.failed_flushes == 0
+    assert storage.conn.execute('SELECT user_id FROM badges ORDER BY user_id').fetchall() == [(1,), (2,)]
+    storage.close()
+
+
+def test_concurrent_flush_waits_for_retry(tmp_path):
+    storage = bot.Storage(str(tmp_path / 'universx.db'))
+    storage.open()
+    write = storage._write
+    batches = []
+
+    def flaky_write(batch):
+        batches.append([params for _, params in batch])
+        if len(batches) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        write(batch)
+
+    storage._write = flaky_write
+    storage.queue('INSERT INTO badges (user_id, badge) VALUES (?, ?)', (1, 'staff'))
+
+    async def run():
+        first = asyncio.create_task(storage.flush())
+        await asyncio.sleep(0)
+        # Queued while the first flush is running; it must not overtake the retry
+        storage.queue('DELETE FROM badges WHERE user_id = ? AND badge = ?', (1, 'staff'))
+        await asyncio.gather(first, storage.flush())
+
+    asyncio.run(run())
+    assert batches == [[(1, 'staff')], [(1, 'staff'), (1, 'staff')]]
+    assert storage.conn.execute('SELECT COUNT(*) FROM badges').fetchall() == [(0,)]
+    storage.close()